@@ -0,0 +1,134 @@
+# absence_job.py
+"""Records absentees when each scheduled class ends.
+
+The app runs an AbsenceJob that wakes up every minute and marks the classes
+of today, in the current term, that have ended since its last pass. Every class is a single
+set-based insert (see database.add_absences), so a pass costs one statement
+per class however large the sections are, and running it again is harmless.
+
+Backfill a day: python absence_job.py 2025-08-18
+"""
+import sys
+import threading
+from datetime import date, datetime, timedelta
+
+from database import add_absences, get_schedules
+from schedule_index import schedule_span
+
+
+FIRST_SEMESTER_MONTHS = range(8, 13)    # August - December
+SECOND_SEMESTER_MONTHS = range(1, 6)    # January - May; no regular classes in June and July
+
+
+def semester_number(semester):
+    """1 or 2 for "First Semester" / "1st Semester" style text, else None."""
+    text = str(semester or "").strip().lower()
+    if text.startswith(("1", "first")):
+        return 1
+    if text.startswith(("2", "second")):
+        return 2
+    return None
+
+
+def current_term(schedules, day):
+    """(academic year name, semester number) in session on `day`, or None between semesters.
+
+    The academic year is "YYYY-YYYY" for the school year containing `day`,
+    or the latest one among the schedules if none is named that way.
+    """
+    if day.month in FIRST_SEMESTER_MONTHS:
+        first_year, semester = day.year, 1
+    elif day.month in SECOND_SEMESTER_MONTHS:
+        first_year, semester = day.year - 1, 2
+    else:
+        return None
+    year_name = f"{first_year}-{first_year + 1}"
+    names = {s.get("academic_year") for s in schedules} - {None}
+    if year_name not in names and names:
+        year_name = max(names)
+    return year_name, semester
+
+
+def classes_on(schedules, day, ended_by=None, term=None):
+    """(schedule_id, section_id, start, end) for the classes held on `day`,
+    only those ended by `ended_by` (a datetime) if it is given and only
+    those of `term` ((academic year, semester number)) if it is given."""
+    midnight = datetime.combine(day, datetime.min.time())
+    classes = []
+    for s in schedules:
+        span = schedule_span(s)
+        if span is None or span[0] != day.weekday() or s.get("section_id") is None:
+            continue
+        if term is not None and (s.get("academic_year"), semester_number(s.get("semester"))) != term:
+            continue
+        start, end = midnight + timedelta(minutes=span[1]), midnight + timedelta(minutes=span[2])
+        if ended_by is None or end <= ended_by:
+            classes.append((s["id"], s["section_id"], start, end))
+    return classes
+
+
+class AbsenceJob:
+    def __init__(self, interval=60, load_schedules=get_schedules, mark_absent=add_absences):
+        self.interval = interval
+        self.load_schedules = load_schedules
+        self.mark_absent = mark_absent
+        self._done = set()   # (day, schedule_id) already marked by this process
+        self._day = None
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="absence-job", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error marking absences: {e}")
+            self._stopping.wait(self.interval)
+
+    def run_once(self, now=None):
+        """Mark every class of today that has ended and was not marked yet.
+
+        Returns the number of Absent rows inserted.
+        """
+        now = now or datetime.now()
+        if self._day != now.date():
+            self._day, self._done = now.date(), set()
+        schedules = self.load_schedules()
+        term = current_term(schedules, now.date())
+        if term is None:
+            return 0
+        pending = [c for c in classes_on(schedules, now.date(), ended_by=now, term=term)
+                   if c[0] not in self._done]
+        if not pending:
+            return 0
+        inserted = self.mark_absent(pending)
+        self._done.update(c[0] for c in pending)
+        return inserted
+
+
+def mark_day(day):
+    """Mark absentees for every class of the term held on `day` (a date) that has ended."""
+    schedules = get_schedules()
+    term = current_term(schedules, day)
+    if term is None:
+        return 0
+    return add_absences(classes_on(schedules, day, ended_by=datetime.now(), term=term))
+
+
+if __name__ == "__main__":
+    day = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else date.today()
+    print(f"{mark_day(day)} absence(s) recorded for {day}.")
@@ -0,0 +1,39 @@
+# attendance_status.py
+"""Present / Late classification of scans.
+
+A scan is Late when it comes more than GRACE_MINUTES after the start of
+the class it belongs to (attendance_log.schedule_id); scans outside any
+class, Absent rows and manually set statuses are left alone. New scans are
+classified by database.add_attendance_batch, where the class is resolved.
+GRACE_MINUTES is the only grace setting: after changing it, restart the
+app and reclassify the stored scans of a date range with one set-based
+UPDATE (database.reclassify_attendance), which reads it too:
+
+    python attendance_status.py --reclassify 2025-08-01 2025-12-20
+"""
+import sys
+from datetime import date
+
+GRACE_MINUTES = 15
+SCAN_STATUSES = ("Present", "Late")   # statuses the classifier owns
+
+
+def classify(when, start_min):
+    """'Present' or 'Late' for a scan at datetime `when` into a class starting at `start_min`."""
+    if start_min is None:
+        return "Present"
+    return "Late" if when.hour * 60 + when.minute > start_min + GRACE_MINUTES else "Present"
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) == 3 and args[0] == "--reclassify":
+        import time
+        from database import reclassify_attendance
+        start, end = date.fromisoformat(args[1]), date.fromisoformat(args[2])
+        started = time.perf_counter()
+        changed = reclassify_attendance(start, end)
+        print(f"{changed} scan(s) reclassified with a {GRACE_MINUTES}-minute grace period "
+              f"in {time.perf_counter() - started:.1f}s.")
+    else:
+        print(__doc__)
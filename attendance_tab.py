@@ -1,13 +1,30 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import csv
+import os
+import time
 from theme import PINK, LIGHT_BG, mk_label
-from database import get_attendance, get_sections
+from csv_export import write_csv
+from database import get_attendance, get_attendance_since, get_sections, iter_attendance
+from query_executor import QueryExecutor
+
+PAGE_SIZE = 200           # rows fetched per page
+PREFETCH_AT = 0.85        # fetch the next page once the view is scrolled this far down
+POLL_MS = 3000            # live mode: how often to check for new scans
+GAP_WAIT_S = 30           # live mode: how long an id missing below the mark is awaited
+MAX_GAPS = 1000           # live mode: at most this many missing ids are awaited
 
 class AttendanceTab(tk.Frame):
     def __init__(self, parent):
         super().__init__(parent, bg=LIGHT_BG)
         self.filter_var = tk.StringVar(value="")
+        self._cursor = None       # (datetime, id) of the last loaded row
+        self._has_more = False
+        self._high_water = None   # largest attendance id shown; None until the first page arrives
+        # Auto-increment ids are not committed in order (other kiosks, the absence
+        # job), so ids skipped below the mark are re-polled for a while: id -> first missed
+        self._gaps = {}
+        self._poll_job = None
+        self.live_var = tk.BooleanVar(value=False)
         self._build_ui()
         self._init_sections()
         self.refresh_table()
@@ -16,23 +33,34 @@ class AttendanceTab(tk.Frame):
         top = tk.Frame(self, bg=LIGHT_BG)
         top.pack(fill="x", padx=12, pady=(12, 8))
         mk_label(top, "Attendance Log", font=("Segoe UI", 14, "bold"), bg=LIGHT_BG).pack(side="left")
+        self.loading_label = mk_label(top, "", font=("Segoe UI", 9, "italic"), bg=LIGHT_BG)
+        self.loading_label.pack(side="right")
+        self.queries = QueryExecutor(self, indicator=self.loading_label)
 
         filter_frame = tk.Frame(self, bg=LIGHT_BG)
         filter_frame.pack(fill="x", padx=12, pady=(6, 12))
         mk_label(filter_frame, "Filter by Section:", bg=LIGHT_BG).pack(side="left", padx=(0, 6))
         self.filter_cb = ttk.Combobox(filter_frame, textvariable=self.filter_var, values=[""], state="readonly", width=36)
         self.filter_cb.pack(side="left")
+        self.filter_cb.bind("<<ComboboxSelected>>", lambda e: self.refresh_table())
         tk.Button(filter_frame, text="Filter", bg=PINK, fg="white", relief="flat",
                   command=self.refresh_table).pack(side="left", padx=8)
         tk.Button(filter_frame, text="Export CSV", bg="#ffa3b3", fg="white", relief="flat",
                   command=self.export_csv).pack(side="left", padx=8)
+        tk.Checkbutton(filter_frame, text="Live (auto-refresh)", variable=self.live_var, bg=LIGHT_BG,
+                       command=self._toggle_live).pack(side="left", padx=8)
 
         cols = ("id", "last", "first", "year_section", "datetime", "status")
-        self.tree = ttk.Treeview(self, columns=cols, show="headings")
+        table = tk.Frame(self, bg=LIGHT_BG)
+        table.pack(fill="both", expand=True, padx=12, pady=(6, 12))
+        self.tree = ttk.Treeview(table, columns=cols, show="headings")
         for c, t in zip(cols, ("Student ID", "Last Name", "First Name", "Year & Section", "Date Time", "Status")):
             self.tree.heading(c, text=t)
             self.tree.column(c, anchor="w", width=140 if c != "datetime" else 200)
-        self.tree.pack(fill="both", expand=True, padx=12, pady=(6, 12))
+        self.scrollbar = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", fill="both", expand=True)
 
     def _init_sections(self):
         """Initializes the section dropdown with available sections."""
@@ -43,30 +71,114 @@ class AttendanceTab(tk.Frame):
             self.filter_var.set("")  # Default to no section filter
 
     def refresh_table(self):
-        """Refreshes the attendance table with filtered data."""
+        """Reloads the attendance table from the first page (loaded in the background)."""
+        self.queries.cancel("attendance_page")
+        self.queries.cancel("attendance_new")
+        self._cursor = None
+        self._has_more = False
+        self._high_water = None
+        self._gaps = {}
+        section_filter = self.filter_var.get() or None  # Get filter value or None
+        self.queries.submit("attendance", get_attendance, section_filter=section_filter, limit=PAGE_SIZE,
+                            on_done=self._show_first_page)
+
+    def _show_first_page(self, rows):
         for r in self.tree.get_children():
             self.tree.delete(r)
-        section_filter = self.filter_var.get() or None  # Get filter value or None
-        rows = get_attendance(section_filter=section_filter)  # Fetch data with section filter
+        self._high_water = max((rec["id"] for rec in rows), default=0)
+        self._append_page(rows)
+
+    def _load_next_page(self):
+        if not self._has_more or self.queries.is_busy("attendance") or self.queries.is_busy("attendance_page"):
+            return
+        section_filter = self.filter_var.get() or None
+        self.queries.submit("attendance_page", get_attendance, section_filter=section_filter,
+                            before=self._cursor, limit=PAGE_SIZE, on_done=self._append_page)
+
+    def _append_page(self, rows):
         for rec in rows:
-            self.tree.insert("", "end", values=(
-                rec["student_id"], rec["last"], rec["first"],
-                rec["year_section"], rec["datetime"].strftime("%Y-%m-%d %H:%M:%S"), rec["status"]
-            ))
+            self.tree.insert("", "end", values=self._row_values(rec))
+        if rows:
+            self._cursor = (rows[-1]["datetime"], rows[-1]["id"])
+        self._has_more = len(rows) == PAGE_SIZE
+        # A short first page may not fill the view, so no scroll event will follow.
+        if self._has_more:
+            self.after_idle(lambda: self._on_scroll(*self.tree.yview()))
 
-    def export_csv(self):
-        """Exports the attendance data to a CSV file."""
-        rows = get_attendance(section_filter=self.filter_var.get() or None)
-        if not rows:
-            messagebox.showinfo("No Data", "No attendance records to export.")
+    @staticmethod
+    def _row_values(rec):
+        return (rec["student_id"], rec["last"], rec["first"],
+                rec["year_section"], rec["datetime"].strftime("%Y-%m-%d %H:%M:%S"), rec["status"])
+
+    # -----------------------
+    # Live mode
+    # -----------------------
+    def _toggle_live(self):
+        if self.live_var.get():
+            self._poll_new_rows()
+        elif self._poll_job:
+            self.after_cancel(self._poll_job)
+            self._poll_job = None
+            self.queries.cancel("attendance_new")
+
+    def _poll_new_rows(self):
+        """Fetches only rows newer than the high-water mark (or an awaited gap) and prepends them."""
+        self._poll_job = self.after(POLL_MS, self._poll_new_rows)
+        if self._high_water is None or self.queries.is_busy("attendance_new"):
             return
-        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV file", "*.csv")])
+        after_id = min(self._gaps) - 1 if self._gaps else self._high_water
+        self.queries.submit("attendance_new", get_attendance_since, after_id,
+                            section_filter=self.filter_var.get() or None, on_done=self._prepend_new,
+                            on_error=lambda exc: None, quiet=True)  # just retry on the next tick
+
+    def _prepend_new(self, rows):
+        if self._high_water is None:
+            return
+        now = time.monotonic()
+        self._gaps = {i: t for i, t in self._gaps.items() if now - t < GAP_WAIT_S}
+        # rows at or below the mark were shown already, unless they fill a gap
+        fresh = [rec for rec in rows if rec["id"] > self._high_water or rec["id"] in self._gaps]
+        for rec in fresh:  # oldest first, so each insert at the top leaves the newest on top
+            self.tree.insert("", 0, values=self._row_values(rec))
+            self._gaps.pop(rec["id"], None)
+        if not rows or rows[-1]["id"] <= self._high_water:
+            return
+        # ids up to the last row returned that did not come back may still be committing
+        returned = {rec["id"] for rec in rows}
+        top = rows[-1]["id"]
+        for i in range(max(self._high_water + 1, top - MAX_GAPS), top):
+            if i not in returned:
+                self._gaps.setdefault(i, now)
+        if len(self._gaps) > MAX_GAPS:
+            self._gaps = dict(sorted(self._gaps.items())[-MAX_GAPS:])
+        self._high_water = top
+
+    def _on_scroll(self, first, last):
+        """Treeview yscrollcommand: keeps the scrollbar in sync and fetches more rows near the end."""
+        self.scrollbar.set(first, last)
+        if float(last) >= PREFETCH_AT:
+            self._load_next_page()
+
+    def export_csv(self):
+        """Streams the attendance data to a CSV (or gzipped CSV) file in the background."""
+        path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                            filetypes=[("CSV file", "*.csv"), ("Gzipped CSV", "*.csv.gz")])
         if not path:
             return
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(("Student ID", "Last Name", "First Name", "Year & Section", "Date Time", "Status"))
-            for rec in rows:
-                w.writerow((rec["student_id"], rec["last"], rec["first"],
-                            rec["year_section"], rec["datetime"].strftime("%Y-%m-%d %H:%M:%S"), rec["status"]))
-        messagebox.showinfo("Exported", f"Attendance exported to {path}")
+        section_filter = self.filter_var.get() or None
+        self.queries.submit(
+            "export", write_csv, path,
+            ("Student ID", "Last Name", "First Name", "Year & Section", "Date Time", "Status"),
+            iter_attendance(section_filter=section_filter), self._row_values,
+            progress=lambda n: self.queries.post(self._show_export_progress, n),
+            on_done=lambda n: self._export_done(path, n))
+
+    def _show_export_progress(self, count):
+        self.loading_label.config(text=f"Exported {count} rows…")
+
+    def _export_done(self, path, count):
+        if not count:
+            os.remove(path)
+            messagebox.showinfo("No Data", "No attendance records to export.")
+            return
+        messagebox.showinfo("Exported", f"{count} attendance records exported to {path}")
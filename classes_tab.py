@@ -1,7 +1,10 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 from theme import PINK, CARD_BG, LIGHT_BG, mk_label
-from database import (get_academic_years, get_sections, add_academic_year, add_sections, add_student as db_add_student, get_students)
+from database import (get_academic_years, get_sections, add_academic_year, add_sections, add_student as db_add_student, get_students,
+                      get_school_year_id, get_section_id)
+from query_executor import QueryExecutor
+from roster_import import import_roster
 
 class ClassesTab(tk.Frame):
     def __init__(self, parent, update_dropdowns_callback):
@@ -43,6 +46,9 @@ class ClassesTab(tk.Frame):
         right.pack(side="right", fill="y")
 
         mk_label(left, "List of Students", font=("Segoe UI", 11, "bold"), bg=CARD_BG).pack(anchor="w", padx=8, pady=6)
+        self.loading_label = mk_label(left, "", font=("Segoe UI", 9, "italic"), bg=LIGHT_BG)
+        self.loading_label.pack(anchor="w", padx=8)
+        self.queries = QueryExecutor(self, indicator=self.loading_label)
         cols = ("id", "last", "first", "middle", "year_section", "fingerprint_registered")
         self.student_tree = ttk.Treeview(left, columns=cols, show="headings")
         for c, t in zip(cols, ("Student ID", "Last Name", "First Name", "Middle Name", "Year & Section", "Fingerprint Registered")):
@@ -87,6 +93,7 @@ class ClassesTab(tk.Frame):
         mk_label(form, "Choose Class (Section):", bg=LIGHT_BG).grid(row=6, column=0, sticky="w", pady=4)
         self.class_cb = ttk.Combobox(form, textvariable=self.section_var, state="readonly", width=26)
         self.class_cb.grid(row=6, column=1, pady=4, sticky="w")
+        self.class_cb.bind("<<ComboboxSelected>>", lambda e: self.refresh_students_list())
         tk.Button(form, text="Add Section", bg=PINK, fg="white", relief="flat",
                   command=self.add_section_dialog).grid(row=6, column=2, padx=6, pady=4, sticky="w")
 
@@ -95,6 +102,8 @@ class ClassesTab(tk.Frame):
 
         tk.Button(actions, text="Save Student", bg=PINK, fg="white", relief="flat",
                   command=self.save_student).pack(side="left", padx=(0, 10))
+        tk.Button(actions, text="Import Roster CSV", bg=PINK, fg="white", relief="flat",
+                  command=self.import_roster_dialog).pack(side="left", padx=(0, 10))
 
         fingerprint_frame = tk.Frame(actions, bg=LIGHT_BG, width=220, height=160, relief="solid", bd=2)
         fingerprint_frame.pack(side="left")
@@ -118,10 +127,13 @@ class ClassesTab(tk.Frame):
         form.grid_columnconfigure(2, weight=0)
 
     def refresh_students_list(self):
-        """Refreshes the list of students in the treeview."""
+        """Refreshes the list of students in the treeview (loaded in the background)."""
+        self.queries.submit("students", get_students, self.section_var.get().strip() or None,
+                            on_done=self._fill_students)
+
+    def _fill_students(self, rows):
         for r in self.student_tree.get_children():
             self.student_tree.delete(r)
-        rows = get_students(self.section_var.get().strip() or None)
         for s in rows:
             self.student_tree.insert("", "end",
                                      values=(s["id"], s["last"], s["first"], s["middle"], s["year_section"], s["fingerprint_registered"]))
@@ -164,13 +176,12 @@ class ClassesTab(tk.Frame):
                 return
 
             # Use currently selected Academic Year
-            years = get_academic_years()
-            sy_row = next((ay for ay in years if ay['year_name'] == self.academic_year_var.get()), None)
-            if not sy_row:
+            school_year_id = get_school_year_id(self.academic_year_var.get())
+            if not school_year_id:
                 messagebox.showwarning("Invalid AY", "Please select an academic year first.")
                 return
 
-            add_sections(section_name, sy_row['id'])  # ✅ Save to DB
+            add_sections(section_name, school_year_id)  # ✅ Save to DB
             self.load_years_and_sections()  # Refresh this tab
             self.update_dropdowns_callback()  # Refresh ScheduleTab
             dlg.destroy()
@@ -189,24 +200,71 @@ class ClassesTab(tk.Frame):
             messagebox.showwarning("Missing fields", "Please fill all fields including Academic Year and Section.")
             return
 
-        years = get_academic_years()
-        sy_row = next((ay for ay in years if ay['year_name'] == self.academic_year_var.get()), None)
-        school_year_id = sy_row['id'] if sy_row else None
+        school_year_id = get_school_year_id(self.academic_year_var.get())
+        section_id = get_section_id(sec_name, school_year_id) or get_section_id(sec_name)
 
-        db_add_student(sid, last, first, middle, ys, sec_name, school_year_id)
+        db_add_student(sid, last, first, middle, ys, sec_name, school_year_id, section_id)
         self.sid_var.set(""); self.last_var.set(""); self.first_var.set(""); self.middle_var.set(""); self.ys_var.set("")
         self.refresh_students_list()
         messagebox.showinfo("Saved", f"Student {first} {last} saved to {sec_name}.")
 
+    def import_roster_dialog(self):
+        """Validate a roster CSV (dry run) and, once confirmed, import its valid rows."""
+        path = filedialog.askopenfilename(filetypes=[("CSV Files", "*.csv")])
+        if not path:
+            return
+        self.queries.submit("roster", import_roster, path, dry_run=True,
+                            on_done=lambda res: self._confirm_roster(path, res))
+
+    def _confirm_roster(self, path, res):
+        if not res.imported:
+            messagebox.showwarning("Roster Import", res.summary())
+            return
+        if not messagebox.askyesno("Roster Import", res.summary() + "\n\nImport the valid rows now?"):
+            return
+        self.queries.submit("roster", import_roster, path,
+                            progress=lambda n: self.queries.post(self._show_import_progress, n),
+                            on_done=self._roster_imported)
+
+    def _show_import_progress(self, count):
+        self.loading_label.config(text=f"Importing… {count} rows read")
+
+    def _roster_imported(self, res):
+        self.refresh_students_list()
+        messagebox.showinfo("Roster Import", res.summary())
+
     def register_fingerprint(self):
-        # Simulate registering a fingerprint for a student (plug in your SDK as needed)
+        """Captures the finger on the scanner (in the background) and enrolls its template."""
         sid = self.sid_var.get().strip()
         if not sid:
             messagebox.showwarning("No Student ID", "Please select a student to register their fingerprint.")
             return
-        # In a real app, capture bytes from scanner SDK:
-        fake_bytes = f"Fingerprint data for {sid}".encode("utf-8")
+        section_id = get_section_id(self.section_var.get().strip(), get_school_year_id(self.academic_year_var.get()))
+        self.queries.submit("fingerprint", self._capture_and_register, sid, section_id,
+                            on_done=lambda _: self._fingerprint_registered(sid),
+                            on_error=lambda e: self._fingerprint_failed(e, section_id))
+        self.loading_label.config(text="Place finger on the scanner…")
+
+    @staticmethod
+    def _capture_and_register(sid, section_id):
+        from fingerprint import capture_template  # needs the scanner SDK
         from db_helper import register_fingerprint
-        register_fingerprint(sid, fake_bytes)
+        register_fingerprint(sid, capture_template(), section_id)
+
+    def _fingerprint_failed(self, error, section_id):
+        from fp_lsh import DuplicateFingerprint
+        if not isinstance(error, DuplicateFingerprint):
+            messagebox.showerror("Scanner Error", f"Could not register the fingerprint.\n\n{error}")
+            return
+        if not messagebox.askyesno("Possible Duplicate Fingerprint",
+                                   f"{error}\n\nRegister it for Student ID {error.student_id} anyway?"):
+            return
+        from db_helper import register_fingerprint
+        sid = error.student_id
+        self.queries.submit("fingerprint", register_fingerprint, sid, error.template, section_id, allow_duplicate=True,
+                            on_done=lambda _: self._fingerprint_registered(sid),
+                            on_error=lambda e: messagebox.showerror("Database Error", f"Could not register the fingerprint.\n\n{e}"))
+
+    def _fingerprint_registered(self, sid):
         messagebox.showinfo("Fingerprint Registered", f"Fingerprint registered for Student ID: {sid}")
         self.refresh_students_list()
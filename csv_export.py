@@ -0,0 +1,27 @@
+# csv_export.py
+import csv
+import gzip
+
+
+def write_csv(path, header, chunks, row_values, compress=None, progress=None):
+    """Write rows to a CSV file chunk by chunk and return how many were written.
+
+    `chunks` is any iterable of row lists (e.g. database.iter_attendance), so
+    only one chunk is held in memory at a time. `row_values` turns a row into
+    the list of cells. The file is gzip-compressed when `compress` is true, or
+    when it is None and the path ends with ".gz". `progress(rows_so_far)` is
+    called after every chunk.
+    """
+    if compress is None:
+        compress = path.endswith(".gz")
+    opener = gzip.open if compress else open
+    written = 0
+    with opener(path, "wt", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        for chunk in chunks:
+            w.writerows(row_values(r) for r in chunk)
+            written += len(chunk)
+            if progress:
+                progress(written)
+    return written
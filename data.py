@@ -1,17 +1,7 @@
 # data.py
+from memory_store import MemoryStore
 
 # Global variables storing data
-attendance_log = []  # List to store attendance logs
+store = MemoryStore()  # students, attendance logs and schedules (indexed)
 classes = []  # List to store classes
 academic_years = []  # Example academic years
-students = []  # List to store students
-schedules = []  # List to store class schedules
-attendance_log = []  # List to store attendance logs
-classes = []  # Example classes
-
-# Fingerprint storage
-fingerprints = {}  # {student_id: fingerprint_data}
-
-
-# Simulated fingerprint storage
-fingerprints = {}  # {student_id: fingerprint_data}
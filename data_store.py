@@ -1,5 +1,5 @@
 # data_store.py
-from data import attendance_log, classes, academic_years, students, schedules  # Import data from data.py
+from data import store, classes, academic_years  # Import data from data.py
 
 def current_timestamp_str():
     from datetime import datetime
@@ -7,7 +7,15 @@ def current_timestamp_str():
 
 # Example function to get attendance
 def get_attendance_log():
-    return attendance_log
+    return store.attendance
+
+# Attendance in [start, end), optionally for one section
+def find_attendance(year_section=None, start=None, end=None, academic_year=None, semester=None):
+    return store.find_attendance(year_section, start, end, academic_year, semester)
+
+# Example function to record attendance
+def add_attendance(record):
+    return store.add_attendance(record)
 
 # Example function to get classes
 def get_classes():
@@ -17,10 +25,18 @@ def get_classes():
 def get_academic_years():
     return academic_years
 
+# Look up one student by id
+def get_student(student_id):
+    return store.student(student_id)
+
+# All students, or those of one section
+def get_students(year_section=None):
+    return store.students(year_section)
+
 # Example function to add a new student
 def add_student(student):
-    students.append(student)
+    return store.add_student(student)
 
 # Example function to add a schedule
 def add_schedule(schedule):
-    schedules.append(schedule)
+    store.add_schedule(schedule)
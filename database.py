@@ -1,5 +1,12 @@
+import uuid
+
 import pymysql
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from attendance_status import GRACE_MINUTES, SCAN_STATUSES, classify
+from db_pool import ConnectionPool
+from ref_cache import ReferenceCache
+from schedule_index import EARLY_MINUTES, ScheduleIndex, day_number, parse_span
 
 def get_connection():
     """Establishes a connection to the MySQL database."""
@@ -8,213 +15,550 @@ def get_connection():
         user="cas_user",
         password="Ccs@1234",
         database="cas_attendance",
-        cursorclass=pymysql.cursors.DictCursor
+        cursorclass=pymysql.cursors.DictCursor,
+        connect_timeout=5  # fail fast during a network blip
     )
 
+# Shared pool used by every helper below (and by db_helper.py).
+pool = ConnectionPool(get_connection, max_size=5)
+
+def connection():
+    """Context manager that checks out a pooled connection."""
+    return pool.connection()
+
+def pool_stats():
+    """Hit/miss and wait-time counters of the shared pool."""
+    return pool.stats()
+
 # ---------------- SCHOOL YEARS ----------------
 def add_academic_year(year_name):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO school_years (year_name) VALUES (%s)", (year_name,))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("INSERT INTO school_years (year_name) VALUES (%s)", (year_name,))
+            conn.commit()
+    ref_cache.invalidate_years()
+
+def _load_academic_years():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, year_name FROM school_years ORDER BY year_name DESC")
+            return cur.fetchall()
 
 def get_academic_years():
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id, year_name FROM school_years ORDER BY year_name DESC")
-        return cur.fetchall()
-    finally:
-        cur.close()
-        conn.close()
+    return ref_cache.years()
+
+def get_school_year_id(year_name):
+    """Resolve a school year name to its id (cached)."""
+    return ref_cache.year_id(year_name)
 
 def delete_academic_year(academic_year_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("DELETE FROM school_years WHERE id = %s", (academic_year_id,))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM school_years WHERE id = %s", (academic_year_id,))
+            conn.commit()
+    ref_cache.invalidate()  # sections of that year may be gone too
 
 # ---------------- SECTIONS ----------------
 def add_sections(section_name, school_year_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute(
-            "INSERT INTO sections (section_name, school_year_id) VALUES (%s, %s)",
-            (section_name, school_year_id)
-        )
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
-
-def get_sections(school_year_id=None):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        if school_year_id:
+    with connection() as conn:
+        with conn.cursor() as cur:
             cur.execute(
-                "SELECT id, section_name AS name FROM sections WHERE school_year_id=%s",
-                (school_year_id,)
+                "INSERT INTO sections (section_name, school_year_id) VALUES (%s, %s)",
+                (section_name, school_year_id)
             )
-        else:
-            cur.execute("SELECT id, section_name AS name FROM sections")
-        return cur.fetchall()
-    finally:
-        cur.close()
-        conn.close()
+            conn.commit()
+    ref_cache.invalidate_sections()
+
+def _load_sections():
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, section_name AS name, school_year_id FROM sections")
+            return cur.fetchall()
+
+def get_sections(school_year_id=None):
+    return ref_cache.sections(school_year_id)
+
+def get_section_id(section_name, school_year_id=None):
+    """Resolve a section name (optionally within a school year) to its id (cached)."""
+    return ref_cache.section_id(section_name, school_year_id)
+
+def get_section_name(section_id):
+    return ref_cache.section_name(section_id)
 
 def delete_section(section_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("DELETE FROM sections WHERE id = %s", (section_id,))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM sections WHERE id = %s", (section_id,))
+            conn.commit()
+    ref_cache.invalidate_sections()
+
+# School years and sections are read far more often than they change.
+ref_cache = ReferenceCache(_load_academic_years, _load_sections)
 
 # ---------------- SCHEDULES ----------------
 def add_schedule(section_name, subject, instructor, day, start_time, end_time, room, academic_year_id, semester):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id FROM sections WHERE section_name = %s AND school_year_id = %s",
-                    (section_name, academic_year_id))
-        sec = cur.fetchone()
-        if not sec:
-            raise Exception("Section not found for this academic year.")
-
-        cur.execute("""
-            INSERT INTO schedules (subject, instructor, day, start_time, end_time, room, section_id, school_year_id, semester)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """, (subject, instructor, day, start_time, end_time, room, sec["id"], academic_year_id, semester))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    section_id = get_section_id(section_name, academic_year_id)
+    if not section_id:
+        raise Exception("Section not found for this academic year.")
 
-def get_schedules(section_name=None):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        if section_name:
+    day_no, (start_min, end_min) = day_number(day), parse_span(start_time, end_time)
+    with connection() as conn:
+        with conn.cursor() as cur:
             cur.execute("""
-                SELECT s.id, s.subject, s.instructor, s.day, s.start_time, s.end_time, s.room,
-                       sec.id AS section_id, sec.section_name AS section, sy.year_name AS academic_year, s.semester
-                FROM schedules s
-                JOIN sections sec ON s.section_id = sec.id
-                JOIN school_years sy ON s.school_year_id = sy.id
-                WHERE sec.section_name = %s
-                ORDER BY s.day, s.start_time
-            """, (section_name,))
-        else:
-            cur.execute("""
-                SELECT s.id, s.subject, s.instructor, s.day, s.start_time, s.end_time, s.room,
-                       sec.id AS section_id, sec.section_name AS section, sy.year_name AS academic_year, s.semester
-                FROM schedules s
-                JOIN sections sec ON s.section_id = sec.id
-                JOIN school_years sy ON s.school_year_id = sy.id
-                ORDER BY s.day, s.start_time
-            """)
-        return cur.fetchall()
-    finally:
-        cur.close()
-        conn.close()
+                INSERT INTO schedules (subject, instructor, day, start_time, end_time, room, section_id, school_year_id, semester,
+                                       day_no, start_min, end_min)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
+            """, (subject, instructor, day, start_time, end_time, room, section_id, academic_year_id, semester,
+                  day_no, start_min, end_min))
+            conn.commit()
+            schedule_id = cur.lastrowid
+    schedule_index.put({"id": schedule_id, "section_id": section_id,
+                        "day_no": day_no, "start_min": start_min, "end_min": end_min})
+
+def get_schedules(section_name=None):
+    with connection() as conn:
+        with conn.cursor() as cur:
+            if section_name:
+                cur.execute("""
+                    SELECT s.id, s.subject, s.instructor, s.day, s.start_time, s.end_time, s.room,
+                           s.day_no, s.start_min, s.end_min,
+                           sec.id AS section_id, sec.section_name AS section, sy.year_name AS academic_year, s.semester
+                    FROM schedules s
+                    JOIN sections sec ON s.section_id = sec.id
+                    JOIN school_years sy ON s.school_year_id = sy.id
+                    WHERE sec.section_name = %s
+                    ORDER BY s.day_no, s.start_min
+                """, (section_name,))
+            else:
+                cur.execute("""
+                    SELECT s.id, s.subject, s.instructor, s.day, s.start_time, s.end_time, s.room,
+                           s.day_no, s.start_min, s.end_min,
+                           sec.id AS section_id, sec.section_name AS section, sy.year_name AS academic_year, s.semester
+                    FROM schedules s
+                    JOIN sections sec ON s.section_id = sec.id
+                    JOIN school_years sy ON s.school_year_id = sy.id
+                    ORDER BY s.day_no, s.start_min
+                """)
+            return cur.fetchall()
 
 def update_schedule(schedule_id, subject, instructor, day, start_time, end_time, room, semester):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            UPDATE schedules
-            SET subject=%s, instructor=%s, day=%s, start_time=%s, end_time=%s, room=%s, semester=%s
-            WHERE id=%s
-        """, (subject, instructor, day, start_time, end_time, room, semester, schedule_id))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    day_no, (start_min, end_min) = day_number(day), parse_span(start_time, end_time)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                UPDATE schedules
+                SET subject=%s, instructor=%s, day=%s, start_time=%s, end_time=%s, room=%s, semester=%s,
+                    day_no=%s, start_min=%s, end_min=%s
+                WHERE id=%s
+            """, (subject, instructor, day, start_time, end_time, room, semester, day_no, start_min, end_min, schedule_id))
+            conn.commit()
+    schedule_index.put({"id": schedule_id, "day_no": day_no, "start_min": start_min, "end_min": end_min})
 
 def delete_schedule(schedule_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("DELETE FROM schedules WHERE id=%s", (schedule_id,))
-        conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM schedules WHERE id=%s", (schedule_id,))
+            conn.commit()
+    schedule_index.remove(schedule_id)
+
+# Scans are matched to the class running at scan time without a query.
+schedule_index = ScheduleIndex(get_schedules)
 
 # ---------------- STUDENTS ----------------
 def add_student(student_id, last_name, first_name, middle_name, year_section, class_name, school_year_id, section_id=None):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            INSERT INTO students (student_id, last_name, first_name, middle_name, year_section, class, school_year_id, section_id)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-        """, (student_id, last_name, first_name, middle_name, year_section, class_name, school_year_id, section_id))
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO students (student_id, last_name, first_name, middle_name, year_section, class, school_year_id, section_id)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+            """, (student_id, last_name, first_name, middle_name, year_section, class_name, school_year_id, section_id))
+            conn.commit()
+
+def add_students_batch(rows):
+    """Insert many students in one transaction.
+
+    `rows` are (student_id, last_name, first_name, middle_name,
+    year_section, class_name, school_year_id, section_id) tuples, the
+    arguments of add_student().
+    """
+    if not rows:
+        return
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.executemany("""
+                INSERT INTO students (student_id, last_name, first_name, middle_name, year_section, class, school_year_id, section_id)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+            """, rows)
         conn.commit()
-    finally:
-        cur.close()
-        conn.close()
+
+def get_student_ids():
+    """Set of every enrolled student_id."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT student_id FROM students")
+            return {r["student_id"] for r in cur.fetchall()}
 
 def get_students(section_filter=None):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        if section_filter:
-            cur.execute("SELECT * FROM students WHERE year_section = %s", (section_filter,))
-        else:
-            cur.execute("SELECT * FROM students")
-        return cur.fetchall()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            if section_filter:
+                cur.execute("SELECT * FROM students WHERE year_section = %s", (section_filter,))
+            else:
+                cur.execute("SELECT * FROM students")
+            return cur.fetchall()
+
+def get_student(student_id):
+    """One student as {id, last, first, year_section, section_id}, or None."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT student_id AS id, last_name AS last, first_name AS first, year_section, section_id
+                FROM students WHERE student_id = %s
+            """, (student_id,))
+            return cur.fetchone()
 
 def get_students_by_section(section_id):
     """Return all students belonging to a section (by section_id)."""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT * FROM students WHERE section_id = %s", (section_id,))
-        return cur.fetchall()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT * FROM students WHERE section_id = %s", (section_id,))
+            return cur.fetchall()
 
 # ---------------- ATTENDANCE ----------------
 def add_attendance(student_id, year_section, status):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            INSERT INTO attendance_log (student_id, year_section, datetime, status)
-            VALUES (%s,%s,%s,%s)
-        """, (student_id, year_section, datetime.now(), status))
+    add_attendance_batch([(uuid.uuid4().hex, student_id, year_section, datetime.now(), status)])
+
+def add_attendance_batch(records):
+    """Insert many attendance rows in a single transaction.
+
+    `records` is a sequence of (scan_uuid, student_id, year_section,
+    datetime, status) tuples. Either every row is committed or none is.
+    Each row is stamped with the student's section_id and school_year_id
+    so reports can filter on indexed ids, and with the class it belongs to
+    (schedule_index: running at scan time, or starting within
+    EARLY_MINUTES); scans into a class are marked Present or Late against
+    its start here, where the student's section is known (attendance_status).
+
+    Rows whose scan_uuid is already stored are skipped, so replaying the
+    same batch twice is harmless; so is a repeat of a student's scan for
+    the same class from any kiosk (uq_attendance_once). Returns a list
+    aligned with `records` of the rows as stored: for a skipped repeat that
+    is the earlier row kept for the class (another scan_uuid), or None if it
+    cannot be found.
+    """
+    if not records:
+        return []
+    schedule_index.ensure_loaded()  # before checking out a connection; the load needs its own
+    with connection() as conn:
+        with conn.cursor() as cur:
+            student_ids = sorted({r[1] for r in records})
+            cur.execute(
+                "SELECT student_id, section_id, school_year_id FROM students WHERE student_id IN ({})".format(
+                    ",".join(["%s"] * len(student_ids))),
+                student_ids
+            )
+            placement = {s["student_id"]: (s["section_id"], s["school_year_id"]) for s in cur.fetchall()}
+
+            cur.execute("SELECT scan_uuid FROM attendance_log WHERE scan_uuid IN ({})".format(
+                ",".join(["%s"] * len(records))), [r[0] for r in records])
+            replayed = {s["scan_uuid"] for s in cur.fetchall()}
+
+            rows = []
+            for scan_uuid, student_id, year_section, when, status in records:
+                section_id, school_year_id = placement.get(student_id, (None, None))
+                schedule_id = schedule_index.resolve(section_id, when)
+                if status in SCAN_STATUSES and schedule_id is not None:
+                    status = classify(when, schedule_index.start_minute(schedule_id))
+                rows.append((scan_uuid, student_id, year_section, section_id, school_year_id, when, status,
+                             schedule_id, schedule_id))
+            cur.executemany("""
+                INSERT INTO attendance_log (scan_uuid, student_id, year_section, section_id, school_year_id, datetime, status,
+                                            schedule_id, once_key)
+                VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+                ON DUPLICATE KEY UPDATE id = id
+            """, rows)
+            stored = _stored_scans(cur, rows)
+            _add_to_daily_rollup(cur, [(r[5].date(), r[3], r[4], r[6], 1) for r, s in zip(rows, stored)
+                                       if s and s[0] == r[0] and r[0] not in replayed])
+        conn.commit()
+    return stored
+
+def _stored_scans(cur, rows):
+    """The attendance_log row kept for each row add_attendance_batch inserted, as a record tuple.
+
+    Rows are looked up by scan_uuid; a class scan that was skipped as a
+    repeat is matched to the row holding its uq_attendance_once slot, with a
+    locking read so that rows committed by other kiosks during this
+    transaction are seen.
+    """
+    select = "SELECT scan_uuid, student_id, year_section, datetime, status, scan_day, once_key FROM attendance_log"
+    cur.execute(select + " WHERE scan_uuid IN ({})".format(",".join(["%s"] * len(rows))), [r[0] for r in rows])
+    by_uuid = {s["scan_uuid"]: s for s in cur.fetchall()}
+    repeats = [r for r in rows if r[0] not in by_uuid and r[8] is not None]
+    kept = {}
+    if repeats:
+        params = []
+        for r in repeats:
+            params += [r[1], r[5].date(), r[8]]
+        cur.execute(select + " WHERE " + " OR ".join(["(student_id = %s AND scan_day = %s AND once_key = %s)"] * len(repeats))
+                    + " LOCK IN SHARE MODE", params)
+        kept = {(s["student_id"], s["scan_day"], s["once_key"]): s for s in cur.fetchall()}
+    stored = []
+    for r in rows:
+        s = by_uuid.get(r[0]) or kept.get((r[1], r[5].date(), r[8]))
+        stored.append((s["scan_uuid"], s["student_id"], s["year_section"], s["datetime"], s["status"]) if s else None)
+    return stored
+
+def add_absences(classes, early_minutes=EARLY_MINUTES):
+    """Insert an Absent row for every enrolled student who did not scan for a class.
+
+    `classes` is a sequence of (schedule_id, section_id, start, end)
+    datetimes. Each class is one INSERT ... SELECT anti-join of the section
+    roster against the scans for that class (or outside any class) from
+    `early_minutes` before the start until the end, so students who
+    scanned, or were marked by an earlier run, are skipped; a scan for the
+    class just before does not count. Scans are tagged with a class from
+    EARLY_MINUTES before its start too (schedule_index), so the two agree.
+    Absent rows are stamped with the class start. All classes are written
+    in one transaction; returns the number of rows inserted.
+    """
+    if not classes:
+        return 0
+    inserted, counts = 0, []
+    with connection() as conn:
+        with conn.cursor() as cur:
+            section_ids = sorted({c[1] for c in classes})
+            cur.execute("SELECT id, school_year_id FROM sections WHERE id IN ({})".format(
+                ",".join(["%s"] * len(section_ids))), section_ids)
+            years = {s["id"]: s["school_year_id"] for s in cur.fetchall()}
+            for schedule_id, section_id, start, end in classes:
+                added = cur.execute("""
+                    INSERT INTO attendance_log (scan_uuid, student_id, year_section, section_id, school_year_id,
+                                                datetime, status, schedule_id, once_key)
+                    SELECT REPLACE(UUID(), '-', ''), st.student_id, st.year_section, st.section_id, st.school_year_id,
+                           %s, 'Absent', %s, %s
+                    FROM students st
+                    WHERE st.section_id = %s
+                      AND NOT EXISTS (
+                          SELECT 1 FROM attendance_log a
+                          WHERE a.student_id = st.student_id AND a.datetime >= %s AND a.datetime < %s
+                            AND (a.schedule_id = %s OR a.schedule_id IS NULL)
+                      )
+                    ON DUPLICATE KEY UPDATE attendance_log.id = attendance_log.id
+                """, (start, schedule_id, schedule_id, section_id, start - timedelta(minutes=early_minutes), end,
+                      schedule_id))
+                inserted += added
+                counts.append((start.date(), section_id, years.get(section_id), "Absent", added))
+            _add_to_daily_rollup(cur, [c for c in counts if c[4]])
+        conn.commit()
+    return inserted
+
+ATTENDANCE_SELECT = """
+    SELECT a.id, a.student_id, st.last_name AS last, st.first_name AS first,
+           a.year_section, a.datetime, a.status
+    FROM attendance_log a
+    LEFT JOIN students st ON st.student_id = a.student_id
+"""
+
+def get_attendance(section_filter=None, before=None, limit=None):
+    """Return attendance rows, newest first.
+
+    Pass `limit` to get one page; to get the next page pass the
+    (datetime, id) of the last row already shown as `before` (keyset
+    pagination, so deep pages cost the same as the first one).
+    """
+    sql = ATTENDANCE_SELECT + " WHERE 1=1"
+    params = []
+    if section_filter:
+        sql += " AND a.year_section = %s"
+        params.append(section_filter)
+    if before:
+        before_dt, before_id = before
+        sql += " AND (a.datetime < %s OR (a.datetime = %s AND a.id < %s))"
+        params += [before_dt, before_dt, before_id]
+    sql += " ORDER BY a.datetime DESC, a.id DESC"
+    if limit:
+        sql += " LIMIT %s"
+        params.append(limit)
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, tuple(params))
+            return cur.fetchall()
+
+def get_attendance_since(after_id, section_filter=None, limit=500):
+    """Return attendance rows with id greater than `after_id`, oldest first.
+
+    Used as a high-water-mark poll: callers remember the largest id they
+    have shown and ask only for what was inserted after it. Ids are not
+    committed in order, so callers re-ask from a little below the mark for
+    ids that were skipped (see AttendanceTab._prepend_new).
+    """
+    sql = ATTENDANCE_SELECT + " WHERE a.id > %s"
+    params = [after_id or 0]
+    if section_filter:
+        sql += " AND a.year_section = %s"
+        params.append(section_filter)
+    sql += " ORDER BY a.id LIMIT %s"
+    params.append(limit)
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, tuple(params))
+            return cur.fetchall()
+
+def _attendance_where(section_filter=None, section_id=None, school_year_id=None, start=None, end=None):
+    """WHERE clause (and params) over attendance_log for the usual filters.
+
+    Dates are a half-open datetime range [start, end) compared directly
+    against the datetime column, so MySQL can use the (section_id, datetime)
+    / (school_year_id, datetime) indexes.
+    """
+    sql = " WHERE 1=1"
+    params = []
+    if section_filter:
+        sql += " AND a.year_section = %s"
+        params.append(section_filter)
+    if section_id:
+        sql += " AND a.section_id = %s"
+        params.append(section_id)
+    if school_year_id:
+        sql += " AND a.school_year_id = %s"
+        params.append(school_year_id)
+    if start:
+        sql += " AND a.datetime >= %s"
+        params.append(start)
+    if end:
+        sql += " AND a.datetime < %s"
+        params.append(end)
+    return sql, params
+
+def get_attendance_report(section_id=None, school_year_id=None, start=None, end=None):
+    """Return attendance rows for a report, newest first."""
+    where, params = _attendance_where(section_id=section_id, school_year_id=school_year_id, start=start, end=end)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(ATTENDANCE_SELECT + where + " ORDER BY a.datetime DESC, a.id DESC", tuple(params))
+            return cur.fetchall()
+
+def iter_attendance(chunk_size=1000, **filters):
+    """Yield attendance rows in lists of up to chunk_size, newest first.
+
+    Uses an unbuffered server-side cursor, so memory stays constant no matter
+    how many rows match. Accepts the same filters as _attendance_where.
+    """
+    where, params = _attendance_where(**filters)
+    with connection() as conn:
+        cur = conn.cursor(pymysql.cursors.SSDictCursor)
+        try:
+            cur.execute(ATTENDANCE_SELECT + where + " ORDER BY a.datetime DESC, a.id DESC", tuple(params))
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+            cur.close()
+        except GeneratorExit:
+            # Abandoned mid-stream: dropping the connection is cheaper than
+            # draining the rest of the result; the pool will not reuse it.
+            conn.close()
+            raise
+
+# ---------------- DAILY ROLLUP ----------------
+# attendance_daily holds COUNT(*) per day x section x status. Section 0
+# collects rows whose student has no section.
+ROLLUP_SELECT = """
+    SELECT DATE(a.datetime), COALESCE(a.section_id, 0), MAX(a.school_year_id), a.status, COUNT(*)
+    FROM attendance_log a
+"""
+
+def _add_to_daily_rollup(cur, increments):
+    """Add (day, section_id, school_year_id, status, count) increments of newly inserted rows.
+
+    Runs inside the caller's transaction as one statement, with the rollup
+    rows in primary-key order so that concurrent writers lock them in the
+    same order. Unlike a recount it reads nothing from attendance_log, so it
+    takes no shared locks on other writers' scans.
+    """
+    totals = {}
+    for day, section_id, school_year_id, status, count in increments:
+        key = (day, section_id or 0, status)
+        year, total = totals.get(key, (None, 0))
+        totals[key] = (school_year_id or year, total + count)
+    if not totals:
+        return
+    params = []
+    for (day, section_id, status), (school_year_id, total) in sorted(totals.items()):
+        params += [day, section_id, school_year_id, status, total]
+    cur.execute("""
+        INSERT INTO attendance_daily (day, section_id, school_year_id, status, total)
+        VALUES """ + ",".join(["(%s,%s,%s,%s,%s)"] * len(totals)) + """
+        ON DUPLICATE KEY UPDATE total = total + VALUES(total),
+                                school_year_id = COALESCE(VALUES(school_year_id), school_year_id)
+    """, params)
+
+def rebuild_daily_rollup(start_day=None, end_day=None):
+    """Rebuild attendance_daily from scratch, or only for days in [start_day, end_day)."""
+    with connection() as conn:
+        with conn.cursor() as cur:
+            _rebuild_daily_rollup(cur, start_day, end_day)
+        conn.commit()
+
+def _rebuild_daily_rollup(cur, start_day=None, end_day=None):
+    rollup_filter, log_filter, params = "", "", []
+    if start_day:
+        rollup_filter += " AND day >= %s"
+        log_filter += " AND a.datetime >= %s"
+        params.append(start_day)
+    if end_day:
+        rollup_filter += " AND day < %s"
+        log_filter += " AND a.datetime < %s"
+        params.append(end_day)
+    cur.execute("DELETE FROM attendance_daily WHERE 1=1" + rollup_filter, params)
+    cur.execute("INSERT INTO attendance_daily (day, section_id, school_year_id, status, total)"
+                + ROLLUP_SELECT + " WHERE 1=1" + log_filter
+                + " GROUP BY DATE(a.datetime), COALESCE(a.section_id, 0), a.status", params)
+
+def reclassify_attendance(start_day, end_day):
+    """Recompute Present/Late for the class scans of days in [start_day, end_day)
+    with the current GRACE_MINUTES (the rule of attendance_status.classify).
+
+    One UPDATE joined to schedules over the indexed datetime range, then the
+    rollup of those days is rebuilt, all in one transaction. Returns the
+    number of rows whose status changed.
+    """
+    with connection() as conn:
+        with conn.cursor() as cur:
+            changed = cur.execute("""
+                UPDATE attendance_log a
+                JOIN schedules s ON s.id = a.schedule_id
+                SET a.status = IF(HOUR(a.datetime) * 60 + MINUTE(a.datetime) > s.start_min + %s, 'Late', 'Present')
+                WHERE a.datetime >= %s AND a.datetime < %s
+                  AND a.status IN ('Present', 'Late') AND s.start_min IS NOT NULL
+            """, (GRACE_MINUTES, start_day, end_day))
+            _rebuild_daily_rollup(cur, start_day, end_day)
         conn.commit()
-    finally:
-        cur.close()
-        conn.close()
-
-def get_attendance(section_filter=None):
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        if section_filter:
-            cur.execute("SELECT * FROM attendance_log WHERE year_section = %s", (section_filter,))
-        else:
-            cur.execute("SELECT * FROM attendance_log")
-        return cur.fetchall()
-    finally:
-        cur.close()
-        conn.close()
+    return changed
+
+def get_attendance_summary(section_id=None, school_year_id=None, start_day=None, end_day=None):
+    """Return {status: count} from the daily rollup for days in [start_day, end_day)."""
+    sql = "SELECT status, SUM(total) AS total FROM attendance_daily WHERE 1=1"
+    params = []
+    if section_id:
+        sql += " AND section_id = %s"
+        params.append(section_id)
+    if school_year_id:
+        sql += " AND school_year_id = %s"
+        params.append(school_year_id)
+    if start_day:
+        sql += " AND day >= %s"
+        params.append(start_day)
+    if end_day:
+        sql += " AND day < %s"
+        params.append(end_day)
+    sql += " GROUP BY status"
+
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(sql, tuple(params))
+            return {r["status"]: int(r["total"]) for r in cur.fetchall()}
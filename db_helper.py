@@ -1,116 +1,115 @@
-import pymysql
-
-from data import fingerprints
-
-
-def get_connection():
-    """Establishes a connection to the MySQL database."""
-    try:
-        return pymysql.connect(
-            host="localhost",  # Your MySQL hostname
-            user="cas_user",  # Your MySQL username
-            password="Ccs@1234",  # Your MySQL password
-            database="cas_attendance",  # Database name
-            cursorclass=pymysql.cursors.DictCursor  # Always return dict rows
-        )
-    except pymysql.MySQLError as e:
-        print(f"Error connecting to the database: {e}")
-        raise
+# Connection settings live in database.py only; get_connection is re-exported for old callers.
+from database import connection, get_connection, ref_cache  # shared connection pool
+from fp_lsh import check_enrollment, enrolled_index
+from fp_match import TEMPLATE_DIM
+from template_store import templates
 
 def add_school_year(year_name):
     """Adds a new school year to the database."""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO school_years (year_name) VALUES (%s)", (year_name,))
-        conn.commit()
-    except Exception as e:
-        print(f"Error adding school year: {e}")
-        conn.rollback()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                cur.execute("INSERT INTO school_years (year_name) VALUES (%s)", (year_name,))
+                conn.commit()
+            except Exception as e:
+                print(f"Error adding school year: {e}")
+                conn.rollback()
+    ref_cache.invalidate_years()
 
 def add_section(name, school_year_id):
     """Adds a new section for a specific school year."""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("INSERT INTO sections (name, school_year_id) VALUES (%s, %s)", (name, school_year_id))
-        conn.commit()
-    except Exception as e:
-        print(f"Error adding section: {e}")
-        conn.rollback()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                cur.execute("INSERT INTO sections (name, school_year_id) VALUES (%s, %s)", (name, school_year_id))
+                conn.commit()
+            except Exception as e:
+                print(f"Error adding section: {e}")
+                conn.rollback()
+    ref_cache.invalidate_sections()
 
 def add_schedule(subject, instructor, day, start_time, end_time, room, section_name, school_year_id):
     """Adds a new schedule to the database."""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            INSERT INTO schedules (subject, instructor, day, start_time, end_time, room, section_id, school_year_id)
-            VALUES (%s,%s,%s,%s,%s,%s,
-                    (SELECT id FROM sections WHERE name=%s AND school_year_id=%s LIMIT 1),
-                    %s)
-        """, (subject, instructor, day, start_time, end_time, room, section_name, school_year_id, school_year_id))
-        conn.commit()
-    except Exception as e:
-        print(f"Error adding schedule: {e}")
-        conn.rollback()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                cur.execute("""
+                    INSERT INTO schedules (subject, instructor, day, start_time, end_time, room, section_id, school_year_id)
+                    VALUES (%s,%s,%s,%s,%s,%s,
+                            (SELECT id FROM sections WHERE name=%s AND school_year_id=%s LIMIT 1),
+                            %s)
+                """, (subject, instructor, day, start_time, end_time, room, section_name, school_year_id, school_year_id))
+                conn.commit()
+            except Exception as e:
+                print(f"Error adding schedule: {e}")
+                conn.rollback()
 
 def add_student(student_id, last_name, first_name, middle_name, year_section, class_name):
     """Adds a new student to the database."""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("""
-            INSERT INTO students (student_id, last_name, first_name, middle_name, year_section, class)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (student_id, last_name, first_name, middle_name, year_section, class_name))
-        conn.commit()
-    except Exception as e:
-        print(f"Error adding student: {e}")
-        conn.rollback()
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            try:
+                cur.execute("""
+                    INSERT INTO students (student_id, last_name, first_name, middle_name, year_section, class)
+                    VALUES (%s, %s, %s, %s, %s, %s)
+                """, (student_id, last_name, first_name, middle_name, year_section, class_name))
+                conn.commit()
+            except Exception as e:
+                print(f"Error adding student: {e}")
+                conn.rollback()
 
 def get_school_years():
     """Fetches all school years from the database."""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        cur.execute("SELECT id, year_name FROM school_years ORDER BY year_name DESC")
-        result = cur.fetchall()
-        return result  # Return the result as a list of dictionaries
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, year_name FROM school_years ORDER BY year_name DESC")
+            result = cur.fetchall()
+            return result  # Return the result as a list of dictionaries
 
 def get_sections(school_year_id=None):
     """Fetches sections, optionally filtered by school year ID."""
-    conn = get_connection()
-    cur = conn.cursor()
-    try:
-        if school_year_id:
-            cur.execute("SELECT id, name FROM sections WHERE school_year_id=%s", (school_year_id,))
-        else:
-            cur.execute("SELECT id, name FROM sections")
-        result = cur.fetchall()
-        return result
-    finally:
-        cur.close()
-        conn.close()
+    with connection() as conn:
+        with conn.cursor() as cur:
+            if school_year_id:
+                cur.execute("SELECT id, name FROM sections WHERE school_year_id=%s", (school_year_id,))
+            else:
+                cur.execute("SELECT id, name FROM sections")
+            result = cur.fetchall()
+            return result
+
+def register_fingerprint(student_id, fingerprint_data, section_id=None, allow_duplicate=False):
+    """Registers a fingerprint for a student.
 
-def register_fingerprint(student_id, fingerprint_data):
-    """Registers a fingerprint for a student."""
-    # In this case, we store fingerprint data in memory (as a dictionary)
-    # Ideally, you should store fingerprint data in a secure manner (database or specialized storage)
-    fingerprints[student_id] = fingerprint_data
+    Raises fp_lsh.DuplicateFingerprint if the finger looks like one already
+    enrolled for another student, unless `allow_duplicate` is set;
+    ValueError for an unusable template or student_id; database errors as
+    they come. Nothing is stored when it raises.
+    """
+    if not allow_duplicate:
+        check_enrollment(student_id, fingerprint_data)
+    # The template goes to the memory-mapped store, which the kiosk's match
+    # workers re-read when it changes; the database keeps the metadata. The
+    # metadata row is written first and committed only once the template is
+    # stored, and the old template is put back if the commit fails.
+    store = templates.open()
+    previous = store.template(student_id)
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO fingerprint_templates (student_id, section_id, template_dim)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE section_id = VALUES(section_id), template_dim = VALUES(template_dim),
+                                        updated_at = CURRENT_TIMESTAMP
+            """, (student_id, section_id, TEMPLATE_DIM))
+        store.append(student_id, fingerprint_data, section_id)
+        try:
+            conn.commit()
+        except Exception:
+            if previous is None:
+                store.remove(student_id)
+            else:
+                store.append(student_id, previous, section_id)
+            raise
+    enrolled_index().add(student_id, fingerprint_data)
+    store.maybe_compact()
     print(f"Fingerprint registered for student ID: {student_id}")
@@ -0,0 +1,169 @@
+# db_pool.py
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of pymysql connections.
+
+    Idle connections are reused LIFO, pinged before reuse if they have been
+    idle longer than `health_check_after` seconds, and closed once they have
+    been idle longer than `idle_timeout` seconds.
+    """
+
+    def __init__(self, connect, max_size=5, idle_timeout=300, health_check_after=30, checkout_timeout=10):
+        self._connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_after = health_check_after
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()   # [(conn, last_used)]
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        # counters
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.evicted = 0
+        self.failed_health_checks = 0
+
+    # ---------------- checkout / checkin ----------------
+    def acquire(self, timeout=None):
+        """Check out a connection, creating one if the pool is below max_size."""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._evict_idle()
+            waited_since = None
+            while not self._idle and self._in_use >= self.max_size:
+                if waited_since is None:
+                    waited_since = time.monotonic()
+                    self.waits += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.wait_time += time.monotonic() - waited_since
+                    raise PoolTimeout(f"No database connection available after {timeout}s.")
+                self._cond.wait(remaining)
+            if waited_since is not None:
+                self.wait_time += time.monotonic() - waited_since
+
+            entry = self._idle.pop() if self._idle else None
+            self._in_use += 1
+
+        if entry:
+            conn, last_used = entry
+            if self._is_healthy(conn, last_used):
+                with self._cond:
+                    self.hits += 1
+                return conn
+            with self._cond:
+                self.failed_health_checks += 1
+            self._close_quietly(conn)
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.misses += 1
+        return conn
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, ending any open transaction first."""
+        if not discard:
+            try:
+                if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        if discard:
+            self._close_quietly(conn)
+        with self._cond:
+            self._in_use -= 1
+            if not discard:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager yielding a pooled connection.
+
+        On an exception the transaction is rolled back; connections that fail
+        with an operational (network) error are discarded instead of reused.
+        """
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        except pymysql.err.OperationalError:
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    # ---------------- maintenance ----------------
+    def _is_healthy(self, conn, last_used):
+        if not conn.open:
+            return False
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self):
+        """Close idle connections past idle_timeout. Caller holds the lock."""
+        now = time.monotonic()
+        # oldest entries sit at the left end
+        while self._idle and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self.evicted += 1
+            self._close_quietly(conn)
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)."""
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.popleft()
+                self._close_quietly(conn)
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        """Return a snapshot of the pool counters."""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "wait_time": round(self.wait_time, 4),
+                "evicted": self.evicted,
+                "failed_health_checks": self.failed_health_checks,
+            }
@@ -1,4 +1,10 @@
 import DigitalPersonaSDK  # Assuming the SDK is installed
+import numpy as np
+
+from fp_features import extract_template
+
+# Raw frame size (height, width) of the reader in use; adjust for other models
+SCANNER_SHAPE = (392, 357)
 
 # Capture Fingerprint
 def capture_fingerprint():
@@ -6,8 +12,14 @@ def capture_fingerprint():
     fingerprint_data = DigitalPersonaSDK.capture_fingerprint()  # Replace with actual method to capture fingerprint
     return fingerprint_data
 
+# Capture an image and turn it into a matchable template
+def capture_template():
+    raw = capture_fingerprint()  # 8-bit grayscale pixels
+    image = np.frombuffer(raw, dtype=np.uint8).reshape(SCANNER_SHAPE)
+    return extract_template(image)
+
 # Register Fingerprint in the database
-def register_fingerprint_with_sdk(student_id):
-    fingerprint_data = capture_fingerprint()
+def register_fingerprint_with_sdk(student_id, section_id=None):
+    template = capture_template()
     from db_helper import register_fingerprint  # Import the function from db_helper
-    register_fingerprint(student_id, fingerprint_data)
+    register_fingerprint(student_id, template, section_id)
@@ -0,0 +1,324 @@
+# fp_features.py
+"""Fingerprint images -> compact templates.
+
+Every stage works on a whole batch of grayscale images at once, an
+(N, H, W) array, with no per-pixel Python loops:
+
+1. normalize    zero mean / unit variance per image, foreground mask from block variance
+2. orientation  Sobel gradients averaged per 16x16 block (doubled-angle vectors, smoothed)
+3. enhance      Gabor filter bank applied by FFT; each pixel keeps the response of
+                the filter tuned to its block's orientation
+4. minutiae     binarize, Zhang-Suen thinning, crossing number (endings, bifurcations)
+5. template     minutiae histogram over a 4x4 grid of the finger area x 8 ridge
+                directions x 2 types = 256 values (fp_match.TEMPLATE_DIM)
+
+Benchmark:        python fp_features.py --bench [batch size]
+Section re-enroll: python fp_features.py --reenroll SECTION_ID DIR
+                   (DIR holds <student_id>.npy or binary .pgm images)
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from fp_match import TEMPLATE_DIM
+
+BLOCK = 16              # orientation / mask block size in pixels
+RIDGE_FREQ = 1 / 9      # ridges per pixel at 500 dpi
+GABOR_SIGMA = 4.0
+ORIENTATIONS = 8        # Gabor bank size and direction bins of the template
+GRID = 4                # template cells per side
+MIN_BLOCK_STD = 0.35    # normalized block std below which a block is background
+_kernel_cache = {}
+
+
+# ---------------- 1. normalization ----------------
+def normalize(images):
+    """(normalized float32 images, block foreground mask) for an (N, H, W) batch.
+
+    Images are cropped to a multiple of BLOCK.
+    """
+    images = np.asarray(images, dtype=np.float32)
+    if images.ndim == 2:
+        images = images[None]
+    n, h, w = images.shape
+    images = images[:, :h - h % BLOCK, :w - w % BLOCK]
+    mean = images.mean(axis=(1, 2), keepdims=True)
+    std = images.std(axis=(1, 2), keepdims=True)
+    norm = (images - mean) / np.where(std == 0, 1, std)
+    mask = _blocks(norm, np.std) > MIN_BLOCK_STD
+    return norm, mask
+
+
+def _blocks(images, reduce):
+    n, h, w = images.shape
+    return reduce(images.reshape(n, h // BLOCK, BLOCK, w // BLOCK, BLOCK), axis=(2, 4))
+
+
+def _box3(a):
+    """3x3 box sum over the last two axes."""
+    p = np.pad(a, ((0, 0), (1, 1), (1, 1)), mode="edge")
+    return sum(p[:, i:i + a.shape[1], j:j + a.shape[2]] for i in range(3) for j in range(3))
+
+
+# ---------------- 2. orientation field ----------------
+def orientation_field(norm):
+    """Per-block gradient (ridge normal) direction in [0, pi)."""
+    p = np.pad(norm, ((0, 0), (1, 1), (1, 1)), mode="edge")
+    gx = (p[:, :-2, 2:] + 2 * p[:, 1:-1, 2:] + p[:, 2:, 2:]) - (p[:, :-2, :-2] + 2 * p[:, 1:-1, :-2] + p[:, 2:, :-2])
+    gy = (p[:, 2:, :-2] + 2 * p[:, 2:, 1:-1] + p[:, 2:, 2:]) - (p[:, :-2, :-2] + 2 * p[:, :-2, 1:-1] + p[:, :-2, 2:])
+    gxx, gyy, gxy = _blocks(gx * gx, np.sum), _blocks(gy * gy, np.sum), _blocks(gx * gy, np.sum)
+    # doubled-angle vectors average without the 0/pi wrap-around problem
+    cos2, sin2 = _box3(gxx - gyy), _box3(2 * gxy)
+    return (0.5 * np.arctan2(sin2, cos2)) % np.pi
+
+
+# ---------------- 3. ridge enhancement ----------------
+def _gabor_bank(h, w):
+    """FFTs of ORIENTATIONS even-symmetric Gabor kernels laid out for an h x w image."""
+    key = (h, w)
+    if key not in _kernel_cache:
+        ys = (np.arange(h) + h // 2) % h - h // 2   # wrapped coordinates, kernel centred on (0, 0)
+        xs = (np.arange(w) + w // 2) % w - w // 2
+        y, x = np.meshgrid(ys, xs, indexing="ij")
+        support = (np.abs(x) <= 3 * GABOR_SIGMA) & (np.abs(y) <= 3 * GABOR_SIGMA)
+        envelope = np.exp(-(x * x + y * y) / (2 * GABOR_SIGMA ** 2)) * support
+        bank = []
+        for k in range(ORIENTATIONS):
+            phi = np.pi * k / ORIENTATIONS
+            kernel = envelope * np.cos(2 * np.pi * RIDGE_FREQ * (x * np.cos(phi) + y * np.sin(phi)))
+            kernel[support] -= kernel[support].mean()   # no DC response
+            bank.append(np.fft.rfft2(kernel).astype(np.complex64))
+        _kernel_cache[key] = bank
+    return _kernel_cache[key]
+
+
+def enhance(norm, orientation):
+    """Gabor-filtered images: each pixel takes the filter matching its block orientation."""
+    n, h, w = norm.shape
+    bins = np.rint(orientation / np.pi * ORIENTATIONS).astype(np.int64) % ORIENTATIONS
+    bins = np.repeat(np.repeat(bins, BLOCK, axis=1), BLOCK, axis=2)
+    spectrum = np.fft.rfft2(norm)
+    out = np.zeros_like(norm)
+    for k, kernel in enumerate(_gabor_bank(h, w)):
+        selected = bins == k
+        if selected.any():
+            response = np.fft.irfft2(spectrum * kernel, s=(h, w))
+            out[selected] = response[selected]
+    return out
+
+
+# ---------------- 4. minutiae ----------------
+def _neighbours(img):
+    """P2..P9 (N, NE, E, SE, S, SW, W, NW) of every pixel, as uint8 arrays."""
+    p = np.pad(img, ((0, 0), (1, 1), (1, 1)))
+    h, w = img.shape[1:]
+    at = lambda dy, dx: p[:, 1 + dy:1 + dy + h, 1 + dx:1 + dx + w]
+    return [at(-1, 0), at(-1, 1), at(0, 1), at(1, 1), at(1, 0), at(1, -1), at(0, -1), at(-1, -1)]
+
+
+def thin(binary, max_iter=40):
+    """Zhang-Suen thinning of a batch of binary images to 1-pixel skeletons."""
+    img = binary.astype(np.uint8)
+    for _ in range(max_iter):
+        changed = False
+        for step in (0, 1):
+            p2, p3, p4, p5, p6, p7, p8, p9 = _neighbours(img)
+            b = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9
+            seq = (p2, p3, p4, p5, p6, p7, p8, p9, p2)
+            a = sum(((seq[i] == 0) & (seq[i + 1] == 1)).astype(np.uint8) for i in range(8))
+            if step == 0:
+                c = (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+            else:
+                c = (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+            remove = (img == 1) & (b >= 2) & (b <= 6) & (a == 1) & c
+            if remove.any():
+                img[remove] = 0
+                changed = True
+        if not changed:
+            break
+    return img.astype(bool)
+
+
+def minutiae(skeleton, mask):
+    """Boolean maps (endings, bifurcations) from crossing numbers, inside the eroded foreground."""
+    nb = [x.astype(np.int8) for x in _neighbours(skeleton.astype(np.uint8))]
+    cn = sum(np.abs(nb[i] - nb[(i + 1) % 8]) for i in range(8)) // 2
+    # drop one block around the foreground edge, where ridges end artificially
+    inner = _box3(mask.astype(np.int8)) == 9
+    inner = np.repeat(np.repeat(inner, BLOCK, axis=1), BLOCK, axis=2)
+    core = skeleton & inner
+    return core & (cn == 1), core & (cn == 3)
+
+
+# ---------------- 5. template ----------------
+def templates_from_minutiae(endings, bifurcations, orientation, mask):
+    """(N, TEMPLATE_DIM) float32 histograms over grid cell x ridge direction x type."""
+    n = len(mask)
+    out = np.zeros((n, GRID * GRID * ORIENTATIONS * 2), dtype=np.float32)
+    # grid over each finger's foreground bounding box (tolerates translation)
+    rows, cols = mask.any(axis=2), mask.any(axis=1)
+    top, bottom = rows.argmax(axis=1), rows.shape[1] - rows[:, ::-1].argmax(axis=1)
+    left, right = cols.argmax(axis=1), cols.shape[1] - cols[:, ::-1].argmax(axis=1)
+    ridge_dir = (orientation + np.pi / 2) % np.pi
+    for kind, points in enumerate((endings, bifurcations)):
+        idx, y, x = np.nonzero(points)
+        by, bx = y // BLOCK, x // BLOCK
+        cy = np.clip((by - top[idx]) * GRID // np.maximum(bottom[idx] - top[idx], 1), 0, GRID - 1)
+        cx = np.clip((bx - left[idx]) * GRID // np.maximum(right[idx] - left[idx], 1), 0, GRID - 1)
+        d = (ridge_dir[idx, by, bx] / np.pi * ORIENTATIONS).astype(np.int64) % ORIENTATIONS
+        np.add.at(out, (idx, ((cy * GRID + cx) * ORIENTATIONS + d) * 2 + kind), 1)
+    out = np.sqrt(out)   # damp cells with many spurious minutiae
+    norms = np.linalg.norm(out, axis=1, keepdims=True)
+    return out / np.where(norms == 0, 1, norms)
+
+
+def extract_templates(images, timings=None):
+    """Templates for an (N, H, W) batch of grayscale images (rows of zeros when no minutiae were found).
+
+    Pass a dict as `timings` to collect seconds spent per stage.
+    """
+    stages = {}
+    t = time.perf_counter()
+
+    def lap(name):
+        nonlocal t
+        now = time.perf_counter()
+        stages[name] = now - t
+        t = now
+
+    norm, mask = normalize(images); lap("normalize")
+    orientation = orientation_field(norm); lap("orientation")
+    enhanced = enhance(norm, orientation); lap("enhance")
+    ridges = (enhanced < 0) & np.repeat(np.repeat(mask, BLOCK, axis=1), BLOCK, axis=2)  # ridges are dark
+    skeleton = thin(ridges); lap("thinning")
+    endings, bifurcations = minutiae(skeleton, mask); lap("minutiae")
+    result = templates_from_minutiae(endings, bifurcations, orientation, mask); lap("template")
+    if timings is not None:
+        timings.update(stages)
+    assert result.shape[1] == TEMPLATE_DIM
+    return result
+
+
+def extract_template(image):
+    """Template of one image; raises ValueError if no minutiae were found."""
+    template = extract_templates(np.asarray(image)[None])[0]
+    if not template.any():
+        raise ValueError("no ridge detail found; please scan the finger again")
+    return template
+
+
+# ---------------- image files / synthetic data ----------------
+def load_image(path):
+    """Grayscale image from a .npy file or a binary (P5) .pgm file."""
+    if path.lower().endswith(".npy"):
+        return np.load(path)
+    with open(path, "rb") as f:
+        data = f.read()
+    fields, pos = [], 0
+    while len(fields) < 4:   # magic, width, height, maxval (comments skipped)
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b"#":
+            pos = data.index(b"\n", pos)
+            continue
+        end = pos
+        while not data[end:end + 1].isspace():
+            end += 1
+        fields.append(data[pos:end])
+        pos = end
+    if fields[0] != b"P5" or int(fields[3]) > 255:
+        raise ValueError(f"{path}: only 8-bit binary PGM images are supported")
+    w, h = int(fields[1]), int(fields[2])
+    return np.frombuffer(data, dtype=np.uint8, count=w * h, offset=pos + 1).reshape(h, w)
+
+
+def synthetic_images(n, shape=(256, 256), seed=0, capture=None, max_shift=0):
+    """Ridge-like test images: a smoothly varying orientation field, an oval finger area and noise.
+
+    The fingers depend on `seed` only; another `capture` seed gives a new
+    impression of the same fingers (fresh noise, shifted by up to `max_shift` pixels).
+    """
+    rng = np.random.default_rng(seed)
+    noise = rng if capture is None else np.random.default_rng([seed, capture])
+    h, w = shape
+    out = np.empty((n, h, w), dtype=np.uint8)
+    for i in range(n):
+        a, b, c = rng.uniform(0, np.pi), rng.uniform(20, 60), rng.uniform(20, 60)
+        dy, dx = noise.integers(-max_shift, max_shift + 1, 2) if max_shift else (0, 0)
+        y, x = np.mgrid[-dy:h - dy, -dx:w - dx].astype(np.float32)
+        theta = a + 0.6 * np.sin(x / b) + 0.6 * np.cos(y / c)
+        phase = x * np.cos(theta) + y * np.sin(theta)
+        ridges = np.cos(2 * np.pi * RIDGE_FREQ * phase + rng.uniform(0, 2 * np.pi))
+        finger = ((y - h / 2) / (0.45 * h)) ** 2 + ((x - w / 2) / (0.35 * w)) ** 2 < 1
+        img = np.where(finger, 128 + 90 * ridges, 230) + noise.normal(0, 12, shape)
+        out[i] = np.clip(img, 0, 255)
+    return out
+
+
+# ---------------- batch modes ----------------
+def reenroll_section(section_id, directory, batch_size=64):
+    """Re-extract and re-register the templates of a section's students from image files.
+
+    Returns (enrolled, problems) where problems is [(student_id, message)].
+    """
+    from database import get_students_by_section
+    from db_helper import register_fingerprint
+    from fp_lsh import DuplicateFingerprint
+
+    files = {os.path.splitext(name)[0]: os.path.join(directory, name)
+             for name in os.listdir(directory) if name.lower().endswith((".npy", ".pgm"))}
+    students = [s["student_id"] for s in get_students_by_section(section_id)]
+    problems = [(sid, "no image") for sid in students if sid not in files]
+    todo = [sid for sid in students if sid in files]
+
+    enrolled = 0
+    for start in range(0, len(todo), batch_size):
+        chunk = todo[start:start + batch_size]
+        images = {}
+        for sid in chunk:
+            try:
+                images[sid] = load_image(files[sid])
+            except Exception as e:
+                problems.append((sid, str(e)))
+        by_shape = {}   # a batch must share one image size
+        for sid, img in images.items():
+            by_shape.setdefault(img.shape, []).append(sid)
+        for ids in by_shape.values():
+            for sid, template in zip(ids, extract_templates(np.stack([images[s] for s in ids]))):
+                if not template.any():
+                    problems.append((sid, "no ridge detail found"))
+                    continue
+                try:
+                    register_fingerprint(sid, template, section_id)
+                except (DuplicateFingerprint, ValueError) as e:
+                    problems.append((sid, str(e)))
+                    continue
+                enrolled += 1
+    return enrolled, problems
+
+
+def _bench(batch):
+    images = synthetic_images(batch)
+    extract_templates(images[:2])   # builds the Gabor bank for this size
+    timings = {}
+    started = time.perf_counter()
+    templates = extract_templates(images, timings)
+    elapsed = time.perf_counter() - started
+    for name, secs in timings.items():
+        print(f"  {name:<12}{secs * 1000 / batch:8.2f} ms per finger")
+    print(f"{batch} images {images.shape[1]}x{images.shape[2]}: {elapsed * 1000 / batch:.1f} ms per finger, "
+          f"{int((templates > 0).sum(axis=1).mean())} non-empty cells per template")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 64)
+    elif len(sys.argv) == 4 and sys.argv[1] == "--reenroll":
+        count, issues = reenroll_section(int(sys.argv[2]), sys.argv[3])
+        for sid, msg in issues:
+            print(f"{sid}: {msg}")
+        print(f"{count} fingerprint(s) re-enrolled, {len(issues)} problem(s).")
+    else:
+        print(__doc__)
@@ -0,0 +1,172 @@
+# fp_lsh.py
+"""Duplicate-enrollment detection with locality-sensitive hashing.
+
+Templates are hashed with random-hyperplane signatures (SimHash) into
+several tables: fingers whose templates point in nearly the same direction
+share a bucket in at least one table with high probability, while
+unrelated ones rarely do. A lookup therefore only compares the template
+against the few enrollees in its buckets instead of everyone. Vectors are
+centred on the enrolled population's mean before hashing, since templates
+are non-negative histograms that would otherwise all sit in one orthant;
+the centre is recomputed, and everything rehashed, each time the
+population doubles, so an index started on an empty store stays selective.
+
+What counts as a duplicate is calibrated at the same time, against the
+scores between the enrolled (distinct) fingers: the threshold is set so
+that a new finger is flagged as someone else's with probability at most
+DUPLICATE_FMR (fp_match.impostor_threshold), never below DUPLICATE_THRESHOLD.
+
+Audit the whole store: python fp_lsh.py --audit
+"""
+import sys
+import threading
+
+import numpy as np
+
+from fp_match import TEMPLATE_DIM, as_template, impostor_threshold
+
+TABLES = 48   # more tables: better recall; more bits per table: smaller buckets
+BITS = 8
+DUPLICATE_THRESHOLD = 0.60   # lowest similarity ever reported as a duplicate
+DUPLICATE_FMR = 0.01         # accepted chance that a distinct new finger is flagged
+MIN_REBUILD = 16   # first re-centring of an index built on fewer enrollees
+
+
+class DuplicateFingerprint(Exception):
+    def __init__(self, student_id, matches, template=None):
+        self.student_id = student_id
+        self.matches = matches     # [(other student_id, similarity)]
+        self.template = template   # lets the caller enroll it anyway without a re-capture
+        others = ", ".join(f"{sid} ({score:.2f})" for sid, score in matches)
+        super().__init__(f"This finger is already enrolled for: {others}")
+
+
+class LshIndex:
+    def __init__(self, dim=TEMPLATE_DIM, tables=TABLES, bits=BITS, seed=1234):
+        rng = np.random.default_rng(seed)
+        self._planes = rng.standard_normal((tables * bits, dim)).astype(np.float32)
+        self._weights = (1 << np.arange(bits)).astype(np.int64)
+        self.tables, self.bits = tables, bits
+        self._center = np.zeros(dim, dtype=np.float32)
+        self._lock = threading.Lock()
+        self._buckets = [{} for _ in range(tables)]   # per table: signature -> set(student_id)
+        self._keys = {}      # student_id -> signatures
+        self._vectors = {}   # student_id -> unit template
+        self._built_size = 0   # population the centre was computed from
+        self.threshold = DUPLICATE_THRESHOLD   # calibrated by _build
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def _signatures(self, vectors):
+        """(n, tables) bucket keys for unit row vectors."""
+        bits = ((vectors - self._center) @ self._planes.T) > 0
+        return bits.reshape(len(vectors), self.tables, self.bits).astype(np.int64) @ self._weights
+
+    def build(self, ids, vectors):
+        """Index every (student_id, template) pair at once; the centre is their mean."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self._planes.shape[1])
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+        with self._lock:
+            self._build(list(ids), vectors)
+        return self
+
+    def _build(self, ids, vectors):
+        self._center = vectors.mean(axis=0) if len(vectors) else self._center
+        self._built_size = len(vectors)
+        self.threshold = impostor_threshold(vectors, DUPLICATE_FMR, DUPLICATE_THRESHOLD)
+        self._buckets = [{} for _ in range(self.tables)]
+        self._keys, self._vectors = {}, {}
+        for sid, vec, keys in zip(ids, vectors, self._signatures(vectors)):
+            self._insert(sid, vec, keys)
+
+    def _insert(self, student_id, vec, keys):
+        for table, key in zip(self._buckets, keys.tolist()):
+            table.setdefault(key, set()).add(student_id)
+        self._keys[student_id] = keys
+        self._vectors[student_id] = vec
+
+    def add(self, student_id, template):
+        vec = as_template(template, self._planes.shape[1])
+        with self._lock:
+            self._remove(student_id)
+            self._insert(student_id, vec, self._signatures(vec[None])[0])
+            if len(self._vectors) >= max(2 * self._built_size, MIN_REBUILD):
+                ids = list(self._vectors)
+                self._build(ids, np.stack([self._vectors[sid] for sid in ids]))
+
+    def _remove(self, student_id):
+        keys = self._keys.pop(student_id, None)
+        if keys is None:
+            return
+        for table, key in zip(self._buckets, keys.tolist()):
+            bucket = table.get(key)
+            bucket.discard(student_id)
+            if not bucket:
+                del table[key]
+        del self._vectors[student_id]
+
+    def remove(self, student_id):
+        with self._lock:
+            self._remove(student_id)
+
+    def near_duplicates(self, template, exclude=None, threshold=None):
+        """[(student_id, similarity)] of enrollees at or above `threshold` (default: the
+        calibrated one), best first."""
+        threshold = self.threshold if threshold is None else threshold
+        vec = as_template(template, self._planes.shape[1])
+        keys = self._signatures(vec[None])[0].tolist()
+        with self._lock:
+            candidates = set()
+            for table, key in zip(self._buckets, keys):
+                candidates |= table.get(key, set())
+            candidates.discard(exclude)
+            if not candidates:
+                return []
+            ids = list(candidates)
+            scores = np.stack([self._vectors[sid] for sid in ids]) @ vec
+        found = [(sid, float(s)) for sid, s in zip(ids, scores) if s >= threshold]
+        return sorted(found, key=lambda m: -m[1])
+
+    def audit(self, threshold=None):
+        """Every pair of enrollees at or above `threshold` (default: the calibrated one) as (a, b, similarity)."""
+        pairs = {}
+        for sid in list(self._vectors):
+            for other, score in self.near_duplicates(self._vectors[sid], exclude=sid, threshold=threshold):
+                pairs[tuple(sorted((sid, other)))] = score
+        return sorted(((a, b, s) for (a, b), s in pairs.items()), key=lambda p: -p[2])
+
+
+# Built from the template store on first use; kept current by register_fingerprint.
+_index = None
+_index_lock = threading.Lock()
+
+
+def enrolled_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            from template_store import templates
+            ids, _, vectors = templates.open().active()
+            _index = LshIndex().build(ids, vectors)
+        return _index
+
+
+def check_enrollment(student_id, template):
+    """Raise DuplicateFingerprint if the finger is already enrolled for another student."""
+    matches = enrolled_index().near_duplicates(template, exclude=student_id)
+    if matches:
+        raise DuplicateFingerprint(student_id, matches, template)
+
+
+if __name__ == "__main__":
+    if "--audit" in sys.argv[1:]:
+        index = enrolled_index()
+        found = index.audit()
+        for a, b, score in found:
+            print(f"{a} <-> {b}: similarity {score:.3f}")
+        print(f"{len(found)} possible duplicate enrollment(s) among {len(index)} students "
+              f"(similarity >= {index.threshold:.3f}).")
+    else:
+        print(__doc__)
@@ -0,0 +1,224 @@
+# fp_match.py
+"""1:N fingerprint identification.
+
+Every enrolled template is a fixed-size float32 feature vector, L2
+normalised and stored as one row of a contiguous matrix, so scoring a probe
+against all enrollees is a single matrix-vector product (cosine
+similarity). Rows can be restricted to the sections whose class is in
+session, which shrinks the search when the kiosk knows who is expected.
+
+The more students are enrolled, the more chances an unenrolled (or badly
+placed) finger has to resemble one of them, so the acceptance threshold is
+calibrated on every load: impostor scores are measured between distinct
+enrollees and the threshold is raised until a probe is expected to match
+someone else with probability at most TARGET_FMR. A match must also beat
+the runner-up by MATCH_MARGIN. Even then a match is only a candidate: the
+kiosk asks the student to confirm it (HomeTab).
+
+Benchmark: python fp_match.py --bench 10000
+"""
+import sys
+import threading
+import time
+
+import numpy as np
+
+TEMPLATE_DIM = 256
+MATCH_THRESHOLD = 0.60   # lowest cosine similarity ever accepted as the same finger (fp_features templates)
+TARGET_FMR = 0.001       # accepted chance that a probe is taken for another enrolled student
+MATCH_MARGIN = 0.05      # how far the best score must be ahead of the second best
+CALIBRATION_SAMPLE = 1000   # enrollees whose pairwise scores estimate the impostor distribution
+TAIL_FRACTION = 0.01        # top share of impostor scores the tail extrapolation is fitted to
+MIN_CALIBRATION = 20        # fewer enrollees than this leave the threshold at its floor
+
+
+def as_template(data, dim=TEMPLATE_DIM):
+    """A unit-length float32 vector from a template (array-like or raw float32 bytes)."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        vec = np.frombuffer(data, dtype=np.float32)
+    else:
+        vec = np.asarray(data, dtype=np.float32).ravel()
+    if vec.shape != (dim,):
+        raise ValueError(f"expected a {dim}-value template, got {vec.size}")
+    norm = np.linalg.norm(vec)
+    if not norm:
+        raise ValueError("empty template")
+    return vec / norm
+
+
+def impostor_threshold(matrix, target=TARGET_FMR, floor=MATCH_THRESHOLD, sample=CALIBRATION_SAMPLE, seed=0):
+    """Similarity that a probe of some other finger exceeds against any of the
+    len(matrix) enrolled unit templates with probability at most `target`.
+
+    Impostor scores are the similarities between distinct enrollees (a
+    sample of them); each comparison may pass with probability target / n.
+    That is usually far beyond the sample, so the threshold is the larger
+    of the highest score seen and an exponential fit to the top
+    TAIL_FRACTION of scores, and never below `floor`. Above 1.0 it means
+    the templates cannot tell this many fingers apart: nothing is accepted.
+    """
+    n = len(matrix)
+    if n < MIN_CALIBRATION:
+        return floor
+    rows = np.random.default_rng(seed).choice(n, sample, replace=False) if n > sample else np.arange(n)
+    sub = np.asarray(matrix[rows], dtype=np.float32)
+    scores = (sub @ sub.T)[np.triu_indices(len(sub), 1)]
+    per_comparison = target / n
+    start = float(np.quantile(scores, 1 - TAIL_FRACTION))
+    excess = scores[scores > start] - start
+    fitted = start + (float(excess.mean()) if excess.size else 0.0) * np.log(TAIL_FRACTION / per_comparison)
+    return max(floor, float(scores.max()), float(fitted))
+
+
+class FingerprintMatcher:
+    """Enrolled templates in one contiguous matrix, searched in a vectorized pass.
+
+    `threshold` is the floor of the calibrated acceptance threshold
+    (impostor_threshold), which load() and load_arrays() recompute.
+    """
+
+    def __init__(self, dim=TEMPLATE_DIM, threshold=MATCH_THRESHOLD, capacity=1024, target_fmr=TARGET_FMR,
+                 margin=MATCH_MARGIN):
+        self.dim = dim
+        self.min_threshold = threshold
+        self.threshold = threshold
+        self.target_fmr = target_fmr
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self._sections = np.zeros(capacity, dtype=np.int64)   # 0 = no section
+        self._ids = []          # row -> student_id
+        self._rows = {}         # student_id -> row
+
+    def __len__(self):
+        return len(self._ids)
+
+    # ---------------- enrollment ----------------
+    def _grow(self, needed):
+        capacity = len(self._matrix)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        sections = np.zeros(capacity, dtype=np.int64)
+        sections[:len(self._ids)] = self._sections[:len(self._ids)]
+        self._matrix, self._sections = matrix, sections
+
+    def enroll(self, student_id, template, section_id=None):
+        """Add or replace the template of one student."""
+        vec = as_template(template, self.dim)
+        with self._lock:
+            row = self._rows.get(student_id)
+            if row is None:
+                row = len(self._ids)
+                self._grow(row + 1)
+                self._ids.append(student_id)
+                self._rows[student_id] = row
+            self._matrix[row] = vec
+            self._sections[row] = section_id or 0
+
+    def load(self, entries):
+        """Replace everything with (student_id, section_id, template) entries in one pass."""
+        entries = list(entries)
+        matrix = np.zeros((max(len(entries), 1), self.dim), dtype=np.float32)
+        sections = np.zeros(len(matrix), dtype=np.int64)
+        ids = []
+        for i, (student_id, section_id, template) in enumerate(entries):
+            matrix[i] = as_template(template, self.dim)
+            sections[i] = section_id or 0
+            ids.append(student_id)
+        threshold = impostor_threshold(matrix[:len(ids)], self.target_fmr, self.min_threshold)
+        with self._lock:
+            self._matrix, self._sections, self._ids = matrix, sections, ids
+            self._rows = {sid: i for i, sid in enumerate(ids)}
+            self.threshold = threshold
+
+    def load_arrays(self, ids, sections, vectors):
+        """Replace everything from parallel arrays (e.g. TemplateStore.active()) without a per-row loop."""
+        matrix = np.array(vectors, dtype=np.float32).reshape(-1, self.dim)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        if not len(matrix):
+            matrix = np.zeros((1, self.dim), dtype=np.float32)
+        sections = np.array(sections, dtype=np.int64).reshape(-1)
+        sections = np.resize(sections, len(matrix)) if len(sections) else np.zeros(len(matrix), dtype=np.int64)
+        ids = list(ids)
+        threshold = impostor_threshold(matrix[:len(ids)], self.target_fmr, self.min_threshold)
+        with self._lock:
+            self._matrix, self._sections, self._ids = matrix, sections, ids
+            self._rows = {sid: i for i, sid in enumerate(ids)}
+            self.threshold = threshold
+
+    def remove(self, student_id):
+        """Drop a student; the last row moves into the freed slot."""
+        with self._lock:
+            row = self._rows.pop(student_id, None)
+            if row is None:
+                return
+            last = len(self._ids) - 1
+            if row != last:
+                moved = self._ids[last]
+                self._matrix[row] = self._matrix[last]
+                self._sections[row] = self._sections[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+            self._ids.pop()
+
+    # ---------------- identification ----------------
+    def identify(self, probe, section_ids=None):
+        """Best match for a probe as (student_id, score); student_id is None below the
+        threshold or when the runner-up is within the margin.
+
+        With `section_ids`, only students of those sections are scored first;
+        if none of them matches, the whole population is searched.
+        """
+        q = as_template(probe, self.dim)
+        with self._lock:
+            n = len(self._ids)
+            if not n:
+                return None, 0.0
+            matrix, sections, ids = self._matrix[:n], self._sections[:n], list(self._ids)
+            threshold = self.threshold
+        if section_ids:
+            rows = np.flatnonzero(np.isin(sections, list(section_ids)))
+            if rows.size:
+                best, score = self._best(matrix[rows] @ q, threshold)
+                if best is not None:
+                    return ids[rows[best]], score
+        best, score = self._best(matrix @ q, threshold)
+        return (ids[best] if best is not None else None), score
+
+    def _best(self, scores, threshold):
+        """(row, score) of the best score, row None unless it is accepted."""
+        best = int(np.argmax(scores))
+        score = float(scores[best])
+        second = float(np.partition(scores, -2)[-2]) if len(scores) > 1 else -1.0
+        if score < threshold or score - second < self.margin:
+            return None, score
+        return best, score
+
+
+def _bench(n, runs=200):
+    rng = np.random.default_rng(0)
+    templates = rng.standard_normal((n, TEMPLATE_DIM)).astype(np.float32)
+    m = FingerprintMatcher()
+    started = time.perf_counter()
+    m.load((f"S{i:05d}", 1 + i % 40, templates[i]) for i in range(n))
+    print(f"loaded {n} templates in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    probes = templates[rng.integers(0, n, runs)] + 0.3 * rng.standard_normal((runs, TEMPLATE_DIM)).astype(np.float32)
+    for label, sections in (("full search", None), ("section prefilter", {7})):
+        started = time.perf_counter()
+        for p in probes:
+            m.identify(p, sections)
+        per = (time.perf_counter() - started) / runs * 1000
+        print(f"{label}: {per:.2f} ms per probe")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 10000)
+    else:
+        print(__doc__)
@@ -0,0 +1,117 @@
+# fp_pool.py
+"""Fingerprint identification in worker processes.
+
+Matching runs in a small process pool so it never competes with Tk for the
+GIL. Each worker maps the template file (template_store) read-only, so the
+templates are shared through the OS page cache instead of being pickled to
+every worker, and re-reads it when the header generation changes after an
+enrollment or a compaction. Requests are bounded (`max_pending`) and each
+one has a timeout.
+"""
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from fp_match import FingerprintMatcher, MATCH_THRESHOLD
+from template_store import TEMPLATE_PATH, TemplateStore, read_live
+
+# ---------------- worker side ----------------
+_path = None
+_header = None
+_generation = None
+_matcher = None
+
+
+def _init_worker(path, threshold):
+    global _path, _matcher
+    _path = path
+    _matcher = FingerprintMatcher(threshold=threshold)
+
+
+def _refresh():
+    """(Re)load the matcher from the mapped file if it changed since the last request."""
+    global _header, _generation
+    if _header is not None and int(_header["generation"][0]) == _generation:
+        return
+    _header, _generation, live = read_live(_path)
+    _matcher.load_arrays(*live)
+
+
+def _identify(probe, section_ids):
+    _refresh()
+    return _matcher.identify(probe, section_ids)
+
+
+# ---------------- kiosk side ----------------
+class MatchPool:
+    """Process pool for 1:N identification.
+
+    `submit()` returns a Future resolving to (student_id, score), with
+    student_id None when nothing matches; it raises queue.Full when
+    `max_pending` probes are already in flight, and the Future fails with
+    TimeoutError if no answer comes within `timeout` seconds.
+    """
+
+    def __init__(self, path=TEMPLATE_PATH, workers=2, timeout=2.0, max_pending=16, threshold=MATCH_THRESHOLD):
+        self.path = path
+        self.workers = workers
+        self.timeout = timeout
+        self.threshold = threshold
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+
+    def start(self):
+        if self._executor is None:
+            TemplateStore(self.path).open()  # creates an empty file on first run
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("spawn"),  # workers must not inherit pooled DB sockets
+                initializer=_init_worker, initargs=(self.path, self.threshold))
+            # spawn every worker now and let it load the templates, so the first
+            # probe's timeout does not include process start-up and imports
+            for _ in range(self.workers):
+                self._executor.submit(_refresh)
+        return self
+
+    def stop(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def submit(self, probe, section_ids=None):
+        if not self._slots.acquire(blocking=False):
+            raise queue.Full("too many fingerprint probes in flight")
+        result = Future()
+        try:
+            work = self._executor.submit(_identify, probe, set(section_ids) if section_ids else None)
+        except Exception:
+            self._slots.release()
+            raise
+
+        def finished(f):
+            self._slots.release()  # the worker is free again even if the caller already timed out
+            timer.cancel()
+            if not result.done():
+                try:
+                    if f.cancelled():
+                        result.cancel()
+                    elif f.exception() is not None:
+                        result.set_exception(f.exception())
+                    else:
+                        result.set_result(f.result())
+                except Exception:
+                    pass  # timed out concurrently
+
+        def expired():
+            if not result.done():
+                try:
+                    result.set_exception(TimeoutError(f"no match result within {self.timeout:.1f}s"))
+                except Exception:
+                    pass
+
+        timer = threading.Timer(self.timeout, expired)
+        timer.daemon = True
+        timer.start()
+        work.add_done_callback(finished)
+        return result
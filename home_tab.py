@@ -1,12 +1,24 @@
+import itertools
+import queue
 import tkinter as tk
+from datetime import datetime
 from tkinter import ttk, messagebox
 from theme import PINK, CARD_BG, LIGHT_BG, mk_label
-from data_store import students, classes, attendance_log, current_timestamp_str
+from data_store import classes, get_students, get_student, get_attendance_log, add_attendance
+from database import get_student as db_get_student, schedule_index
+from query_executor import QueryExecutor
+from scan_dedupe import DuplicateScan
 
 
 class HomeTab(tk.Frame):
-    def __init__(self, parent):
+    def __init__(self, parent, scan_ingestor, match_pool):
         super().__init__(parent, bg=LIGHT_BG)
+        self.scan_ingestor = scan_ingestor  # write-behind queue that persists scans
+        self.match_pool = match_pool        # fp_pool.MatchPool: identification in worker processes
+        self._probe_seq = itertools.count(1)
+        self.schedules_ready = False        # set by the app once the schema migrations have run
+        self.queries = QueryExecutor(self)
+        self._recent_seen = 0  # high-water mark: how many attendance_log entries are already shown
         self._build_ui()
 
     def _build_ui(self):
@@ -26,8 +38,10 @@ class HomeTab(tk.Frame):
                                      font=("Segoe UI", 9), bg="#ffe8ec")
         self.status_label.pack(pady=6)
 
+        tk.Button(left_card, text="Scan Finger", bg=PINK, fg="white", relief="flat",
+                  command=self.capture_scan, font=("Segoe UI", 10, "bold")).pack(pady=(8, 4))
         tk.Button(left_card, text="Simulate Scan", bg=PINK, fg="white", relief="flat",
-                  command=self.open_simulate_scan, font=("Segoe UI", 10, "bold")).pack(pady=8)
+                  command=self.open_simulate_scan, font=("Segoe UI", 10, "bold")).pack(pady=(4, 8))
 
         # Right card - quick actions
         right_card = tk.Frame(self, bg=CARD_BG)
@@ -68,7 +82,7 @@ class HomeTab(tk.Frame):
         dlg.configure(bg=LIGHT_BG)
 
         mk_label(dlg, "Select Student to mark as Present", font=("Segoe UI", 11, "bold"), bg=LIGHT_BG).pack(pady=(12, 8))
-        values = [f"{s['id']} - {s['last']}, {s['first']} ({s['year_section']})" for s in students]
+        values = [f"{s['id']} - {s['last']}, {s['first']} ({s['year_section']})" for s in get_students()]
         sel_var = tk.StringVar()
         cb = ttk.Combobox(dlg, textvariable=sel_var, values=values, width=56, state="readonly")
         cb.pack(pady=8)
@@ -79,27 +93,137 @@ class HomeTab(tk.Frame):
                 messagebox.showwarning("No students", "Add students first in Classes tab.")
                 return
             sid = sel.split(" - ")[0]
-            student = next((x for x in students if x["id"] == sid), None)
-            if student:
-                record = {
-                    "student_id": student["id"],
-                    "last": student["last"],
-                    "first": student["first"],
-                    "year_section": student["year_section"],
-                    "datetime": current_timestamp_str(),
-                    "status": "Present"
-                }
-                attendance_log.append(record)
-                self.status_label.config(text=f"{student['first']} {student['last']} marked PRESENT")
-                dlg.destroy()
+            # the database record carries the section_id that links the scan to its class
+            self.queries.submit(("identify", next(self._probe_seq)), self._lookup_student, sid, quiet=True,
+                                on_done=self._identified)
+            dlg.destroy()
 
         tk.Button(dlg, text="Mark Present", bg=PINK, fg="white", relief="flat",
                   command=do_mark_present).pack(pady=10)
 
-    def refresh_recent(self):
-        for r in self.rv.get_children():
+    def capture_scan(self):
+        """Captures a finger on the scanner (in the background) and identifies it."""
+        if self.queries.is_busy("capture"):
+            return
+        self.status_label.config(text="Place your finger on the scanner…")
+        self.queries.submit("capture", self._capture_template, quiet=True,
+                            on_done=self.identify_scan,
+                            on_error=lambda e: self.status_label.config(text=f"Scanner error: {e}"))
+
+    @staticmethod
+    def _capture_template():
+        from fingerprint import capture_template  # needs the scanner SDK
+        return capture_template()
+
+    def identify_scan(self, probe):
+        """Identifies the finger on the scanner and, once the student confirms the match, records a scan.
+
+        Every step runs off the Tk thread and is keyed per probe, so probes
+        from several scanners can be in flight at once.
+        """
+        key = ("identify", next(self._probe_seq))
+        self.status_label.config(text="Identifying…")
+        if not self.schedules_ready:
+            self._match(key, probe, None)   # search everyone until the schema is migrated
+            return
+        self.queries.submit(key, self._sections_in_session, quiet=True,
+                            on_done=lambda sections: self._match(key, probe, sections))
+
+    @staticmethod
+    def _sections_in_session():
+        try:
+            # students of the classes in session are searched first
+            return schedule_index.sections_in_session(datetime.now())
+        except Exception:
+            return None
+
+    def _match(self, key, probe, sections):
+        try:
+            result = self.match_pool.submit(probe, sections)
+        except queue.Full:
+            self.status_label.config(text="Scanner busy, please scan again.")
+            return
+        self.queries.track(key, result, quiet=True,
+                           on_done=lambda match: self._matched(key, match),
+                           on_error=lambda e: self.status_label.config(text=f"Scan failed: {e}"))
+
+    def _matched(self, key, match):
+        student_id, _ = match
+        if student_id is None:
+            self._identified(None)
+            return
+        self.queries.submit(key, self._lookup_student, student_id, quiet=True, on_done=self._confirm_match)
+
+    def _confirm_match(self, student):
+        """A fingerprint match is only a candidate; the student confirms it before it is recorded."""
+        if student is None:
+            self._identified(None)
+            return
+        if not messagebox.askyesno(
+                "Confirm Scan", f"Are you {student['first']} {student['last']} ({student['year_section']})?",
+                parent=self):
+            self.status_label.config(text="Not recorded, please scan again.")
+            return
+        self.record_scan(student)
+
+    @staticmethod
+    def _lookup_student(student_id):
+        try:
+            return db_get_student(student_id) or get_student(student_id)
+        except Exception:
+            return get_student(student_id)
+
+    def _identified(self, student):
+        if student is None:
+            self.status_label.config(text="Fingerprint not recognized, please try again.")
+            return
+        self.record_scan(student)
+
+    def record_scan(self, student, status="Present"):
+        """Queues a scan for persistence; the kiosk confirms it only once it is committed."""
+        try:
+            ack = self.scan_ingestor.submit(student["id"], student["year_section"], status,
+                                            section_id=student.get("section_id"))
+        except DuplicateScan as e:
+            self.status_label.config(
+                text=f"{student['first']} {student['last']} is already recorded ({e.first:%I:%M %p})")
+            return
+        except queue.Full:
+            self.status_label.config(text="Scanner busy, please scan again.")
+            return
+        self.status_label.config(text=f"Saving scan for {student['first']} {student['last']}…")
+
+        def on_saved(saved):
+            _, _, _, when, saved_status = saved
+            add_attendance({
+                "student_id": student["id"],
+                "last": student["last"],
+                "first": student["first"],
+                "year_section": student["year_section"],
+                "datetime": when.strftime("%Y-%m-%d %H:%M:%S"),
+                "status": saved_status
+            })
+            self.status_label.config(text=f"{student['first']} {student['last']} marked {saved_status.upper()}")
+            self.refresh_recent()
+
+        def on_failed(exc):
+            if isinstance(exc, DuplicateScan):  # another kiosk recorded this class first
+                self.status_label.config(
+                    text=f"{student['first']} {student['last']} is already recorded ({exc.first:%I:%M %p})")
+                return
+            self.status_label.config(text=f"Scan NOT saved for {student['first']} {student['last']}: {exc}")
+
+        # keyed per scan so that quick successive scans do not cancel each other
+        self.queries.track(("scan", id(ack)), ack, on_done=on_saved, on_error=on_failed)
+
+    def refresh_recent(self, limit=12):
+        """Prepends log entries added since the last refresh; older rows are left alone."""
+        log = get_attendance_log()
+        new = log[self._recent_seen:]
+        self._recent_seen = len(log)
+        for rec in new[-limit:]:
+            self.rv.insert("", 0, values=(rec["student_id"],
+                                          f"{rec['last']}, {rec['first']}",
+                                          rec["year_section"], rec["datetime"], rec["status"]))
+        for r in self.rv.get_children()[limit:]:
             self.rv.delete(r)
-        for rec in attendance_log[-12:][::-1]:
-            self.rv.insert("", "end", values=(rec["student_id"],
-                                              f"{rec['last']}, {rec['first']}",
-                                              rec["year_section"], rec["datetime"], rec["status"]))
@@ -1,16 +1,29 @@
+import sys
+import time
+
+_STARTED = time.perf_counter()  # before the imports below, which are part of startup
+
 import tkinter as tk
 from tkinter import ttk
+from theme import LIGHT_BG
 from home_tab import HomeTab
 from attendance_tab import AttendanceTab
 from classes_tab import ClassesTab
 from schedule_tab import ScheduleTab
 from reports_tab import ReportsTab
+from scan_queue import ScanIngestor
+from absence_job import AbsenceJob
+from fp_pool import MatchPool
+from template_store import templates
+from migrations import apply_migrations
+from query_executor import QueryExecutor
 from db_helper import add_school_year, add_section, add_schedule, add_student, get_school_years, get_sections
 
 
 class CASApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, measure_startup=False):
         super().__init__()
+        self._startup = [("imports", time.perf_counter())] if measure_startup else None
         self.title("CCS Attendance System")
         self.geometry("1100x700")
         self.configure(bg="#f1f2f6")  # Light background color
@@ -24,34 +37,115 @@ class CASApp(tk.Tk):
         self.notebook.pack(fill="both", expand=True, padx=16, pady=(10, 16))
 
         self._build_navbar()  # Build the navbar (header)
-
-        # Initialize the tabs
-        self.home_tab = HomeTab(self.notebook)
-        self.attendance_tab = AttendanceTab(self.notebook)
-
-        # Pass the callback method to both tabs to update dropdowns
-        self.classes_tab = ClassesTab(self.notebook, self.update_dropdowns)
-        self.schedule_tab = ScheduleTab(self.notebook, self.update_dropdowns)
-
-        self.reports_tab = ReportsTab(self.notebook)
-
-        # Add the tabs to the notebook
+        self._mark("window")
+
+        # Write-behind queue for fingerprint scans (journaled locally while
+        # MySQL is unreachable); flushed on close. It and the absence job only
+        # start writing once the schema is up to date; scans queue until then.
+        self.scan_ingestor = ScanIngestor()
+        # Marks absentees as each scheduled class ends
+        self.absence_job = AbsenceJob()
+        # Migrations can rewrite whole tables, so they run in the background
+        # and the window is drawn straight away
+        self.queries = QueryExecutor(self)
+        self._schema_done = False
+        self.queries.submit("migrations", apply_migrations, quiet=True,
+                            on_done=self._schema_ready, on_error=self._schema_ready)
+
+        # Fingerprint identification runs in worker processes that map the template file;
+        # compaction copies every live record, so it runs in the background too
+        try:
+            templates.open()
+            self.queries.submit("compact templates", templates.maybe_compact, quiet=True,
+                                on_error=lambda e: print(f"Could not compact fingerprint templates: {e}"))
+        except Exception as e:
+            print(f"Could not open fingerprint templates: {e}")
+        self.match_pool = MatchPool().start()
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+        self._mark("services")
+
+        # Only the Home tab is built now; the others run their queries when first opened
+        self.home_tab = HomeTab(self.notebook, self.scan_ingestor, self.match_pool)
         self.notebook.add(self.home_tab, text="Home")
-        self.notebook.add(self.attendance_tab, text="Attendance Log")
-        self.notebook.add(self.classes_tab, text="Classes")
-        self.notebook.add(self.schedule_tab, text="Class Schedule")
-        self.notebook.add(self.reports_tab, text="Reports")
+        self._lazy_tabs = {}
+        self._add_lazy_tab("attendance_tab", "Attendance Log", AttendanceTab)
+        # Pass the callback method to both tabs to update dropdowns
+        self._add_lazy_tab("classes_tab", "Classes", lambda page: ClassesTab(page, self.update_dropdowns))
+        self._add_lazy_tab("schedule_tab", "Class Schedule", lambda page: ScheduleTab(page, self.update_dropdowns))
+        self._add_lazy_tab("reports_tab", "Reports", ReportsTab)
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self._mark("tabs")
 
         # Customizing tab labels
         self._style_tabs()
+        if self._startup is not None:
+            self.after_idle(self._report_startup)
+
+    def _schema_ready(self, result):
+        if isinstance(result, Exception):
+            print(f"Could not apply schema migrations: {result}")
+        elif result:
+            print("Applied schema migrations: " + ", ".join(result))
+        self._schema_done = True
+        self.scan_ingestor.start()
+        self.absence_job.start()
+        # schedules are read through day_no/start_min, which the migrations add
+        self.home_tab.schedules_ready = True
+        self._on_tab_changed()  # a tab opened while migrating is built now
+
+    # ---------------- lazy tabs ----------------
+    def _add_lazy_tab(self, attr, text, build):
+        """Add an empty page whose tab is built by `build(page)` on first selection."""
+        page = tk.Frame(self.notebook, bg=LIGHT_BG)
+        self.notebook.add(page, text=text)
+        self._lazy_tabs[str(page)] = (page, attr, build)
+        setattr(self, attr, None)
+
+    def _on_tab_changed(self, _event=None):
+        if not self._schema_done:
+            return  # built by _schema_ready; its queries need the migrated schema
+        entry = self._lazy_tabs.pop(self.notebook.select(), None)
+        if entry is None:
+            return
+        page, attr, build = entry
+        tab = build(page)
+        tab.pack(fill="both", expand=True)
+        setattr(self, attr, tab)
 
     def update_dropdowns(self):
-        self.classes_tab.load_years_and_sections()
-        self.schedule_tab.load_data()
-        self.reports_tab._load_filters_from_db()  # ✅ refresh reports dropdowns too
+        # tabs not built yet load fresh data when they are first opened
+        if self.classes_tab is not None:
+            self.classes_tab.load_years_and_sections()
+        if self.schedule_tab is not None:
+            self.schedule_tab.load_data()
+        if self.reports_tab is not None:
+            self.reports_tab._load_filters_from_db()  # ✅ refresh reports dropdowns too
 
     # ✅ refresh reports tab immediately
 
+    # ---------------- startup timing ----------------
+    def _mark(self, phase):
+        if self._startup is not None:
+            self._startup.append((phase, time.perf_counter()))
+
+    def _report_startup(self):
+        """Print how long each startup phase took until the window was drawn, then quit."""
+        self.update()
+        self._mark("first draw")
+        previous = _STARTED
+        for phase, at in self._startup:
+            print(f"{phase:<12} {(at - previous) * 1000:7.0f} ms")
+            previous = at
+        print(f"{'total':<12} {(previous - _STARTED) * 1000:7.0f} ms")
+        self._on_close()
+
+    def _on_close(self):
+        """Flush queued scans before the window goes away."""
+        self.absence_job.stop()
+        self.match_pool.stop()
+        self.scan_ingestor.stop()
+        self.destroy()
+
     def _build_navbar(self):
         """Create the header navbar with the title and the 'HOME' button."""
         nav = tk.Frame(self, bg="#2f3542", height=64)
@@ -86,5 +180,6 @@ class CASApp(tk.Tk):
 
 
 if __name__ == "__main__":
-    app = CASApp()
+    # python main.py --startup-time: print the time to the first window, per phase, and exit
+    app = CASApp(measure_startup="--startup-time" in sys.argv[1:])
     app.mainloop()
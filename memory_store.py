@@ -0,0 +1,138 @@
+# memory_store.py
+"""In-memory students / attendance used when the database is unavailable.
+
+Records are compact `__slots__` objects that still answer `rec["key"]` and
+`rec.get("key")`, so code written against the old dict rows keeps working.
+The store keeps hash indexes by student id and section, and datetime-sorted
+indexes (overall and per section) so date-range queries bisect instead of
+scanning the whole log.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+
+
+class _Record:
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def as_dict(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class StudentRecord(_Record):
+    __slots__ = ("id", "last", "first", "year_section")
+
+    def __init__(self, id, last, first, year_section):
+        self.id = id
+        self.last = last
+        self.first = first
+        self.year_section = year_section
+
+
+class AttendanceRecord(_Record):
+    __slots__ = ("student_id", "last", "first", "year_section", "datetime", "status", "academic_year", "semester")
+
+    def __init__(self, student_id, last, first, year_section, datetime, status, academic_year=None, semester=None):
+        self.student_id = student_id
+        self.last = last
+        self.first = first
+        self.year_section = year_section
+        self.datetime = datetime  # "YYYY-MM-DD HH:MM:SS"; sorts chronologically as a string
+        self.status = status
+        self.academic_year = academic_year
+        self.semester = semester
+
+
+class _SortedLog:
+    """Records kept in datetime order, with the keys in a parallel list for bisect."""
+    __slots__ = ("keys", "items")
+
+    def __init__(self):
+        self.keys = []
+        self.items = []
+
+    def add(self, key, item):
+        i = bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.items.insert(i, item)
+
+    def between(self, start=None, end=None):
+        """Records with start <= key < end (either bound may be None)."""
+        lo = bisect_left(self.keys, start) if start else 0
+        hi = bisect_left(self.keys, end) if end else len(self.keys)
+        return self.items[lo:hi]
+
+
+class MemoryStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._students = {}            # student id -> StudentRecord
+        self._students_by_section = {}  # year_section -> [StudentRecord]
+        self.attendance = []           # insertion order, for "what's new since" readers
+        self._by_time = _SortedLog()
+        self._by_section = {}          # year_section -> _SortedLog
+        self._by_student = {}          # student id -> [AttendanceRecord]
+        self.schedules = []
+
+    # ---------------- students ----------------
+    def add_student(self, student):
+        """Add (or replace) a student given as a dict or StudentRecord."""
+        if not isinstance(student, StudentRecord):
+            student = StudentRecord(student["id"], student["last"], student["first"], student["year_section"])
+        with self._lock:
+            old = self._students.get(student.id)
+            if old is not None:
+                self._students_by_section[old.year_section].remove(old)
+            self._students[student.id] = student
+            self._students_by_section.setdefault(student.year_section, []).append(student)
+        return student
+
+    def student(self, student_id):
+        return self._students.get(student_id)
+
+    def students(self, year_section=None):
+        if year_section:
+            return list(self._students_by_section.get(year_section, []))
+        return list(self._students.values())
+
+    # ---------------- attendance ----------------
+    def add_attendance(self, record):
+        """Add an attendance entry given as a dict or AttendanceRecord."""
+        if not isinstance(record, AttendanceRecord):
+            record = AttendanceRecord(**record)
+        with self._lock:
+            self.attendance.append(record)
+            self._by_time.add(record.datetime, record)
+            self._by_section.setdefault(record.year_section, _SortedLog()).add(record.datetime, record)
+            self._by_student.setdefault(record.student_id, []).append(record)
+        return record
+
+    def attendance_for(self, student_id):
+        return list(self._by_student.get(student_id, []))
+
+    def find_attendance(self, year_section=None, start=None, end=None, academic_year=None, semester=None):
+        """Attendance in [start, end) ("YYYY-MM-DD HH:MM:SS" bounds), oldest first."""
+        with self._lock:
+            if year_section:
+                log = self._by_section.get(year_section)
+                rows = log.between(start, end) if log else []
+            else:
+                rows = self._by_time.between(start, end)
+        if academic_year:
+            rows = [r for r in rows if r.academic_year == academic_year]
+        if semester:
+            rows = [r for r in rows if r.semester == semester]
+        return rows
+
+    # ---------------- schedules ----------------
+    def add_schedule(self, schedule):
+        with self._lock:
+            self.schedules.append(schedule)
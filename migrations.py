@@ -0,0 +1,149 @@
+# migrations.py
+"""Schema migrations for the cas_attendance database.
+
+Each migration is applied once, in order, and recorded in the
+schema_migrations table. Run `python migrations.py` to apply pending ones;
+the app also applies them in the background on startup.
+"""
+from database import connection
+from schedule_index import day_number, parse_span
+
+
+def _backfill_schedule_minutes(cur):
+    """Parse the free-text day/time of existing schedules into the numeric columns.
+
+    Times without AM/PM are read with the school-hours rule (parse_span);
+    schedules that still cannot be settled keep NULLs and are listed.
+    """
+    cur.execute("SELECT id, day, start_time, end_time FROM schedules")
+    rows, unsettled = [], []
+    for r in cur.fetchall():
+        day_no, (start_min, end_min) = day_number(r["day"]), parse_span(r["start_time"], r["end_time"])
+        if day_no is None or start_min is None:
+            day_no = start_min = end_min = None
+            unsettled.append(r)
+        rows.append((day_no, start_min, end_min, r["id"]))
+    cur.executemany("UPDATE schedules SET day_no=%s, start_min=%s, end_min=%s WHERE id=%s", rows)
+    if unsettled:
+        print(f"Warning: {len(unsettled)} schedule(s) need their day or time fixed in the Class Schedule tab:")
+        for r in unsettled:
+            print(f"  #{r['id']}: {r['day']} {r['start_time']}-{r['end_time']}")
+
+
+MIGRATIONS = [
+    ("0001_attendance_scan_uuid", [
+        # client-generated id per scan so that journal replays are idempotent
+        "ALTER TABLE attendance_log ADD COLUMN scan_uuid CHAR(32) NULL",
+        "ALTER TABLE attendance_log ADD UNIQUE KEY uq_attendance_scan_uuid (scan_uuid)",
+    ]),
+    ("0002_attendance_report_indexes", [
+        # reports filter by ids instead of joining sections/school_years by name
+        "ALTER TABLE attendance_log ADD COLUMN section_id INT NULL, ADD COLUMN school_year_id INT NULL",
+        """
+        UPDATE attendance_log a
+        JOIN students s ON s.student_id = a.student_id
+        SET a.section_id = s.section_id, a.school_year_id = s.school_year_id
+        WHERE a.section_id IS NULL
+        """,
+        "ALTER TABLE attendance_log"
+        " ADD INDEX idx_attendance_section_dt (section_id, datetime),"
+        " ADD INDEX idx_attendance_year_dt (school_year_id, datetime),"
+        " ADD INDEX idx_attendance_ys_dt (year_section, datetime),"
+        " ADD INDEX idx_attendance_dt (datetime)",
+        "ALTER TABLE students ADD INDEX idx_students_student_id (student_id), ADD INDEX idx_students_section (section_id)",
+    ]),
+    ("0003_attendance_daily_rollup", [
+        # per day x section x status counts, kept current by add_attendance_batch
+        """
+        CREATE TABLE attendance_daily (
+            day DATE NOT NULL,
+            section_id INT NOT NULL DEFAULT 0,
+            school_year_id INT NULL,
+            status VARCHAR(20) NOT NULL,
+            total INT NOT NULL,
+            PRIMARY KEY (day, section_id, status),
+            KEY idx_daily_section (section_id, day),
+            KEY idx_daily_year (school_year_id, day)
+        )
+        """,
+        """
+        INSERT INTO attendance_daily (day, section_id, school_year_id, status, total)
+        SELECT DATE(datetime), COALESCE(section_id, 0), MAX(school_year_id), status, COUNT(*)
+        FROM attendance_log
+        GROUP BY DATE(datetime), COALESCE(section_id, 0), status
+        """,
+    ]),
+    ("0004_attendance_schedule_id", [
+        # the class a scan belongs to, resolved from schedule_index at insert time
+        "ALTER TABLE attendance_log ADD COLUMN schedule_id INT NULL, ADD INDEX idx_attendance_schedule (schedule_id)",
+    ]),
+    ("0005_schedule_numeric_times", [
+        # weekday ordinal (Monday=0) and minutes since midnight, for ordering and time-window queries
+        "ALTER TABLE schedules ADD COLUMN day_no TINYINT NULL, ADD COLUMN start_min SMALLINT NULL,"
+        " ADD COLUMN end_min SMALLINT NULL",
+        _backfill_schedule_minutes,
+        "ALTER TABLE schedules"
+        " ADD INDEX idx_schedules_section_day (section_id, day_no, start_min),"
+        " ADD INDEX idx_schedules_day (day_no, start_min)",
+    ]),
+    ("0006_attendance_student_index", [
+        # per-student scan lookups (absence anti-join)
+        "ALTER TABLE attendance_log ADD INDEX idx_attendance_student_dt (student_id, datetime)",
+    ]),
+    ("0007_fingerprint_templates", [
+        # who is enrolled and when; the templates themselves live in template_store's mapped file
+        """
+        CREATE TABLE fingerprint_templates (
+            student_id VARCHAR(32) PRIMARY KEY,
+            section_id INT NULL,
+            template_dim SMALLINT NOT NULL,
+            enrolled_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            KEY idx_fp_section (section_id)
+        )
+        """,
+    ]),
+    ("0008_attendance_once_per_class", [
+        # one row per student per class, whichever kiosk scanned. once_key is the schedule_id of
+        # rows written from now on; it is NULL for scans outside classes and for existing rows,
+        # which are kept as they are and left out of the unique key
+        "ALTER TABLE attendance_log"
+        " ADD COLUMN scan_day DATE AS (DATE(datetime)) STORED,"
+        " ADD COLUMN once_key INT NULL",
+        "ALTER TABLE attendance_log ADD UNIQUE KEY uq_attendance_once (student_id, scan_day, once_key)",
+    ]),
+]
+
+
+def apply_migrations():
+    """Apply every migration not yet recorded. Returns the names applied."""
+    applied = []
+    with connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name VARCHAR(100) PRIMARY KEY,
+                    applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            cur.execute("SELECT name FROM schema_migrations")
+            done = {r["name"] for r in cur.fetchall()}
+            for name, statements in MIGRATIONS:
+                if name in done:
+                    continue
+                # MySQL DDL commits implicitly, so each statement stands alone;
+                # data fixes that need Python are callables taking the cursor
+                for step in statements:
+                    if callable(step):
+                        step(cur)
+                    else:
+                        cur.execute(step)
+                cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+                conn.commit()
+                applied.append(name)
+    return applied
+
+
+if __name__ == "__main__":
+    names = apply_migrations()
+    print("Applied: " + ", ".join(names) if names else "Schema is up to date.")
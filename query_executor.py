@@ -0,0 +1,122 @@
+# query_executor.py
+import queue
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from tkinter import messagebox
+
+# One worker pool for the whole app; sized to match the DB connection pool.
+_workers = ThreadPoolExecutor(max_workers=4, thread_name_prefix="db-query")
+
+
+class QueryExecutor:
+    """Runs blocking calls (mostly database.py helpers) off the Tk main loop.
+
+    Results travel back through a queue that is drained with `after()`, so
+    callbacks always run on the Tk thread. Requests are keyed: submitting a
+    new request under a key cancels the previous one, and any result from a
+    superseded request is dropped instead of being delivered.
+    """
+
+    def __init__(self, widget, indicator=None, poll_ms=30):
+        self.widget = widget
+        self.indicator = indicator  # optional tk.Label showing the loading state
+        self.poll_ms = poll_ms
+        self._results = queue.Queue()
+        self._generation = {}   # key -> latest generation
+        self._pending = {}      # key -> future
+        self._quiet = set()     # keys that do not drive the loading indicator
+        self._loading = False
+        self._polling = False
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, quiet=False, **kwargs):
+        """Run fn(*args, **kwargs) on a worker thread."""
+        return self.track(key, _workers.submit(fn, *args, **kwargs), on_done, on_error, quiet)
+
+    def track(self, key, future, on_done=None, on_error=None, quiet=False):
+        """Deliver the result of an existing future to on_done/on_error on the Tk thread.
+
+        Quiet requests (e.g. background polling) do not show the loading state.
+        """
+        old = self._pending.get(key)
+        if old is not None:
+            old.cancel()
+        gen = self._generation.get(key, 0) + 1
+        self._generation[key] = gen
+        self._pending[key] = future
+        if quiet:
+            self._quiet.add(key)
+        else:
+            self._quiet.discard(key)
+        future.add_done_callback(lambda f: self._results.put((key, gen, f, on_done, on_error)))
+        self._update_loading()
+        self._schedule_poll()
+        return future
+
+    def post(self, fn, *args):
+        """Queue fn(*args) to run on the Tk thread; safe to call from workers
+        while a tracked request is still pending (e.g. progress updates)."""
+        self._results.put((None, None, None, partial(fn, *args), None))
+
+    def cancel(self, key):
+        """Cancel and forget the request running under key."""
+        self._generation[key] = self._generation.get(key, 0) + 1
+        future = self._pending.pop(key, None)
+        if future is not None:
+            future.cancel()
+        self._update_loading()
+
+    def is_busy(self, key=None):
+        return bool(self._pending) if key is None else key in self._pending
+
+    # ---------------- Tk side ----------------
+    def _schedule_poll(self):
+        if self._polling:
+            return
+        self._polling = True
+        try:
+            self.widget.after(self.poll_ms, self._poll)
+        except tk.TclError:
+            self._polling = False  # widget destroyed
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                key, gen, future, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if future is None:
+                on_done()  # posted callable
+                continue
+            if self._generation.get(key) != gen:
+                continue  # stale: a newer request replaced this one
+            self._pending.pop(key, None)
+            if future.cancelled():
+                continue
+            exc = future.exception()
+            if exc is not None:
+                (on_error or self._default_error)(exc)
+            elif on_done is not None:
+                on_done(future.result())
+
+        if self._pending:
+            self._schedule_poll()
+        self._update_loading()
+
+    def _update_loading(self):
+        if self.indicator is None:
+            return
+        loading = any(key not in self._quiet for key in self._pending)
+        if loading == self._loading:
+            return  # only touch the label on a change, so progress text posted meanwhile stays
+        self._loading = loading
+        try:
+            self.indicator.config(text="Loading…" if loading else "")
+            self.widget.config(cursor="watch" if loading else "")
+        except tk.TclError:
+            pass
+
+    @staticmethod
+    def _default_error(exc):
+        messagebox.showerror("DB Error", f"Could not load data.\n\n{exc}")
@@ -0,0 +1,102 @@
+# ref_cache.py
+import threading
+
+
+class ReferenceCache:
+    """In-process cache of school years and sections.
+
+    Loaded lazily from the database on first use, with name->id and
+    id->name indexes so lookups cost no round-trip. The cache is never
+    expired by time; the add/delete helpers in database.py and db_helper.py
+    invalidate the part they change.
+    """
+
+    def __init__(self, load_years, load_sections):
+        self._load_years = load_years
+        self._load_sections = load_sections
+        self._lock = threading.Lock()
+        self._years = None        # {"rows": [...], "by_name": {...}, "by_id": {...}}
+        self._sections = None
+        self._years_gen = 0       # bumped on invalidation so an in-flight load is not installed
+        self._sections_gen = 0
+
+    # ---------------- loading ----------------
+    def _get_years(self):
+        with self._lock:
+            if self._years is not None:
+                return self._years
+            gen = self._years_gen
+        rows = self._load_years()
+        data = {
+            "rows": rows,
+            "by_name": {r["year_name"]: r["id"] for r in rows},
+            "by_id": {r["id"]: r["year_name"] for r in rows},
+        }
+        with self._lock:
+            if gen == self._years_gen:
+                self._years = data
+        return data
+
+    def _get_sections(self):
+        with self._lock:
+            if self._sections is not None:
+                return self._sections
+            gen = self._sections_gen
+        rows = self._load_sections()
+        by_year = {}
+        by_name = {}
+        for r in rows:
+            by_year.setdefault(r["school_year_id"], []).append(r)
+            by_name.setdefault(r["name"], []).append(r)
+        data = {
+            "rows": rows,
+            "by_year": by_year,
+            "by_name": by_name,
+            "by_id": {r["id"]: r for r in rows},
+        }
+        with self._lock:
+            if gen == self._sections_gen:
+                self._sections = data
+        return data
+
+    # ---------------- lookups ----------------
+    def years(self):
+        return list(self._get_years()["rows"])
+
+    def year_id(self, year_name):
+        return self._get_years()["by_name"].get(year_name)
+
+    def year_name(self, school_year_id):
+        return self._get_years()["by_id"].get(school_year_id)
+
+    def sections(self, school_year_id=None):
+        data = self._get_sections()
+        if school_year_id:
+            return list(data["by_year"].get(school_year_id, []))
+        return list(data["rows"])
+
+    def section_id(self, section_name, school_year_id=None):
+        """Id of the named section; the first match if no school year is given."""
+        for r in self._get_sections()["by_name"].get(section_name, []):
+            if not school_year_id or r["school_year_id"] == school_year_id:
+                return r["id"]
+        return None
+
+    def section_name(self, section_id):
+        row = self._get_sections()["by_id"].get(section_id)
+        return row["name"] if row else None
+
+    # ---------------- invalidation ----------------
+    def invalidate_years(self):
+        with self._lock:
+            self._years = None
+            self._years_gen += 1
+
+    def invalidate_sections(self):
+        with self._lock:
+            self._sections = None
+            self._sections_gen += 1
+
+    def invalidate(self):
+        self.invalidate_years()
+        self.invalidate_sections()
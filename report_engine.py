@@ -0,0 +1,242 @@
+# report_engine.py
+"""Attendance PDF rendering in a separate process.
+
+The child process streams rows from the database in chunks (or renders the
+rows it is handed when the database is down), lays them out over as many
+pages as needed with the column header repeated and per-page totals in the
+footer, and reports progress back through a queue. The Tk process stays
+responsive and can cancel the job at any time.
+
+Benchmark: python report_engine.py --bench 100000
+"""
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+COLUMNS = [  # (title, row key, x position)
+    ("DateTime", "datetime", 30),
+    ("Student ID", "student_id", 150),
+    ("Last", "last", 230),
+    ("First", "first", 310),
+    ("Year & Section", "year_section", 390),
+    ("Status", "status", 510),
+]
+TOP, BOTTOM, LINE = 750, 60, 15
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+class PdfTableWriter:
+    """Writes a multi-page table: title block on page one, the column header
+    on every page and a footer with page number and page totals."""
+
+    def __init__(self, path, title_lines):
+        # imported here so that the app does not load reportlab until a PDF is made
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+        self.pdf = canvas.Canvas(path, pagesize=letter)
+        self.page = 0
+        self.rows = 0
+        self._new_page(title_lines)
+
+    def _new_page(self, title_lines=()):
+        self.page += 1
+        self.page_rows = 0
+        self.page_counts = {}
+        self.pdf.setFont("Helvetica", 10)
+        y = TOP
+        for i, line in enumerate(title_lines):
+            self.pdf.drawString(30, y, line)
+            y -= 20 if i == 0 else 15
+        if title_lines:
+            y -= 15
+        self.pdf.setFont("Helvetica-Bold", 10)
+        for title, _, x in COLUMNS:
+            self.pdf.drawString(x, y, title)
+        self.pdf.setFont("Helvetica", 10)
+        self.y = y - LINE
+        # one text object per page; a drawString per cell would build one per call
+        self.text = self.pdf.beginText()
+        self.text.setFont("Helvetica", 10)
+
+    def _end_page(self):
+        self.pdf.drawText(self.text)
+        totals = ", ".join(f"{k}: {v}" for k, v in sorted(self.page_counts.items()))
+        self.pdf.setFont("Helvetica-Oblique", 8)
+        self.pdf.drawString(30, 30, f"Page {self.page}  ·  Rows on page: {self.page_rows}  ·  {totals}")
+        self.pdf.showPage()
+
+    def add_rows(self, rows):
+        for r in rows:
+            if self.y < BOTTOM:
+                self._end_page()
+                self._new_page()
+            text = self.text
+            for _, key, x in COLUMNS:
+                value = r.get(key, "")
+                if isinstance(value, datetime):
+                    value = value.strftime("%Y-%m-%d %H:%M:%S")
+                text.setTextOrigin(x, self.y)
+                text.textOut(str(value))
+            status = str(r.get("status", "")).title()
+            self.page_counts[status] = self.page_counts.get(status, 0) + 1
+            self.page_rows += 1
+            self.rows += 1
+            self.y -= LINE
+
+    def finish(self, summary_lines):
+        if self.y - LINE * (len(summary_lines) + 1) < BOTTOM:
+            self._end_page()
+            self._new_page()
+        self.y -= LINE
+        for line in summary_lines:
+            self.text.setTextOrigin(30, self.y)
+            self.text.textOut(line)
+            self.y -= LINE
+        self._end_page()
+        self.pdf.save()
+
+
+def summary_lines(counts):
+    """Total plus the count of each status, Present, Late and Absent always shown."""
+    lines = [f"Total records: {sum(counts.values())}"]
+    shown = ["Present", "Late", "Absent"]
+    for status in shown + sorted(set(counts) - set(shown)):
+        lines.append(f"{status}: {counts.get(status, 0)}")
+    return lines
+
+
+def render_report(path, title_lines, db_filters=None, rows=None, progress=None, cancelled=None, chunk_size=1000):
+    """Render the report and return the number of rows written (0 = nothing saved).
+
+    Rows come from database.iter_attendance(**db_filters) unless an explicit
+    `rows` list is given. `progress(rows_so_far)` is called per chunk and
+    `cancelled()` is checked per chunk.
+    """
+    if rows is None:
+        from database import iter_attendance
+        chunks = iter_attendance(chunk_size, **db_filters)
+    else:
+        chunks = (rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size))
+
+    writer = None
+    counts = {}
+    for chunk in chunks:
+        if cancelled and cancelled():
+            chunks.close()
+            raise ReportCancelled()
+        if writer is None:
+            writer = PdfTableWriter(path, title_lines)
+        writer.add_rows(chunk)
+        for r in chunk:
+            status = str(r.get("status", "")).title()
+            counts[status] = counts.get(status, 0) + 1
+        if progress:
+            progress(writer.rows)
+    if writer is None:
+        return 0
+
+    if rows is None:
+        try:
+            # the rollup table agrees with the raw rows and spares the raw count query
+            from database import get_attendance_summary
+            start, end = db_filters.get("start"), db_filters.get("end")
+            counts = get_attendance_summary(db_filters.get("section_id"), db_filters.get("school_year_id"),
+                                            start.date() if start else None, end.date() if end else None)
+        except Exception:
+            pass
+    writer.finish(summary_lines(counts))
+    return writer.rows
+
+
+def _child_main(path, title_lines, db_filters, rows, messages, cancel_event):
+    try:
+        count = render_report(path, title_lines, db_filters, rows,
+                              progress=lambda n: messages.put(("progress", n)),
+                              cancelled=cancel_event.is_set)
+        messages.put(("done", count))
+    except ReportCancelled:
+        messages.put(("cancelled", None))
+    except Exception as e:
+        messages.put(("error", f"{type(e).__name__}: {e}"))
+
+
+class ReportJob:
+    """Handle on a report rendered in a child process.
+
+    `future` resolves with the row count, or raises ReportCancelled /
+    RuntimeError. `progress(rows_so_far)` is called from a watcher thread.
+    """
+
+    def __init__(self, path, title_lines, db_filters=None, rows=None, progress=None):
+        ctx = multiprocessing.get_context("spawn")  # the child must not inherit pooled DB sockets
+        self.path = path
+        self.future = Future()
+        self._progress = progress
+        self._messages = ctx.Queue()
+        self._cancel = ctx.Event()
+        self._process = ctx.Process(target=_child_main, name="report-engine", daemon=True,
+                                    args=(path, title_lines, db_filters, rows, self._messages, self._cancel))
+
+    def start(self):
+        self._process.start()
+        threading.Thread(target=self._watch, name="report-watch", daemon=True).start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _watch(self):
+        while True:
+            try:
+                kind, value = self._messages.get(timeout=0.5)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    self.future.set_exception(RuntimeError("Report process exited unexpectedly."))
+                    return
+                continue
+            if kind == "progress":
+                if self._progress:
+                    self._progress(value)
+                continue
+            self._process.join()
+            if kind == "done":
+                self.future.set_result(value)
+            elif kind == "cancelled":
+                self.future.set_exception(ReportCancelled())
+            else:
+                self.future.set_exception(RuntimeError(value))
+            return
+
+
+def _bench(n_rows, path):
+    start_dt = datetime(2025, 8, 1, 7, 30)
+    statuses = ("Present", "Present", "Present", "Late", "Absent")
+    rows = [{
+        "datetime": start_dt + timedelta(minutes=i),
+        "student_id": f"2025-{i % 2000:05d}",
+        "last": f"Last{i % 997}",
+        "first": f"First{i % 991}",
+        "year_section": f"BSIT {1 + i % 4}{'ABCD'[i % 4]}",
+        "status": statuses[i % len(statuses)],
+    } for i in range(n_rows)]
+    started = time.perf_counter()
+    count = render_report(path, ["Attendance Report (benchmark)"], rows=rows)
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(path) / 1e6
+    print(f"{count} rows in {elapsed:.2f}s ({count / elapsed:,.0f} rows/s), {size:.1f} MB -> {path}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 2 and sys.argv[1] == "--bench":
+        _bench(int(sys.argv[2]) if len(sys.argv) > 2 else 100000,
+               sys.argv[3] if len(sys.argv) > 3 else "bench_report.pdf")
+    else:
+        print(__doc__)
@@ -1,17 +1,30 @@
 # reports_tab.py  (MySQL-integrated)
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from tkcalendar import DateEntry
-import csv
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import os
+from datetime import datetime, time, timedelta
 
 from theme import PINK, CARD_BG, LIGHT_BG, mk_label
 # Fallback in-memory lists (used only if DB is unavailable)
-from data_store import attendance_log as MEM_ATTENDANCE, classes as MEM_CLASSES, academic_years as MEM_YEARS  # fallback
+from data_store import find_attendance as mem_find_attendance, classes as MEM_CLASSES, academic_years as MEM_YEARS  # fallback
 
 # DB helpers you already have
-from database import get_connection, get_academic_years, get_sections  # school_years/sections for filters
+from database import (get_academic_years, get_sections,  # school_years/sections for filters
+                      get_school_year_id, get_section_id, get_attendance_report, get_attendance_summary,
+                      iter_attendance)
+from csv_export import write_csv
+from report_engine import ReportJob, ReportCancelled, summary_lines
+from query_executor import QueryExecutor
+
+REPORT_COLUMNS = ("datetime", "student_id", "last", "first", "year_section", "status")
+
+
+def day_range(start_date, end_date):
+    """Turn an inclusive date range into a half-open [start, end) datetime range."""
+    start = datetime.combine(start_date, time.min) if start_date else None
+    end = datetime.combine(end_date + timedelta(days=1), time.min) if end_date else None
+    return start, end
+
 
 class ReportsTab(tk.Frame):
     def __init__(self, parent):
@@ -27,6 +40,7 @@ class ReportsTab(tk.Frame):
         # Data for dropdowns
         self.sections = []        # [(id, name)]
         self.school_years = []    # [(id, year_name)]
+        self.pdf_job = None       # report_engine.ReportJob while a PDF is being generated
 
         self._build_ui()
         self._load_filters_from_db()
@@ -66,6 +80,7 @@ class ReportsTab(tk.Frame):
         self.semester_cb.grid(row=2, column=1, pady=4)
 
         # Date range
+        from tkcalendar import DateEntry  # loaded with the tab, not at startup
         mk_label(f, "Start Date:", bg=LIGHT_BG).grid(row=3, column=0, sticky="w", pady=4)
         self.start_date_entry = DateEntry(f, textvariable=self.start_date_var, width=18,
                                           background="darkblue", foreground="white", borderwidth=2)
@@ -82,6 +97,9 @@ class ReportsTab(tk.Frame):
         tk.Button(btns, text="Filter", bg=PINK, fg="white", relief="flat", command=self.refresh_preview).pack(side="left", padx=6)
         tk.Button(btns, text="Export to CSV", bg=PINK, fg="white", relief="flat", command=self.export_to_csv).pack(side="left", padx=6)
         tk.Button(btns, text="Export to PDF", bg=PINK, fg="white", relief="flat", command=self.export_to_pdf).pack(side="left", padx=6)
+        self.cancel_pdf_btn = tk.Button(btns, text="Cancel PDF", bg="red", fg="white", relief="flat",
+                                        state="disabled", command=self.cancel_pdf)
+        self.cancel_pdf_btn.pack(side="left", padx=6)
 
         # Right — Preview table + summary
         right = tk.Frame(main_frame, bg=LIGHT_BG)
@@ -107,6 +125,9 @@ class ReportsTab(tk.Frame):
 
         self.summary_box = tk.Label(right, text="Attendance Summary will appear here.", bg=CARD_BG, font=("Segoe UI", 10))
         self.summary_box.pack(fill="x", padx=12, pady=(0, 6))
+        self.loading_label = mk_label(right, "", font=("Segoe UI", 9, "italic"), bg=LIGHT_BG)
+        self.loading_label.pack()
+        self.queries = QueryExecutor(self, indicator=self.loading_label)
 
         tk.Button(right, text="Preview Report", bg=PINK, fg="white", relief="flat",
                   command=self.refresh_preview).pack(pady=6)
@@ -142,72 +163,51 @@ class ReportsTab(tk.Frame):
         """
         Returns list of dicts with keys:
         datetime, student_id, last, first, year_section, status
-        Adjust table/column names if needed to match your schema.
+        Names are resolved to ids through the cached lookups and the date
+        range becomes a half-open datetime range, so the query stays indexable.
         """
-        sql = """
-            SELECT
-                a.datetime      AS datetime,
-                a.student_id    AS student_id,
-                a.last_name     AS last,
-                a.first_name    AS first,
-                CONCAT(sec.name) AS year_section,
-                a.status        AS status
-            FROM attendance a
-            JOIN sections sec ON a.section_id = sec.id
-            JOIN school_years sy ON a.school_year_id = sy.id
-            WHERE 1=1
+        ids = self._resolve_ids(section_name, academic_year_name)
+        if ids is None:
+            return []  # unknown name: nothing can match
+
+        # Attendance rows carry no semester, so that filter does not apply here.
+        start, end = day_range(start_date, end_date)
+        return get_attendance_report(ids[0], ids[1], start, end)
+
+    @staticmethod
+    def _resolve_ids(section_name, academic_year_name):
+        """(section_id, school_year_id) for the filter names, or None if a name is unknown."""
+        school_year_id = get_school_year_id(academic_year_name) if academic_year_name else None
+        section_id = get_section_id(section_name, school_year_id) if section_name else None
+        if (academic_year_name and not school_year_id) or (section_name and not section_id):
+            return None
+        return section_id, school_year_id
+
+    def fetch_summary(self, f, data):
+        """Status counts for the filters, read from the daily rollup table.
+
+        Falls back to counting `data` when the database is unavailable.
         """
-        params = []
-
-        if section_name:
-            sql += " AND sec.name = %s"
-            params.append(section_name)
-
-        if academic_year_name:
-            sql += " AND sy.year_name = %s"
-            params.append(academic_year_name)
-
-        if start_date:
-            sql += " AND DATE(a.datetime) >= %s"
-            params.append(start_date)
-
-        if end_date:
-            sql += " AND DATE(a.datetime) <= %s"
-            params.append(end_date)
-
-        # Optional: if you actually store semester on attendance rows (e.g., a.semester)
-        if semester:
-            sql += " AND (a.semester = %s)"
-            params.append(semester)
-
-        sql += " ORDER BY a.datetime DESC"
-
-        conn = None
         try:
-            conn = get_connection()
-            with conn.cursor() as cur:
-                cur.execute(sql, tuple(params))
-                rows = cur.fetchall()
-            return rows
-        finally:
-            if conn:
-                conn.close()
+            ids = self._resolve_ids(f["section"], f["academic_year"])
+            if ids is None:
+                return {}
+            start, end = day_range(f["start_date"], f["end_date"])
+            return get_attendance_summary(ids[0], ids[1],
+                                          start.date() if start else None, end.date() if end else None)
+        except Exception:
+            counts = {}
+            for r in data:
+                status = str(r.get("status", "")).title()
+                counts[status] = counts.get(status, 0) + 1
+            return counts
+
 
     def fetch_attendance_from_memory(self, section_name, academic_year_name, start_date, end_date, semester):
-        data = []
-        for r in MEM_ATTENDANCE:
-            if section_name and r.get("year_section") != section_name:
-                continue
-            if academic_year_name and r.get("academic_year") != academic_year_name:
-                continue
-            if semester and r.get("semester") != semester:
-                continue
-            if start_date and (r.get("datetime", "") < start_date):
-                continue
-            if end_date and (r.get("datetime", "") > end_date):
-                continue
-            data.append(r)
-        return data
+        start, end = day_range(start_date, end_date)
+        start = start.strftime("%Y-%m-%d %H:%M:%S") if start else None
+        end = end.strftime("%Y-%m-%d %H:%M:%S") if end else None
+        return mem_find_attendance(section_name or None, start, end, academic_year_name or None, semester or None)
 
     # -----------------------
     # Actions
@@ -217,28 +217,19 @@ class ReportsTab(tk.Frame):
             "section": self.section_choice.get().strip(),
             "academic_year": self.academic_year_choice.get().strip(),
             "semester": self.semester_choice.get().strip(),
-            "start_date": self.start_date_var.get().strip(),
-            "end_date": self.end_date_var.get().strip(),
+            "start_date": self.start_date_entry.get_date(),
+            "end_date": self.end_date_entry.get_date(),
         }
 
-    def _get_filtered_data(self):
-        f = self._collect_filters()
+    def _get_filtered_data(self, f=None):
+        # Tk variables may only be read on the main thread, so background
+        # callers collect the filters first and pass them in.
+        f = f or self._collect_filters()
         try:
-            data = self.fetch_attendance_from_db(
+            # rows already carry the REPORT_COLUMNS keys, so no normalized copy is needed
+            return self.fetch_attendance_from_db(
                 f["section"], f["academic_year"], f["start_date"], f["end_date"], f["semester"]
             )
-            # Normalize to expected keys if DB columns differ
-            norm = []
-            for r in data:
-                norm.append({
-                    "datetime": r.get("datetime", ""),
-                    "student_id": r.get("student_id", ""),
-                    "last": r.get("last", ""),
-                    "first": r.get("first", ""),
-                    "year_section": r.get("year_section", ""),
-                    "status": r.get("status", ""),
-                })
-            return norm
         except Exception:
             # Fall back to memory
             return self.fetch_attendance_from_memory(
@@ -246,8 +237,16 @@ class ReportsTab(tk.Frame):
             )
 
     def refresh_preview(self):
-        data = self._get_filtered_data()
+        self.summary_box.config(text="Loading attendance…")
+        self.queries.submit("preview", self._load_preview, self._collect_filters(),
+                            on_done=self._show_preview)
 
+    def _load_preview(self, f):
+        data = self._get_filtered_data(f)
+        return data, self.fetch_summary(f, data)
+
+    def _show_preview(self, result):
+        data, counts = result
         # table
         for it in self.tree.get_children():
             self.tree.delete(it)
@@ -262,33 +261,53 @@ class ReportsTab(tk.Frame):
             ))
 
         # summary
-        total = len(data)
-        present = sum(1 for r in data if str(r.get("status", "")).lower() == "present")
-        absent = total - present
-        self.summary_box.config(text=f"Total records: {total}\nPresent: {present}\nAbsent: {absent}")
+        self.summary_box.config(text="\n".join(summary_lines(counts)))
 
-    def export_to_csv(self):
-        data = self._get_filtered_data()
-        if not data:
-            messagebox.showinfo("No Data", "No attendance records to export.")
+    def _stream_filtered(self, f, chunk_size=1000):
+        """Yield chunks of report rows from a server-side cursor (memory fallback if the DB is down)."""
+        try:
+            ids = self._resolve_ids(f["section"], f["academic_year"])
+            if ids is None:
+                return
+            start, end = day_range(f["start_date"], f["end_date"])
+            chunks = iter_attendance(chunk_size, section_id=ids[0], school_year_id=ids[1], start=start, end=end)
+            first = next(chunks, None)
+        except Exception:
+            yield self.fetch_attendance_from_memory(
+                f["section"], f["academic_year"], f["start_date"], f["end_date"], f["semester"]
+            )
             return
+        if first:
+            yield first
+            yield from chunks
 
-        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV Files", "*.csv")])
+    def export_to_csv(self):
+        path = filedialog.asksaveasfilename(defaultextension=".csv",
+                                            filetypes=[("CSV Files", "*.csv"), ("Gzipped CSV", "*.csv.gz")])
         if not path:
             return
 
-        with open(path, "w", newline="", encoding="utf-8") as f:
-            w = csv.writer(f)
-            w.writerow(["DateTime", "Student ID", "Last Name", "First Name", "Year & Section", "Status"])
-            for r in data:
-                w.writerow([r.get("datetime",""), r.get("student_id",""), r.get("last",""),
-                            r.get("first",""), r.get("year_section",""), r.get("status","")])
+        self.queries.submit(
+            "export", write_csv, path,
+            ["DateTime", "Student ID", "Last Name", "First Name", "Year & Section", "Status"],
+            self._stream_filtered(self._collect_filters()),
+            lambda r: [r.get(c, "") for c in REPORT_COLUMNS],
+            progress=lambda n: self.queries.post(self._show_export_progress, n),
+            on_done=lambda n: self._csv_export_done(path, n))
+
+    def _show_export_progress(self, count):
+        self.loading_label.config(text=f"Exported {count} rows…")
+
+    def _csv_export_done(self, path, count):
+        if not count:
+            os.remove(path)
+            messagebox.showinfo("No Data", "No attendance records to export.")
+            return
         messagebox.showinfo("Exported", f"Report has been successfully exported to {path}")
 
     def export_to_pdf(self):
-        data = self._get_filtered_data()
-        if not data:
-            messagebox.showinfo("No Data", "No attendance records to export.")
+        if self.pdf_job is not None:
+            messagebox.showinfo("Busy", "A PDF report is already being generated.")
             return
 
         path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF Files", "*.pdf")])
@@ -297,48 +316,53 @@ class ReportsTab(tk.Frame):
 
         # header info
         f = self._collect_filters()
-        pdf = canvas.Canvas(path, pagesize=letter)
-        pdf.setFont("Helvetica", 10)
-
-        y = 750
-        pdf.drawString(30, y, "Attendance Report"); y -= 20
-        pdf.drawString(30, y, f"Section: {f['section']}"); y -= 15
-        pdf.drawString(30, y, f"Academic Year: {f['academic_year']}"); y -= 15
+        title = ["Attendance Report", f"Section: {f['section']}", f"Academic Year: {f['academic_year']}"]
         if f["semester"]:
-            pdf.drawString(30, y, f"Semester: {f['semester']}"); y -= 15
-        pdf.drawString(30, y, f"Date Range: {f['start_date']} to {f['end_date']}"); y -= 30
-
-        # columns
-        pdf.drawString(30, y, "DateTime")
-        pdf.drawString(120, y, "Student ID")
-        pdf.drawString(200, y, "Last")
-        pdf.drawString(280, y, "First")
-        pdf.drawString(360, y, "Year & Section")
-        pdf.drawString(480, y, "Status")
-        y -= 15
-
-        # rows (simple pagination)
-        for r in data:
-            if y < 60:
-                pdf.showPage()
-                pdf.setFont("Helvetica", 10)
-                y = 750
-            pdf.drawString(30, y, str(r.get("datetime","")))
-            pdf.drawString(120, y, str(r.get("student_id","")))
-            pdf.drawString(200, y, str(r.get("last","")))
-            pdf.drawString(280, y, str(r.get("first","")))
-            pdf.drawString(360, y, str(r.get("year_section","")))
-            pdf.drawString(480, y, str(r.get("status","")))
-            y -= 15
+            title.append(f"Semester: {f['semester']}")
+        title.append(f"Date Range: {f['start_date']} to {f['end_date']}")
 
-        # summary
-        total = len(data)
-        present = sum(1 for x in data if str(x.get("status","")).lower() == "present")
-        absent = total - present
-        y -= 20
-        pdf.drawString(30, y, f"Total records: {total}"); y -= 15
-        pdf.drawString(30, y, f"Present: {present}"); y -= 15
-        pdf.drawString(30, y, f"Absent: {absent}")
-
-        pdf.save()
+        self.queries.submit("pdf_prepare", self._pdf_source, f,
+                            on_done=lambda source: self._start_pdf(path, title, source))
+
+    def _pdf_source(self, f):
+        """(db_filters, rows) for the report process: DB filters, or the memory rows if the DB is down."""
+        try:
+            ids = self._resolve_ids(f["section"], f["academic_year"])
+        except Exception:
+            return None, self.fetch_attendance_from_memory(
+                f["section"], f["academic_year"], f["start_date"], f["end_date"], f["semester"]
+            )
+        if ids is None:
+            return None, []
+        start, end = day_range(f["start_date"], f["end_date"])
+        return {"section_id": ids[0], "school_year_id": ids[1], "start": start, "end": end}, None
+
+    def _start_pdf(self, path, title, source):
+        db_filters, rows = source
+        self.pdf_job = ReportJob(path, title, db_filters, rows,
+                                 progress=lambda n: self.queries.post(self._show_export_progress, n)).start()
+        self.cancel_pdf_btn.config(state="normal")
+        self.queries.track("pdf", self.pdf_job.future,
+                           on_done=lambda n: self._pdf_done(path, n), on_error=self._pdf_failed)
+
+    def cancel_pdf(self):
+        if self.pdf_job is not None:
+            self.pdf_job.cancel()
+
+    def _pdf_finished(self):
+        self.pdf_job = None
+        self.cancel_pdf_btn.config(state="disabled")
+
+    def _pdf_done(self, path, count):
+        self._pdf_finished()
+        if not count:
+            messagebox.showinfo("No Data", "No attendance records to export.")
+            return
         messagebox.showinfo("Exported", f"Report has been successfully exported to {path}")
+
+    def _pdf_failed(self, exc):
+        self._pdf_finished()
+        if isinstance(exc, ReportCancelled):
+            messagebox.showinfo("Cancelled", "PDF export was cancelled.")
+        else:
+            messagebox.showerror("Export Failed", f"Could not generate the PDF report.\n\n{exc}")
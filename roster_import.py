@@ -0,0 +1,109 @@
+# roster_import.py
+"""Bulk student enrollment from a CSV roster.
+
+Expected header (any column order):
+    student_id, last_name, first_name, middle_name, year_section, section, academic_year
+middle_name and year_section are optional; year_section defaults to the
+section name.
+
+The file is streamed row by row. Years and sections resolve through the
+reference cache and existing student ids are fetched once, so validation
+costs no query per row; valid rows are inserted with executemany in
+batches of `batch_size`, one transaction each.
+
+Usage: python roster_import.py roster.csv [--dry-run]
+"""
+import csv
+import sys
+
+from database import add_students_batch, get_student_ids, get_school_year_id, get_section_id
+
+REQUIRED = ("student_id", "last_name", "first_name", "section", "academic_year")
+
+
+class ImportResult:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.imported = 0       # rows inserted (or that would be, on a dry run)
+        self.errors = []        # [(line number, message)]
+
+    def summary(self, max_errors=10):
+        verb = "would be imported" if self.dry_run else "imported"
+        lines = [f"{self.imported} student(s) {verb}, {len(self.errors)} row(s) rejected."]
+        lines += [f"Line {line}: {msg}" for line, msg in self.errors[:max_errors]]
+        if len(self.errors) > max_errors:
+            lines.append(f"... and {len(self.errors) - max_errors} more.")
+        return "\n".join(lines)
+
+
+def import_roster(path, dry_run=False, batch_size=500, progress=None):
+    """Validate and import the roster at `path`; returns an ImportResult.
+
+    `progress(rows_read)` is called after each batch.
+    """
+    result = ImportResult(dry_run)
+    existing = get_student_ids()
+    seen = set()
+    batch = []
+    rows_read = 0
+
+    def flush():
+        if batch and not dry_run:
+            try:
+                add_students_batch([row for _, row in batch])
+            except Exception as e:
+                result.errors.extend((line, f"batch not saved: {e}") for line, _ in batch)
+                result.imported -= len(batch)
+        batch.clear()
+        if progress:
+            progress(rows_read)
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        header = {(h or "").strip().lower() for h in reader.fieldnames or []}
+        missing = [c for c in REQUIRED if c not in header]
+        if missing:
+            result.errors.append((1, "missing column(s): " + ", ".join(missing)))
+            return result
+
+        for raw in reader:
+            rows_read += 1
+            line = reader.line_num
+            r = {(k or "").strip().lower(): (v or "").strip() for k, v in raw.items()}
+            blank = [c for c in REQUIRED if not r.get(c)]
+            if blank:
+                result.errors.append((line, "empty " + ", ".join(blank)))
+                continue
+            sid = r["student_id"]
+            if sid in seen:
+                result.errors.append((line, f"student {sid} appears twice in the file"))
+                continue
+            seen.add(sid)
+            if sid in existing:
+                result.errors.append((line, f"student {sid} is already enrolled"))
+                continue
+            school_year_id = get_school_year_id(r["academic_year"])
+            if not school_year_id:
+                result.errors.append((line, f"unknown academic year '{r['academic_year']}'"))
+                continue
+            section_id = get_section_id(r["section"], school_year_id)
+            if not section_id:
+                result.errors.append((line, f"section '{r['section']}' not found in {r['academic_year']}"))
+                continue
+
+            batch.append((line, (sid, r["last_name"], r["first_name"], r.get("middle_name", ""),
+                                 r.get("year_section") or r["section"], r["section"], school_year_id, section_id)))
+            result.imported += 1
+            if len(batch) >= batch_size:
+                flush()
+    flush()
+    return result
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(2)
+    res = import_roster(sys.argv[1], dry_run="--dry-run" in sys.argv[2:])
+    print(res.summary(max_errors=len(res.errors)))
+    sys.exit(1 if res.errors else 0)
@@ -0,0 +1,73 @@
+# scan_dedupe.py
+"""Suppression of repeated scans.
+
+A student who taps the scanner several times should be recorded once per
+class. ScanDedupe remembers the accepted scans keyed by (student_id,
+schedule_id) -- or (student_id, day) when no class of the student's
+section is running -- and rejects a repeat of the same key within
+`window`. Entries are kept in a dict for O(1) lookups plus a deque in
+arrival order, so expired ones are evicted from the front without
+scanning everything.
+
+This only spares the database the obvious repeats from one kiosk; the
+unique key on attendance_log (migration 0008) is what makes it hold
+across kiosks for scans into a class.
+"""
+import threading
+from collections import deque
+from datetime import timedelta
+
+
+class DuplicateScan(Exception):
+    def __init__(self, student_id, first):
+        self.student_id = student_id
+        self.first = first   # datetime of the scan already accepted
+        super().__init__(f"Student {student_id} was already recorded at {first:%I:%M %p}")
+
+
+class ScanDedupe:
+    def __init__(self, resolve=None, window=timedelta(minutes=90)):
+        self.resolve = resolve   # (section_id, when) -> schedule_id or None, e.g. schedule_index.resolve
+        self.window = window
+        self._lock = threading.Lock()
+        self._seen = {}          # key -> datetime of the accepted scan
+        self._order = deque()    # (key, datetime) in arrival order
+        self.rejected = 0
+
+    def __len__(self):
+        return len(self._seen)
+
+    def key(self, student_id, section_id, when):
+        schedule_id = None
+        if self.resolve is not None and section_id is not None:
+            try:
+                schedule_id = self.resolve(section_id, when)
+            except Exception:
+                schedule_id = None  # schedules unavailable; fall back to one scan per day
+        return (str(student_id), schedule_id, when.date())
+
+    def admit(self, student_id, section_id, when):
+        """Remember the scan and return its key, or raise DuplicateScan for a repeat."""
+        key = self.key(student_id, section_id, when)
+        with self._lock:
+            self._evict(when)
+            first = self._seen.get(key)
+            if first is not None and when - first < self.window:
+                self.rejected += 1
+                raise DuplicateScan(student_id, first)
+            self._seen[key] = when
+            self._order.append((key, when))
+        return key
+
+    def forget(self, key, when):
+        """Undo admit() for a scan that could not be saved, so a rescan is accepted."""
+        with self._lock:
+            if self._seen.get(key) == when:
+                del self._seen[key]
+
+    def _evict(self, now):
+        order, seen = self._order, self._seen
+        while order and now - order[0][1] >= self.window:
+            key, when = order.popleft()
+            if seen.get(key) == when:  # not superseded by a later scan of the same key
+                del seen[key]
@@ -0,0 +1,64 @@
+# scan_journal.py
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scan_journal.sqlite3")
+
+
+class ScanJournal:
+    """Local append-only journal of scans that could not reach MySQL.
+
+    Backed by SQLite (WAL, synchronous=FULL) so an appended batch survives
+    a crash or power loss. Rows are deleted once they have been replayed.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=FULL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS scans (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                scan_uuid TEXT NOT NULL UNIQUE,
+                student_id TEXT NOT NULL,
+                year_section TEXT,
+                scanned_at TEXT NOT NULL,
+                status TEXT NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def append(self, records):
+        """Durably append (scan_uuid, student_id, year_section, datetime, status) records."""
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO scans (scan_uuid, student_id, year_section, scanned_at, status) "
+                "VALUES (?,?,?,?,?)",
+                [(u, sid, ys, when.isoformat(sep=" "), status) for u, sid, ys, when, status in records]
+            )
+
+    def pending(self, limit=500):
+        """Oldest unreplayed records as (seq, record) pairs."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq, scan_uuid, student_id, year_section, scanned_at, status "
+                "FROM scans ORDER BY seq LIMIT ?", (limit,)
+            ).fetchall()
+        return [(seq, (u, sid, ys, datetime.fromisoformat(at), status)) for seq, u, sid, ys, at, status in rows]
+
+    def remove_through(self, seq):
+        """Drop every record up to and including seq (after a successful replay)."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM scans WHERE seq <= ?", (seq,))
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM scans").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,269 @@
+# scan_queue.py
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+
+import pymysql
+from pymysql.constants import CR, ER
+
+from database import add_attendance_batch, schedule_index
+from db_pool import PoolTimeout
+from scan_dedupe import DuplicateScan, ScanDedupe
+from scan_journal import ScanJournal
+
+# Client errors that mean "MySQL is unreachable" rather than "this batch is bad".
+# pymysql raises OperationalError for most server errors too (unknown column,
+# access denied, deadlock...), and those must not be hidden in the journal.
+CONNECTION_ERRNOS = {CR.CR_CONNECTION_ERROR, CR.CR_CONN_HOST_ERROR, CR.CR_SERVER_GONE_ERROR, CR.CR_SERVER_LOST}
+# Server errors that only mean another transaction got in the way; the batch
+# was rolled back with its connection, so it is simply written again.
+RETRY_ERRNOS = {ER.LOCK_DEADLOCK, ER.LOCK_WAIT_TIMEOUT}
+WRITE_ATTEMPTS = 3
+
+
+def is_offline_error(e):
+    if isinstance(e, (pymysql.err.InterfaceError, PoolTimeout)):
+        return True
+    return isinstance(e, pymysql.err.OperationalError) and bool(e.args) and e.args[0] in CONNECTION_ERRNOS
+
+
+def is_retryable_error(e):
+    return isinstance(e, pymysql.err.OperationalError) and bool(e.args) and e.args[0] in RETRY_ERRNOS
+
+
+class ScanIngestor:
+    """Write-behind queue for scan events with group commit.
+
+    `submit()` returns immediately with a Future. A single writer thread
+    drains the queue and inserts whatever has accumulated as one batched
+    transaction, flushing when `max_batch` rows are waiting or `max_delay`
+    seconds after the first row of the batch arrived. A scan's Future only
+    resolves after its batch has been committed, so resolving it is the
+    durability acknowledgement.
+
+    When MySQL is unreachable, batches are committed to the local
+    ScanJournal instead and the ingestor stays in offline mode, writing
+    straight to the journal, until a replay thread has pushed the backlog
+    back to MySQL. Every scan carries a scan_uuid, so replays are idempotent.
+    A batch that loses a deadlock or a lock wait is retried (WRITE_ATTEMPTS).
+
+    Repeated scans of the same student for the same class are rejected by
+    `submit()` (scan_dedupe) before they are queued; write_batch marks scans
+    Present or Late against the start of their class (attendance_status).
+    A scan's Future resolves to the record as written, status included, or
+    fails with DuplicateScan if MySQL already holds the student's scan for
+    that class from another kiosk.
+    """
+
+    def __init__(self, write_batch=add_attendance_batch, journal=None, max_batch=200, max_delay=0.05,
+                 max_queue=10000, replay_interval=10, dedupe=None):
+        self.write_batch = write_batch
+        self.journal = journal
+        self.dedupe = dedupe if dedupe is not None else ScanDedupe(schedule_index.resolve)
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.replay_interval = replay_interval
+        self.offline = False
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._replay_thread = None
+        self._stopping = threading.Event()
+
+        # metrics
+        self._lock = threading.Lock()
+        self._recent = deque()   # [(commit_time, rows)] over the last minute
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+        self.journaled = 0
+        self.replayed = 0
+        self.repeats_dropped = 0
+        self.retried = 0
+        self.last_replay_error = None
+        self.last_commit_ms = 0.0
+
+    # ---------------- lifecycle ----------------
+    def start(self):
+        if self.journal is None:
+            self.journal = ScanJournal()
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="scan-ingestor", daemon=True)
+            self._thread.start()
+            # replays anything left in the journal by a previous run, then keeps watching
+            self._replay_thread = threading.Thread(target=self._replay_loop, name="scan-replay", daemon=True)
+            self._replay_thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Flush everything still queued, then stop the writer and replay threads."""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._replay_thread.join(timeout)
+        self._thread = self._replay_thread = None
+
+    # ---------------- producer side ----------------
+    def submit(self, student_id, year_section, status="Present", when=None, section_id=None):
+        """Queue one scan.
+
+        Raises scan_dedupe.DuplicateScan for a repeat within the dedupe
+        window and queue.Full if the backlog limit is reached.
+        """
+        when = when or datetime.now()
+        key = self.dedupe.admit(student_id, section_id, when)
+        future = Future()
+        record = (uuid.uuid4().hex, student_id, year_section, when, status)
+        try:
+            self._queue.put_nowait((record, future))
+        except queue.Full:
+            self.dedupe.forget(key, when)
+            raise
+
+        def unsaved(f):
+            # a scan that could not be saved must not block the student's next attempt
+            if f.cancelled() or (f.exception() is not None and not isinstance(f.exception(), DuplicateScan)):
+                self.dedupe.forget(key, when)
+
+        future.add_done_callback(unsaved)
+        return future
+
+    # ---------------- writer side ----------------
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        records = [record for record, _ in batch]
+        started = time.monotonic()
+        written = None
+        try:
+            if self.offline:
+                self._write_journal(records)
+            else:
+                try:
+                    written = self._write(records)
+                except Exception as e:
+                    if not is_offline_error(e):
+                        raise  # a bad batch fails its scans instead of going to the journal
+                    self.offline = True
+                    self._write_journal(records)
+        except Exception as e:
+            with self._lock:
+                self.failed += len(batch)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        now = time.monotonic()
+        repeats = sum(1 for record, saved in zip(records, written or records)
+                      if saved is None or saved[0] != record[0])
+        with self._lock:
+            self.committed += len(batch)
+            self.batches += 1
+            self.repeats_dropped += repeats
+            self.last_commit_ms = (now - started) * 1000
+            self._recent.append((now, len(batch)))
+        for (record, future), saved in zip(batch, written or records):
+            if saved is not None and saved[0] == record[0]:
+                future.set_result(saved)
+            else:
+                # MySQL kept another kiosk's scan of this student for the class
+                future.set_exception(DuplicateScan(record[1], saved[3] if saved else record[3]))
+
+    def _write(self, records):
+        """write_batch(), tried again when the batch lost a deadlock or a lock wait."""
+        for attempt in range(1, WRITE_ATTEMPTS + 1):
+            try:
+                return self.write_batch(records)
+            except Exception as e:
+                if attempt == WRITE_ATTEMPTS or not is_retryable_error(e):
+                    raise
+                with self._lock:
+                    self.retried += 1
+                time.sleep(0.01 * attempt)
+
+    def _write_journal(self, records):
+        self.journal.append(records)
+        with self._lock:
+            self.journaled += len(records)
+
+    # ---------------- replay ----------------
+    def _replay_loop(self):
+        while not self._stopping.is_set():
+            try:
+                self.replay()
+                self.last_replay_error = None
+            except Exception as e:
+                if not is_offline_error(e):
+                    # not a connection problem, so it will not go away by itself
+                    print(f"Error replaying scan journal ({self.journal.count()} scans waiting): {e!r}")
+                self.last_replay_error = str(e)  # still unreachable otherwise; try again after the interval
+            self._stopping.wait(self.replay_interval)
+
+    def replay(self, chunk=500):
+        """Bulk-load the journal backlog into MySQL, oldest first.
+
+        Returns the number of rows replayed. Safe to repeat: rows already in
+        MySQL are skipped by their scan_uuid.
+        """
+        total = 0
+        while True:
+            pending = self.journal.pending(chunk)
+            if not pending:
+                break
+            self._write([record for _, record in pending])
+            self.journal.remove_through(pending[-1][0])
+            total += len(pending)
+            # MySQL is taking writes again; new batches can go there directly
+            self.offline = False
+        with self._lock:
+            self.replayed += total
+        return total
+
+    # ---------------- metrics ----------------
+    def metrics(self, window=60):
+        """Queue depth, totals and rows/s committed over the last `window` seconds."""
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0][0] > window:
+                self._recent.popleft()
+            recent_rows = sum(n for _, n in self._recent)
+            return {
+                "queue_depth": self._queue.qsize(),
+                "committed": self.committed,
+                "failed": self.failed,
+                "batches": self.batches,
+                "offline": self.offline,
+                "journaled": self.journaled,
+                "replayed": self.replayed,
+                "duplicates_rejected": self.dedupe.rejected,
+                "repeats_dropped": self.repeats_dropped,
+                "retried": self.retried,
+                "journal_backlog": self.journal.count() if self.journal else 0,
+                "last_replay_error": self.last_replay_error,
+                "avg_batch": round(self.committed / self.batches, 1) if self.batches else 0,
+                "last_commit_ms": round(self.last_commit_ms, 2),
+                "rows_per_sec": round(recent_rows / window, 2),
+            }
@@ -0,0 +1,86 @@
+# schedule_conflicts.py
+"""Room and instructor double-booking detection.
+
+Schedules are grouped by (term, weekday, room) and (term, weekday,
+instructor); each group is sorted by start time and swept once, keeping a
+heap of the classes still running. Every class that is still running when
+another starts overlaps it, so all conflicting pairs come out in
+O(n log n + k) for k conflicts instead of comparing every pair.
+
+Batch check: python schedule_conflicts.py  (exit status 1 if any conflict)
+"""
+import heapq
+import sys
+
+from schedule_index import DAYS, schedule_span, format_time
+
+CHECKS = (("room", "Room"), ("instructor", "Instructor"))
+
+
+def _key(value):
+    return " ".join(str(value or "").split()).lower()
+
+
+def find_conflicts(schedules):
+    """Every overlapping pair as (kind, a, b), kind being "room" or "instructor".
+
+    `schedules` are rows shaped like get_schedules() output. Classes of
+    different school years or semesters never conflict; back-to-back
+    classes (one ends when the next starts) do not either.
+    """
+    groups = {}
+    for s in schedules:
+        span = schedule_span(s)
+        if span is None:
+            continue
+        day_no, start, end = span
+        term = (s.get("academic_year"), s.get("semester"))
+        for field, _ in CHECKS:
+            value = _key(s.get(field))
+            if value:
+                groups.setdefault((field, term, day_no, value), []).append((start, end, s))
+
+    conflicts = []
+    for (field, _, _, _), items in groups.items():
+        if len(items) < 2:
+            continue
+        items.sort(key=lambda item: item[0])
+        running = []  # heap of (end, seq, schedule)
+        for seq, (start, end, s) in enumerate(items):
+            while running and running[0][0] <= start:
+                heapq.heappop(running)
+            for _, _, other in running:
+                conflicts.append((field, other, s))
+            heapq.heappush(running, (end, seq, s))
+    return conflicts
+
+
+def conflicts_with(candidate, schedules):
+    """Existing schedules that `candidate` would double-book, as (kind, schedule) pairs."""
+    found = []
+    for kind, a, b in find_conflicts(list(schedules) + [candidate]):
+        if a is candidate:
+            found.append((kind, b))
+        elif b is candidate:
+            found.append((kind, a))
+    return found
+
+
+def describe(s):
+    span = schedule_span(s)
+    when = f"{DAYS[span[0]]} {format_time(span[1])}-{format_time(span[2])}" if span else "?"
+    return f"{s.get('subject', '')} ({s.get('section', '')}) {when}, room {s.get('room', '')}, {s.get('instructor', '')}"
+
+
+def _main():
+    from database import get_schedules
+    conflicts = find_conflicts(get_schedules())
+    labels = dict(CHECKS)
+    for kind, a, b in conflicts:
+        print(f"{labels[kind]} conflict:\n  #{a['id']} {describe(a)}\n  #{b['id']} {describe(b)}")
+    print(f"{len(conflicts)} conflict(s) found.")
+    return 1 if conflicts else 0
+
+
+if __name__ == "__main__":
+    sys.exit(_main())
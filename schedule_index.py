@@ -0,0 +1,243 @@
+# schedule_index.py
+import re
+import threading
+from bisect import bisect_right
+from datetime import time, timedelta
+
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+_DAY_NUMBERS = {d.lower(): i for i, d in enumerate(DAYS)}
+_DAY_NUMBERS.update({d[:3].lower(): i for i, d in enumerate(DAYS)})
+
+MAX_GUESSED_MINUTES = 6 * 60  # longest class parse_span will assume when guessing PM
+EARLY_MINUTES = 15            # a scan this long before a class starts counts for that class
+_TIME_RE = re.compile(r"^\s*(\d{1,2})(?::(\d{2}))?(?::\d{2})?\s*([AaPp][Mm])?\s*$")
+
+
+def day_number(day):
+    """Monday=0 .. Sunday=6 (same as datetime.weekday()); None if unknown."""
+    return _DAY_NUMBERS.get(str(day or "").strip().lower())
+
+
+def parse_time(value, am_pm=None):
+    """Minutes since midnight for a schedule time, or None if it cannot be parsed.
+
+    Accepts MySQL TIME values (timedelta), datetime.time and text such as
+    "8:30", "08:30 PM" or "13:00". `am_pm` applies when the text has none.
+    """
+    if value is None:
+        return None
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() // 60) % (24 * 60)
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    m = _TIME_RE.match(str(value))
+    if not m:
+        return None
+    hour, minute = int(m.group(1)), int(m.group(2) or 0)
+    suffix = m.group(3) or ("" if hour == 0 or hour > 12 else am_pm) or ""  # "13:30" is already 24-hour
+    suffix = suffix.upper()
+    if minute > 59 or hour > 23 or (suffix and not 1 <= hour <= 12):
+        return None
+    if suffix == "PM" and hour != 12:
+        hour += 12
+    elif suffix == "AM" and hour == 12:
+        hour = 0
+    return hour * 60 + minute
+
+
+def _bare_hour(value):
+    """The hour of 12-hour text typed without AM/PM ("1:00", "10:30"), else None."""
+    if not isinstance(value, str):
+        return None
+    m = _TIME_RE.match(value)
+    if not m or m.group(3):
+        return None
+    hour = int(m.group(1))
+    return hour if 1 <= hour <= 12 else None
+
+
+def parse_span(start, end):
+    """(start_min, end_min) of a class, or (None, None) if it cannot be settled.
+
+    Times without AM/PM (older schedules were typed that way) follow school
+    hours: 12 and 1-6 are afternoon, 7-11 morning, and an end time that
+    would come before the start is taken as afternoon (if that leaves a
+    class of at most MAX_GUESSED_MINUTES).
+    """
+    times = []
+    for value in (start, end):
+        hour = _bare_hour(value)
+        am_pm = None if hour is None else ("PM" if hour == 12 or hour <= 6 else "AM")
+        times.append(parse_time(value, am_pm))
+    start_min, end_min = times
+    if start_min is None or end_min is None:
+        return None, None
+    if end_min <= start_min and _bare_hour(end) is not None and end_min < 12 * 60:
+        end_min += 12 * 60
+        if end_min - start_min > MAX_GUESSED_MINUTES:
+            return None, None
+    if end_min <= start_min:
+        return None, None
+    return start_min, end_min
+
+
+def format_time(minutes):
+    """"8:30 AM" style text for minutes since midnight."""
+    hour, minute = divmod(minutes, 60)
+    return f"{(hour + 11) % 12 + 1}:{minute:02d} {'AM' if hour < 12 else 'PM'}"
+
+
+def schedule_span(s):
+    """(day_no, start_min, end_min) of a schedule row, or None if it has no usable span.
+
+    Uses the numeric columns (migration 0005) when present, else parses the text.
+    """
+    day_no = s.get("day_no")
+    if day_no is None:
+        day_no = day_number(s.get("day"))
+    start, end = s.get("start_min"), s.get("end_min")
+    if start is None or end is None:
+        start, end = parse_span(s.get("start_time"), s.get("end_time"))
+    if day_no is None or start is None or end is None or end <= start:
+        return None
+    return day_no, start, end
+
+
+class _Intervals:
+    """Intervals of one (day, section), sorted by start, with a running max
+    of end times so a lookup can stop as soon as nothing earlier can cover."""
+    __slots__ = ("starts", "entries", "max_end")
+
+    def __init__(self, entries):
+        self.entries = sorted(entries)  # (start_min, end_min, schedule_id)
+        self.starts = [e[0] for e in self.entries]
+        self.max_end = []
+        running = -1
+        for e in self.entries:
+            running = max(running, e[1])
+            self.max_end.append(running)
+
+    def find(self, minute, early=0):
+        """The interval covering `minute`, else the first one starting within `early` after it."""
+        after = bisect_right(self.starts, minute)
+        i = after - 1
+        while i >= 0 and self.max_end[i] > minute:
+            start, end, schedule_id = self.entries[i]
+            if end > minute:
+                return schedule_id
+            i -= 1
+        if after < len(self.starts) and self.starts[after] <= minute + early:
+            return self.entries[after][2]
+        return None
+
+
+class ScheduleIndex:
+    """Resolves (section_id, timestamp) to the schedule running at that time.
+
+    Built lazily from get_schedules() rows into per-day, per-section sorted
+    interval lists, so a lookup is a bisect rather than a query. The
+    schedule helpers in database.py keep it current with put()/remove();
+    only the affected (day, section) list is rebuilt.
+    """
+
+    def __init__(self, load_schedules):
+        self._load = load_schedules
+        self._lock = threading.Lock()
+        self._index = None   # {(day_no, section_id): _Intervals}
+        self._where = None   # {schedule_id: (day_no, section_id, start_min, end_min)}
+        self._gen = 0        # bumped on invalidation so an in-flight load is not installed
+
+    # ---------------- loading ----------------
+    def ensure_loaded(self):
+        with self._lock:
+            if self._index is not None:
+                return
+            gen = self._gen
+        where = {}
+        for s in self._load():
+            entry = self._entry(s)
+            if entry:
+                where[s["id"]] = entry
+        groups = {}
+        for schedule_id, (day_no, section_id, start, end) in where.items():
+            groups.setdefault((day_no, section_id), []).append((start, end, schedule_id))
+        index = {key: _Intervals(entries) for key, entries in groups.items()}
+        with self._lock:
+            if gen == self._gen:
+                self._index, self._where = index, where
+
+    @staticmethod
+    def _entry(s):
+        span = schedule_span(s)
+        if span is None:
+            return None  # unparseable or overnight entries never match a scan
+        return span[0], s.get("section_id"), span[1], span[2]
+
+    def _rebuild(self, key):
+        entries = [(start, end, sid) for sid, (d, sec, start, end) in self._where.items() if (d, sec) == key]
+        if entries:
+            self._index[key] = _Intervals(entries)
+        else:
+            self._index.pop(key, None)
+
+    # ---------------- lookups ----------------
+    def resolve(self, section_id, when, early_minutes=EARLY_MINUTES):
+        """Id of the schedule of `section_id` running at datetime `when`, or
+        starting within `early_minutes` after it; else None."""
+        if section_id is None or when is None:
+            return None
+        self.ensure_loaded()
+        index = self._index
+        intervals = index.get((when.weekday(), section_id)) if index is not None else None
+        return intervals.find(when.hour * 60 + when.minute, early_minutes) if intervals else None
+
+    def start_minute(self, schedule_id):
+        """Start of a schedule in minutes since midnight, else None."""
+        if schedule_id is None:
+            return None
+        self.ensure_loaded()
+        entry = (self._where or {}).get(schedule_id)
+        return entry[2] if entry else None
+
+    def sections_in_session(self, when, early_minutes=EARLY_MINUTES):
+        """Ids of the sections that have a class running at datetime `when` (or about to start)."""
+        self.ensure_loaded()
+        index = self._index or {}
+        minute = when.hour * 60 + when.minute
+        return {section_id for (day_no, section_id), intervals in list(index.items())
+                if day_no == when.weekday() and intervals.find(minute, early_minutes) is not None}
+
+    # ---------------- incremental updates ----------------
+    def put(self, schedule):
+        """Add or replace one schedule (a dict shaped like a get_schedules() row)."""
+        with self._lock:
+            if self._index is None:
+                self._gen += 1  # a load in flight may predate this change
+                return
+            schedule = dict(schedule, id=int(schedule["id"]))  # Treeview hands ids back as text
+            old = self._where.pop(schedule["id"], None)
+            if schedule.get("section_id") is None:
+                if not old:  # section unknown here; reload on next use
+                    self._index = self._where = None
+                    self._gen += 1
+                    return
+                schedule = dict(schedule, section_id=old[1])  # updates do not move a schedule between sections
+            entry = self._entry(schedule)
+            if entry:
+                self._where[schedule["id"]] = entry
+            for key in {old[:2] if old else None, entry[:2] if entry else None} - {None}:
+                self._rebuild(key)
+
+    def remove(self, schedule_id):
+        with self._lock:
+            if self._index is None:
+                self._gen += 1
+                return
+            old = self._where.pop(int(schedule_id), None)
+            if old:
+                self._rebuild(old[:2])
+
+    def invalidate(self):
+        with self._lock:
+            self._index = self._where = None
+            self._gen += 1
@@ -6,8 +6,11 @@ from database import (
     get_academic_years, get_sections,
     add_sections, add_academic_year, get_schedules,
     add_schedule, delete_schedule, delete_section,
-    get_students_by_section
+    get_students_by_section, get_school_year_id, get_section_id
 )
+from query_executor import QueryExecutor
+from schedule_index import day_number, parse_time, parse_span, format_time
+from schedule_conflicts import conflicts_with, describe
 
 
 class ScheduleTab(tk.Frame):
@@ -33,8 +36,9 @@ class ScheduleTab(tk.Frame):
     def update_schedule_table(self):
         """Refresh the schedule table with latest data."""
         section_name = self.section_var.get()
-        schedules = get_schedules(section_name)
+        self.queries.submit("schedules", get_schedules, section_name, on_done=self._fill_schedule_table)
 
+    def _fill_schedule_table(self, schedules):
         for item in self.tree.get_children():
             self.tree.delete(item)
 
@@ -117,6 +121,9 @@ class ScheduleTab(tk.Frame):
         right_frame.pack(side="right", fill="both", expand=True, padx=8, pady=8)
 
         mk_label(right_frame, "Class Schedules", font=("Segoe UI", 14, "bold"), bg=LIGHT_BG).pack(pady=8)
+        self.loading_label = mk_label(right_frame, "", font=("Segoe UI", 9, "italic"), bg=LIGHT_BG)
+        self.loading_label.pack()
+        self.queries = QueryExecutor(self, indicator=self.loading_label)
 
         cols = ("id", "subject", "instructor", "day", "start", "end", "room", "section", "academic_year", "semester")
         self.tree = ttk.Treeview(right_frame, columns=cols, show="headings")
@@ -161,14 +168,13 @@ class ScheduleTab(tk.Frame):
                 messagebox.showwarning("Missing Academic Year", "Please select an academic year.")
                 return
 
-            years = get_academic_years()
-            sy_row = next((y for y in years if y["year_name"] == ay_name), None)
-            if not sy_row:
+            school_year_id = get_school_year_id(ay_name)
+            if not school_year_id:
                 messagebox.showerror("Not Found", f"Academic year '{ay_name}' not found.")
                 return
 
             try:
-                add_sections(section_name, sy_row["id"])
+                add_sections(section_name, school_year_id)
             except Exception as e:
                 messagebox.showerror("DB Error", f"Could not add section.\n\n{e}")
                 return
@@ -214,22 +220,41 @@ class ScheduleTab(tk.Frame):
             return
 
         ay_name = self.academic_year_var.get().strip()
-        years = get_academic_years()
-        sy_row = next((y for y in years if y["year_name"] == ay_name), None)
-        if not sy_row:
+        school_year_id = get_school_year_id(ay_name)
+        if not school_year_id:
             messagebox.showerror("Invalid AY", f"Academic Year '{ay_name}' not found.")
             return
 
-        school_year_id = sy_row["id"]
         section = self.section_var.get().strip()
         subject = self.vars['subject'].get().strip()
         instructor = self.vars['instructor'].get().strip()
         room = self.vars['room'].get().strip()
         day = self.day_var.get().strip()
-        start_time = self.start_time_var.get().strip()
-        end_time = self.end_time_var.get().strip()
         semester = self.semester_var.get().strip()
 
+        # the AM/PM pickers apply unless the time is typed with its own suffix or as 24-hour
+        start_min = parse_time(self.start_time_var.get(), self.start_am_pm_var.get())
+        end_min = parse_time(self.end_time_var.get(), self.end_am_pm_var.get())
+        if start_min is None or end_min is None:
+            messagebox.showerror("Invalid Time", "Enter times like 8:00 or 1:30.")
+            return
+        if end_min <= start_min:
+            messagebox.showerror("Invalid Time", "End time must be after the start time.")
+            return
+        start_time, end_time = format_time(start_min), format_time(end_min)
+
+        candidate = {"subject": subject, "instructor": instructor, "room": room, "section": section, "day": day,
+                     "start_min": start_min, "end_min": end_min, "academic_year": ay_name, "semester": semester}
+        try:
+            clashes = conflicts_with(candidate, get_schedules())
+        except Exception as e:
+            messagebox.showerror("DB Error", f"Could not check for schedule conflicts.\n\n{e}")
+            return
+        if clashes:
+            lines = "\n".join(f"{kind.title()}: {describe(s)}" for kind, s in clashes[:10])
+            if not messagebox.askyesno("Schedule Conflict", f"This schedule double-books:\n\n{lines}\n\nAdd it anyway?"):
+                return
+
         try:
             add_schedule(section, subject, instructor, day, start_time, end_time, room, school_year_id, semester)
             self.update_schedule_table()
@@ -272,13 +297,20 @@ class ScheduleTab(tk.Frame):
 
         def save_changes():
             from database import update_schedule
+            start_min, end_min = parse_span(vars["start_time"].get(), vars["end_time"].get())
+            if day_number(vars["day"].get()) is None:
+                messagebox.showerror("Invalid Day", "Enter a weekday such as Monday.", parent=dlg)
+                return
+            if start_min is None:
+                messagebox.showerror("Invalid Time", "Enter a start and end time like 8:00 AM and 9:30 AM.", parent=dlg)
+                return
             update_schedule(
                 schedule_id,
                 vars["subject"].get(),
                 vars["instructor"].get(),
                 vars["day"].get(),
-                vars["start_time"].get(),
-                vars["end_time"].get(),
+                format_time(start_min),
+                format_time(end_min),
                 vars["room"].get(),
                 vars["semester"].get(),
             )
@@ -310,15 +342,11 @@ class ScheduleTab(tk.Frame):
             messagebox.showwarning("No Section", "Please select a section first.")
             return
 
-        # Find section row
-        sections = get_sections()
-        sec_row = next((s for s in sections if s["name"] == section_name), None)
-        if not sec_row:
+        section_id = get_section_id(section_name)
+        if not section_id:
             messagebox.showerror("Error", f"Section '{section_name}' not found.")
             return
 
-        section_id = sec_row["id"]
-
         # Check if students exist
         students = get_students_by_section(section_id)
         if students:
@@ -0,0 +1,227 @@
+# template_store.py
+"""Persistent fingerprint templates in a memory-mapped file.
+
+Layout: a 64-byte header (magic, template size, first and end slot of the
+records in use, generation) followed by fixed-size records (student_id,
+section_id, active flag, float32 vector). Enrollment only ever appends at
+the end slot: re-enrolling a student clears the active flag of the old
+record and writes a new one, and removals just clear the flag. A record's
+id and vector never change while it is in use.
+
+compact() copies the live records into slots outside the range in use --
+the front of the file if they fit before the first slot, else past the
+end -- flushes them, and only then switches the header to the new range
+in one write. A crash before the switch leaves the old range intact, and
+readers never see records move under them.
+
+Opening the store maps the file and builds the student_id -> slot index
+from the id column; templates are not deserialized one by one, the matcher
+takes the whole vector column in one copy. The generation in the header is
+bumped on every change so other processes mapping the file can tell when
+to re-read it; read_live() repeats its copy if the generation moved
+meanwhile. The file itself is never replaced or shrunk: Windows does not
+allow that while other processes have it mapped.
+
+Compact: python template_store.py --compact
+"""
+import os
+import sys
+import threading
+
+import numpy as np
+
+from fp_match import TEMPLATE_DIM, as_template
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fingerprint_templates.dat")
+MAGIC = b"CASTPL01"
+HEADER = np.dtype([("magic", "S8"), ("dim", "<u4"), ("record_size", "<u4"),
+                   ("count", "<u8"), ("generation", "<u8"), ("base", "<u8"), ("reserved", "V24")])
+RECORD = np.dtype([("student_id", "S32"), ("section_id", "<i4"), ("active", "<i4"),
+                   ("vec", "<f4", (TEMPLATE_DIM,))])
+MIN_CAPACITY = 1024
+
+
+def map_records(path, mode="r"):
+    """(header, records) memmaps of a template file; records spans the whole capacity,
+    slots base..count are in use."""
+    header = np.memmap(path, dtype=HEADER, mode=mode, shape=(1,))
+    if header["magic"][0] != MAGIC or header["dim"][0] != TEMPLATE_DIM:
+        raise ValueError(f"{path} is not a {TEMPLATE_DIM}-value template file")
+    capacity = (os.path.getsize(path) - HEADER.itemsize) // RECORD.itemsize
+    records = np.memmap(path, dtype=RECORD, mode=mode, offset=HEADER.itemsize, shape=(capacity,))
+    return header, records
+
+
+def live_records(records, base, count):
+    """(student_ids, section_ids, vectors) of the active records in slots base..count."""
+    used = records[base:count]
+    live = np.flatnonzero(used["active"])
+    ids = [sid.decode() for sid in used["student_id"][live]]
+    return ids, used["section_id"][live], used["vec"][live]
+
+
+def read_live(path):
+    """(header, generation, (student_ids, section_ids, vectors)) of a file another process writes.
+
+    The records are copied out and the copy is repeated until the
+    generation stayed the same throughout, so ids and vectors always come
+    from one state of the file.
+    """
+    while True:
+        header, records = map_records(path, mode="r")
+        generation = int(header["generation"][0])
+        base, count = int(header["base"][0]), int(header["count"][0])
+        if count > len(records):
+            continue  # the file grew after it was mapped
+        ids, sections, vectors = live_records(records, base, count)
+        live = (ids, np.array(sections), np.array(vectors))
+        if int(header["generation"][0]) == generation:
+            return header, generation, live
+
+
+class TemplateStore:
+    def __init__(self, path=TEMPLATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._header = None
+        self._records = None
+        self._slots = {}    # student_id -> slot of its active record
+
+    # ---------------- file handling ----------------
+    def open(self):
+        with self._lock:
+            if self._records is None:
+                if not os.path.exists(self.path):
+                    self._create(self.path, MIN_CAPACITY)
+                self._map()
+        return self
+
+    @staticmethod
+    def _create(path, capacity):
+        header = np.zeros(1, dtype=HEADER)
+        header["magic"], header["dim"], header["record_size"] = MAGIC, TEMPLATE_DIM, RECORD.itemsize
+        with open(path, "wb") as f:
+            f.write(header.tobytes())
+            f.truncate(HEADER.itemsize + capacity * RECORD.itemsize)
+
+    def _map(self):
+        self._header, self._records = map_records(self.path, mode="r+")
+        used = self._records[self.base:self.count]
+        live = np.flatnonzero(used["active"])
+        self._slots = {sid.decode(): self.base + int(slot) for sid, slot in zip(used["student_id"][live], live)}
+
+    def _grow(self, needed=0):
+        capacity = len(self._records) * 2
+        while capacity < needed:
+            capacity *= 2
+        self._records.flush()
+        self._header = self._records = None
+        with open(self.path, "r+b") as f:
+            f.truncate(HEADER.itemsize + capacity * RECORD.itemsize)
+        self._map()
+
+    @property
+    def count(self):
+        return int(self._header["count"][0])
+
+    @property
+    def base(self):
+        return int(self._header["base"][0])
+
+    @property
+    def generation(self):
+        return int(self._header["generation"][0])
+
+    def _commit(self, count=None, base=None):
+        """Flush the records, then publish them with one header write."""
+        self._records.flush()
+        header = self._header[0].copy()
+        if count is not None:
+            header["count"] = count
+        if base is not None:
+            header["base"] = base
+        header["generation"] += 1
+        self._header[0] = header
+        self._header.flush()
+
+    # ---------------- enrollment ----------------
+    def append(self, student_id, template, section_id=None):
+        """Store a student's template, superseding any earlier one."""
+        vec = as_template(template)
+        key = str(student_id).encode()
+        if len(key) > 32:
+            raise ValueError("student_id is longer than 32 bytes")
+        with self._lock:
+            slot = self.count
+            if slot >= len(self._records):
+                self._grow()
+            records = self._records
+            records["student_id"][slot], records["section_id"][slot], records["vec"][slot] = key, section_id or 0, vec
+            records["active"][slot] = 1
+            old = self._slots.get(str(student_id))
+            if old is not None:
+                records["active"][old] = 0
+            self._slots[str(student_id)] = slot
+            self._commit(slot + 1)
+
+    def remove(self, student_id):
+        with self._lock:
+            slot = self._slots.pop(str(student_id), None)
+            if slot is not None:
+                self._records["active"][slot] = 0
+                self._commit()
+
+    def __contains__(self, student_id):
+        return str(student_id) in self._slots
+
+    def __len__(self):
+        return len(self._slots)
+
+    def template(self, student_id):
+        slot = self._slots.get(str(student_id))
+        return None if slot is None else np.array(self._records["vec"][slot])
+
+    def active(self):
+        """(student_ids, section_ids, vectors) of the live records, read as whole columns."""
+        with self._lock:
+            return live_records(self._records, self.base, self.count)
+
+    # ---------------- compaction ----------------
+    def dead_ratio(self):
+        used = self.count - self.base
+        return 1 - len(self._slots) / used if used else 0.0
+
+    def compact(self):
+        """Copy the live records to slots outside the range in use, then switch to them."""
+        with self._lock:
+            base, count = self.base, self.count
+            live = base + np.flatnonzero(self._records["active"][base:count])
+            start = 0 if len(live) <= base else count   # the front if it has room, else past the end
+            if start + len(live) > len(self._records):
+                self._grow(start + len(live))
+            self._records[start:start + len(live)] = self._records[live]  # fancy indexing copies first
+            self._commit(start + len(live), start)
+            self._slots = {sid.decode(): start + i
+                           for i, sid in enumerate(self._records["student_id"][start:start + len(live)])}
+
+    def maybe_compact(self, threshold=0.25):
+        """Compact when more than `threshold` of the records are superseded."""
+        if self.dead_ratio() > threshold:
+            self.compact()
+            return True
+        return False
+
+
+# Shared by enrollment and the kiosk; call open() before use (it is idempotent).
+templates = TemplateStore()
+
+
+if __name__ == "__main__":
+    ts = TemplateStore().open()
+    if "--compact" in sys.argv[1:]:
+        before = ts.count - ts.base
+        ts.compact()
+        print(f"Compacted {before} records to {ts.count - ts.base}.")
+    else:
+        print(f"{len(ts)} enrolled, {ts.count - ts.base} records, {ts.dead_ratio():.0%} superseded, "
+              f"generation {ts.generation}.")
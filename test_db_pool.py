@@ -0,0 +1,97 @@
+# test_db_pool.py
+"""Tests for the connection pool, with fake connections (no database needed).
+
+Run: python -m unittest test_db_pool
+"""
+import threading
+import unittest
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, n):
+        self.n = n
+        self.open = True
+        self.server_status = 0
+        self.pings = 0
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.open:
+            raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.server_status &= ~SERVER_STATUS.SERVER_STATUS_IN_TRANS
+
+    def close(self):
+        self.open = False
+
+
+class ConnectionPoolTest(unittest.TestCase):
+    def setUp(self):
+        self.made = []
+        self.pool = ConnectionPool(self.connect, max_size=2, checkout_timeout=0.05)
+
+    def connect(self):
+        conn = FakeConnection(len(self.made))
+        self.made.append(conn)
+        return conn
+
+    def test_connections_are_reused(self):
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            self.assertIs(second, first)
+        stats = self.pool.stats()
+        self.assertEqual((stats["misses"], stats["hits"], stats["idle"], stats["in_use"]), (1, 1, 1, 0))
+
+    def test_bounded(self):
+        a, b = self.pool.acquire(), self.pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+        threading.Timer(0.01, self.pool.release, (a,)).start()
+        self.assertIs(self.pool.acquire(timeout=1), a)   # a waiter gets the released connection
+        self.assertEqual(len(self.made), 2)
+        self.assertEqual(self.pool.stats()["waits"], 2)
+        self.pool.release(b)
+
+    def test_open_transaction_rolled_back_on_release(self):
+        with self.pool.connection() as conn:
+            conn.server_status |= SERVER_STATUS.SERVER_STATUS_IN_TRANS
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+    def test_network_error_discards_connection(self):
+        with self.assertRaises(pymysql.err.OperationalError):
+            with self.pool.connection() as conn:
+                raise pymysql.err.OperationalError(2013, "Lost connection")
+        self.assertFalse(conn.open)
+        with self.assertRaises(ValueError):
+            with self.pool.connection() as other:
+                raise ValueError("not a connection problem")
+        self.assertIsNot(other, conn)
+        self.assertTrue(other.open)   # kept for reuse
+        self.assertEqual(self.pool.stats()["idle"], 1)
+
+    def test_stale_connections_checked_and_evicted(self):
+        self.pool.health_check_after = 0
+        with self.pool.connection() as conn:
+            pass
+        conn.open = False   # dropped by the server while idle
+        with self.pool.connection() as fresh:
+            self.assertIsNot(fresh, conn)
+        self.assertEqual(self.pool.stats()["failed_health_checks"], 1)
+        self.pool.idle_timeout = 0
+        self.pool.acquire()
+        self.assertFalse(fresh.open)   # idle past the timeout
+        self.assertEqual(self.pool.stats()["evicted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+# test_fingerprint.py
+"""Tests for fingerprint templates and matching, on synthetic images (no scanner or database needed).
+
+Run: python -m unittest test_fingerprint
+"""
+import unittest
+
+import numpy as np
+
+from fp_features import extract_templates, synthetic_images
+from fp_lsh import DUPLICATE_THRESHOLD, LshIndex
+from fp_match import MATCH_THRESHOLD, TEMPLATE_DIM, FingerprintMatcher, impostor_threshold
+
+SHAPE = (160, 160)   # small prints keep the extraction quick
+
+
+def unit_rows(n, seed):
+    rows = np.random.default_rng(seed).standard_normal((n, TEMPLATE_DIM)).astype(np.float32)
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+class FingerprintMatcherTest(unittest.TestCase):
+    def test_unenrolled_fingers_are_not_taken_for_students(self):
+        enrolled = extract_templates(synthetic_images(200, SHAPE, seed=1))
+        outsiders = extract_templates(synthetic_images(50, SHAPE, seed=2))
+        matcher = FingerprintMatcher()
+        matcher.load_arrays([f"S{i}" for i in range(len(enrolled))], [1] * len(enrolled), enrolled)
+        self.assertGreater(matcher.threshold, MATCH_THRESHOLD)
+        accepted = [p for p in outsiders if matcher.identify(p)[0] is not None]
+        self.assertEqual(accepted, [])
+
+    def test_recapture_is_identified(self):
+        enrolled = unit_rows(500, seed=3)
+        matcher = FingerprintMatcher()
+        matcher.load_arrays([f"S{i}" for i in range(500)], [1 + i % 10 for i in range(500)], enrolled)
+        noise = 0.3 * unit_rows(500, seed=4)
+        for i in range(0, 500, 25):
+            self.assertEqual(matcher.identify(enrolled[i] + noise[i])[0], f"S{i}")
+            self.assertEqual(matcher.identify(enrolled[i] + noise[i], {1 + i % 10})[0], f"S{i}")
+
+    def test_close_runner_up_is_ambiguous(self):
+        twin = unit_rows(1, seed=5)[0]
+        matcher = FingerprintMatcher()
+        matcher.load([("A", 1, twin), ("B", 1, twin + 0.01 * unit_rows(1, seed=6)[0])])
+        student_id, score = matcher.identify(twin)
+        self.assertIsNone(student_id)
+        self.assertGreater(score, 0.99)
+
+    def test_threshold_calibration(self):
+        rows = extract_templates(synthetic_images(120, SHAPE, seed=7))
+        self.assertEqual(impostor_threshold(rows[:10]), MATCH_THRESHOLD)   # too few to calibrate
+        self.assertLess(impostor_threshold(rows, target=0.1), impostor_threshold(rows, target=0.0001))
+        scores = (rows @ rows.T)[np.triu_indices(len(rows), 1)]
+        self.assertGreaterEqual(impostor_threshold(rows), scores.max())
+        self.assertEqual(impostor_threshold(unit_rows(2000, seed=8)), MATCH_THRESHOLD)   # distinct enough
+
+
+class LshIndexTest(unittest.TestCase):
+    def test_distinct_fingers_do_not_collide(self):
+        enrolled = extract_templates(synthetic_images(250, SHAPE, seed=11))
+        newcomers = extract_templates(synthetic_images(50, SHAPE, seed=12))
+        index = LshIndex().build([f"S{i}" for i in range(250)], enrolled)
+        self.assertEqual(index.audit(), [])
+        flagged = [i for i, t in enumerate(newcomers) if index.near_duplicates(t)]
+        self.assertLessEqual(len(flagged), 1)
+
+    def test_recapture_is_a_duplicate(self):
+        enrolled = unit_rows(300, seed=13)
+        index = LshIndex().build([f"S{i}" for i in range(300)], enrolled)
+        self.assertEqual(index.threshold, DUPLICATE_THRESHOLD)
+        noise = 0.3 * unit_rows(300, seed=14)
+        for i in range(0, 300, 30):
+            matches = index.near_duplicates(enrolled[i] + noise[i], exclude="new")
+            self.assertEqual([sid for sid, _ in matches], [f"S{i}"])
+
+    def test_grows_from_empty(self):
+        index = LshIndex().build([], np.zeros((0, TEMPLATE_DIM)))
+        enrolled = unit_rows(100, seed=15)
+        for i, t in enumerate(enrolled):
+            index.add(f"S{i}", t)
+        self.assertEqual(index.near_duplicates(enrolled[42] + 0.2 * unit_rows(1, seed=16)[0])[0][0], "S42")
+        index.remove("S42")
+        self.assertEqual(index.near_duplicates(enrolled[42]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
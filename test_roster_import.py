@@ -0,0 +1,85 @@
+# test_roster_import.py
+"""Tests for the CSV roster import, with the database helpers replaced (no database needed).
+
+Run: python -m unittest test_roster_import
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import roster_import
+
+HEADER = "student_id,last_name,first_name,middle_name,section,academic_year\n"
+
+
+class ImportRosterTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.saved = []        # batches passed to add_students_batch
+        self.fail_batches = 0  # how many of the next batches raise
+        patches = {
+            "get_student_ids": lambda: {"2026-0001"},
+            "get_school_year_id": lambda name: {"2026-2027": 3}.get(name),
+            "get_section_id": lambda name, year_id: {("BSIT 1A", 3): 11}.get((name, year_id)),
+            "add_students_batch": self.add_students_batch,
+        }
+        for name, fake in patches.items():
+            patcher = mock.patch.object(roster_import, name, fake)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def add_students_batch(self, rows):
+        if self.fail_batches:
+            self.fail_batches -= 1
+            raise RuntimeError("Deadlock found")
+        self.saved.append(list(rows))
+
+    def roster(self, text, header=HEADER):
+        path = os.path.join(self.dir.name, "roster.csv")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(header + text)
+        return path
+
+    def test_valid_rows_inserted_in_batches(self):
+        path = self.roster("".join(f"2026-01{i:02d},Cruz,Ana,,BSIT 1A,2026-2027\n" for i in range(5)))
+        progress = []
+        result = roster_import.import_roster(path, batch_size=2, progress=progress.append)
+        self.assertEqual((result.imported, result.errors), (5, []))
+        self.assertEqual([len(b) for b in self.saved], [2, 2, 1])
+        self.assertEqual(progress, [2, 4, 5])
+        self.assertEqual(self.saved[0][0], ("2026-0100", "Cruz", "Ana", "", "BSIT 1A", "BSIT 1A", 3, 11))
+
+    def test_invalid_rows_rejected_with_line_numbers(self):
+        path = self.roster("2026-0002,Cruz,Ana,,BSIT 1A,2026-2027\n"
+                           "2026-0002,Cruz,Ana,,BSIT 1A,2026-2027\n"   # twice in the file
+                           "2026-0001,Reyes,Ben,,BSIT 1A,2026-2027\n"  # already enrolled
+                           "2026-0003,,Carl,,BSIT 1A,2026-2027\n"
+                           "2026-0004,Santos,Dan,,BSIT 1A,2030-2031\n"
+                           "2026-0005,Santos,Eve,,BSCS 1A,2026-2027\n")
+        result = roster_import.import_roster(path)
+        self.assertEqual(result.imported, 1)
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5, 6, 7])
+        self.assertIn("empty last_name", result.errors[2][1])
+
+    def test_dry_run_and_missing_columns(self):
+        path = self.roster("2026-0002,Cruz,Ana,,BSIT 1A,2026-2027\n")
+        result = roster_import.import_roster(path, dry_run=True)
+        self.assertEqual((result.imported, self.saved), (1, []))
+        self.assertIn("would be imported", result.summary())
+        result = roster_import.import_roster(self.roster("", header="student_id,last_name\n"))
+        self.assertEqual(result.errors, [(1, "missing column(s): first_name, section, academic_year")])
+
+    def test_failed_batch_reported(self):
+        self.fail_batches = 1
+        path = self.roster("2026-0002,Cruz,Ana,,BSIT 1A,2026-2027\n2026-0003,Reyes,Ben,,BSIT 1A,2026-2027\n")
+        result = roster_import.import_roster(path, batch_size=1)
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(result.errors, [(2, "batch not saved: Deadlock found")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+# test_scan_queue.py
+"""Tests for the scan write-behind queue, with a fake batch writer (no database needed).
+
+Run: python -m unittest test_scan_queue
+"""
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+import pymysql
+
+from scan_dedupe import DuplicateScan, ScanDedupe
+from scan_journal import ScanJournal
+from scan_queue import ScanIngestor
+
+MONDAY = datetime(2026, 10, 19)   # a Monday
+
+
+class ScanIngestorTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.journal = ScanJournal(os.path.join(self.dir.name, "journal.sqlite3"))
+        self.kept = {}        # student_id -> record MySQL already holds for the class
+        self.batches = []
+        self.failures = []    # exceptions the next write_batch calls raise
+        self.ingestor = ScanIngestor(write_batch=self.write_batch, journal=self.journal, dedupe=ScanDedupe(),
+                                     max_delay=0.01, replay_interval=0.05).start()
+
+    def tearDown(self):
+        self.ingestor.stop()
+        self.journal.close()
+        self.dir.cleanup()
+
+    def write_batch(self, records):
+        self.batches.append(list(records))
+        if self.failures:
+            raise self.failures.pop(0)
+        return [self.kept.get(r[1], r) for r in records]
+
+    def test_saved_scan_resolves_to_stored_row(self):
+        saved = self.ingestor.submit("S1", "BSIT 1A", when=MONDAY.replace(hour=8)).result(timeout=2)
+        self.assertEqual(saved[1:], ("S1", "BSIT 1A", MONDAY.replace(hour=8), "Present"))
+
+    def test_queued_scans_committed_in_batches(self):
+        ingestor = ScanIngestor(write_batch=self.write_batch, journal=self.journal, dedupe=ScanDedupe(),
+                                max_batch=3, max_delay=0.05)
+        acks = [ingestor.submit(f"S{i}", "BSIT 1A", when=MONDAY.replace(hour=8, minute=i)) for i in range(4)]
+        ingestor.start()
+        ingestor.stop()   # flushes what is still queued
+        self.assertEqual([ack.result(timeout=0)[1] for ack in acks], ["S0", "S1", "S2", "S3"])
+        self.assertEqual([len(b) for b in self.batches], [3, 1])
+        metrics = ingestor.metrics()
+        self.assertEqual((metrics["committed"], metrics["batches"], metrics["queue_depth"]), (4, 2, 0))
+
+    def test_repeat_kept_by_mysql_is_not_confirmed(self):
+        self.kept["S1"] = ("other-kiosk", "S1", "BSIT 1A", MONDAY.replace(hour=7, minute=55), "Present")
+        ack = self.ingestor.submit("S1", "BSIT 1A", when=MONDAY.replace(hour=8, minute=2))
+        with self.assertRaises(DuplicateScan) as caught:
+            ack.result(timeout=2)
+        self.assertEqual(caught.exception.first, MONDAY.replace(hour=7, minute=55))
+        self.assertEqual(self.ingestor.metrics()["repeats_dropped"], 1)
+        with self.assertRaises(DuplicateScan):   # still remembered locally
+            self.ingestor.submit("S1", "BSIT 1A", when=MONDAY.replace(hour=8, minute=5))
+
+    def test_offline_scans_journaled_and_replayed(self):
+        self.failures = [pymysql.err.OperationalError(2003, "Can't connect to MySQL server")]
+        saved = self.ingestor.submit("S1", "BSIT 1A", when=MONDAY.replace(hour=8)).result(timeout=2)
+        self.assertEqual(saved[1], "S1")   # acknowledged once it is in the journal
+        deadline = time.monotonic() + 2
+        while self.ingestor.metrics()["replayed"] < 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        metrics = self.ingestor.metrics()
+        self.assertEqual((metrics["journaled"], metrics["replayed"], metrics["journal_backlog"]), (1, 1, 0))
+        self.assertFalse(metrics["offline"])
+        self.assertEqual(self.batches[-1], [saved])   # replayed with its scan_uuid
+
+    def test_bad_batch_is_not_journaled(self):
+        self.failures = [pymysql.err.OperationalError(1054, "Unknown column 'once_key'")]
+        with self.assertRaises(pymysql.err.OperationalError):
+            self.ingestor.submit("S1", "BSIT 1A", when=MONDAY.replace(hour=8)).result(timeout=2)
+        metrics = self.ingestor.metrics()
+        self.assertEqual((metrics["failed"], metrics["journaled"]), (1, 0))
+        self.assertFalse(metrics["offline"])
+        # the failed scan does not count as the student's scan for the class
+        self.ingestor.submit("S1", "BSIT 1A", when=MONDAY.replace(hour=8, minute=1)).result(timeout=2)
+
+    def test_deadlock_is_retried(self):
+        self.failures = [pymysql.err.OperationalError(1213, "Deadlock found"),
+                         pymysql.err.OperationalError(1205, "Lock wait timeout exceeded")]
+        saved = self.ingestor.submit("S1", "BSIT 1A", when=MONDAY.replace(hour=8)).result(timeout=2)
+        self.assertEqual(saved[1], "S1")
+        self.assertEqual(len(self.batches), 3)
+        self.assertEqual(self.ingestor.metrics()["retried"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
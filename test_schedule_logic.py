@@ -0,0 +1,228 @@
+# test_schedule_logic.py
+"""Tests for the schedule, conflict, absence and scan-dedupe logic (no database needed).
+
+Run: python -m unittest test_schedule_logic
+"""
+import random
+import unittest
+from datetime import date, datetime, timedelta
+
+from absence_job import AbsenceJob, classes_on, current_term
+from attendance_status import GRACE_MINUTES, classify
+from scan_dedupe import DuplicateScan, ScanDedupe
+from schedule_conflicts import find_conflicts
+from schedule_index import ScheduleIndex, parse_span, parse_time, schedule_span
+
+MONDAY = datetime(2026, 10, 19)   # a Monday
+
+
+def schedule(id, start, end, day="Monday", section_id=1, room="R1", instructor="Smith",
+             academic_year="2026-2027", semester="First Semester"):
+    return {"id": id, "day": day, "start_time": start, "end_time": end, "section_id": section_id,
+            "room": room, "instructor": instructor, "academic_year": academic_year, "semester": semester}
+
+
+class ParseTimeTest(unittest.TestCase):
+    def test_formats(self):
+        self.assertEqual(parse_time("8:30"), 510)
+        self.assertEqual(parse_time("08:30 PM"), 1230)
+        self.assertEqual(parse_time("12:00 AM"), 0)
+        self.assertEqual(parse_time("12:15 PM"), 735)
+        self.assertEqual(parse_time("13:00"), 780)
+        self.assertEqual(parse_time(timedelta(hours=9, minutes=5)), 545)
+
+    def test_am_pm_default(self):
+        self.assertEqual(parse_time("1:30", "PM"), 810)
+        self.assertEqual(parse_time("1:30 AM", "PM"), 90)   # its own suffix wins
+        self.assertEqual(parse_time("13:30", "PM"), 810)    # already 24-hour
+
+    def test_invalid(self):
+        for value in ("", "abc", "25:00", "8:75", "13:00 PM", None):
+            self.assertIsNone(parse_time(value), value)
+
+
+class ParseSpanTest(unittest.TestCase):
+    def test_legacy_afternoon(self):
+        # old schedules were typed without AM/PM; 1:00-2:30 is an afternoon class
+        self.assertEqual(schedule_span({"day": "Monday", "start_time": "1:00", "end_time": "2:30"}), (0, 780, 870))
+
+    def test_school_hours(self):
+        self.assertEqual(parse_span("8:00", "9:30"), (480, 570))
+        self.assertEqual(parse_span("11:00", "1:00"), (660, 780))
+        self.assertEqual(parse_span("12:00", "1:30"), (720, 810))
+        self.assertEqual(parse_span("5:00", "8:00"), (1020, 1200))
+        self.assertEqual(parse_span("8:00 AM", "9:00 AM"), (480, 540))
+
+    def test_unsettled(self):
+        self.assertEqual(parse_span("10:00", "9:00"), (None, None))   # would be an 11-hour class
+        self.assertEqual(parse_span("9:00 AM", "8:00 AM"), (None, None))
+        self.assertEqual(parse_span("x", "9:00"), (None, None))
+
+    def test_numeric_columns_win(self):
+        s = dict(schedule(1, "1:00", "2:00"), day_no=2, start_min=60, end_min=120)
+        self.assertEqual(schedule_span(s), (2, 60, 120))
+
+
+class FindConflictsTest(unittest.TestCase):
+    @staticmethod
+    def brute_force(schedules):
+        pairs = set()
+        for i, a in enumerate(schedules):
+            for b in schedules[i + 1:]:
+                sa, sb = schedule_span(a), schedule_span(b)
+                if not sa or not sb or sa[0] != sb[0]:
+                    continue
+                if (a["academic_year"], a["semester"]) != (b["academic_year"], b["semester"]):
+                    continue
+                if sa[1] < sb[2] and sb[1] < sa[2]:
+                    for kind in ("room", "instructor"):
+                        if a[kind].lower() == b[kind].lower():
+                            pairs.add((kind, frozenset((a["id"], b["id"]))))
+        return pairs
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        schedules = []
+        for i in range(400):
+            start = rng.randrange(7 * 60, 18 * 60, 30)
+            schedules.append(schedule(
+                i, f"{start // 60}:{start % 60:02d}", f"{(start + 90) // 60}:{(start + 90) % 60:02d}",
+                day=rng.choice(["Monday", "Tuesday"]), room=f"R{rng.randrange(8)}",
+                instructor=rng.choice(["Smith", "Cruz", "Reyes", "Santos"]),
+                semester=rng.choice(["First Semester", "Second Semester"])))
+        found = {(kind, frozenset((a["id"], b["id"]))) for kind, a, b in find_conflicts(schedules)}
+        self.assertEqual(found, self.brute_force(schedules))
+        self.assertTrue(found)
+
+    def test_back_to_back_and_other_term(self):
+        schedules = [schedule(1, "8:00 AM", "9:00 AM"), schedule(2, "9:00 AM", "10:00 AM"),
+                     schedule(3, "8:30 AM", "9:30 AM", semester="Second Semester")]
+        self.assertEqual(find_conflicts(schedules), [])
+
+    def test_room_names_normalized(self):
+        schedules = [schedule(1, "8:00 AM", "9:00 AM", room="Lab  1", instructor="A"),
+                     schedule(2, "8:30 AM", "9:30 AM", room="lab 1", instructor="B")]
+        self.assertEqual([kind for kind, _, _ in find_conflicts(schedules)], ["room"])
+
+
+class ScheduleIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = [schedule(1, "8:00 AM", "9:00 AM"), schedule(2, "9:00 AM", "10:30 AM"),
+                     schedule(3, "1:00", "2:30"), schedule(4, "8:00 AM", "9:00 AM", section_id=2)]
+        self.index = ScheduleIndex(lambda: self.rows)
+
+    def at(self, hour, minute=0):
+        return MONDAY.replace(hour=hour, minute=minute)
+
+    def test_resolve(self):
+        self.assertEqual(self.index.resolve(1, self.at(8, 30)), 1)
+        self.assertEqual(self.index.resolve(1, self.at(9)), 2)          # end is exclusive
+        self.assertEqual(self.index.resolve(1, self.at(13, 15)), 3)     # legacy "1:00" is afternoon
+        self.assertIsNone(self.index.resolve(1, self.at(1, 15)))
+        self.assertEqual(self.index.resolve(2, self.at(8, 30)), 4)
+        self.assertIsNone(self.index.resolve(1, self.at(11)))
+        self.assertIsNone(self.index.resolve(1, self.at(8, 30) + timedelta(days=1)))
+        self.assertIsNone(self.index.resolve(None, self.at(8, 30)))
+        self.assertEqual(self.index.sections_in_session(self.at(8, 30)), {1, 2})
+
+    def test_early_scans_count_for_the_next_class(self):
+        self.assertEqual(self.index.resolve(1, self.at(7, 50)), 1)
+        self.assertEqual(self.index.resolve(1, self.at(12, 45)), 3)
+        self.assertIsNone(self.index.resolve(1, self.at(12, 44)))
+        self.assertIsNone(self.index.resolve(1, self.at(7, 50), early_minutes=0))
+        self.assertEqual(self.index.resolve(1, self.at(8, 50)), 1)      # the running class comes first
+
+    def test_put_and_remove(self):
+        self.index.ensure_loaded()
+        self.index.put(dict(schedule("5", "11:00 AM", "12:00 PM")))    # Treeview ids come back as text
+        self.assertEqual(self.index.resolve(1, self.at(11, 30)), 5)
+        self.index.put(dict(schedule(1, "7:00 AM", "7:50 AM"), section_id=None))   # keeps its section
+        self.assertEqual(self.index.resolve(1, self.at(7, 30)), 1)
+        self.assertIsNone(self.index.resolve(1, self.at(8, 30)))
+        self.index.remove("2")
+        self.assertIsNone(self.index.resolve(1, self.at(9, 30)))
+        self.assertEqual(self.index.start_minute(5), 660)
+
+    def test_put_before_load_reloads(self):
+        self.index.put(schedule(9, "3:00 PM", "4:00 PM"))
+        self.rows.append(schedule(9, "3:00 PM", "4:00 PM"))
+        self.assertEqual(self.index.resolve(1, self.at(15, 30)), 9)
+
+
+class ClassifyTest(unittest.TestCase):
+    def test_grace_period(self):
+        start = 8 * 60
+        self.assertEqual(classify(MONDAY.replace(hour=7, minute=50), start), "Present")   # early scan
+        self.assertEqual(classify(MONDAY.replace(hour=8, minute=GRACE_MINUTES), start), "Present")
+        self.assertEqual(classify(MONDAY.replace(hour=8, minute=GRACE_MINUTES + 1), start), "Late")
+        self.assertEqual(classify(MONDAY.replace(hour=9), None), "Present")   # outside classes
+
+
+class AbsenceJobTest(unittest.TestCase):
+    def setUp(self):
+        self.rows = [schedule(1, "8:00 AM", "9:00 AM"), schedule(2, "9:00 AM", "10:30 AM", section_id=2),
+                     schedule(3, "8:00 AM", "9:00 AM", semester="Second Semester"),
+                     schedule(4, "8:00 AM", "9:00 AM", day="Tuesday"),
+                     schedule(5, "7:00 AM", "8:00 AM", section_id=None)]
+        self.marked = []
+
+    def test_current_term(self):
+        self.assertEqual(current_term(self.rows, date(2026, 10, 19)), ("2026-2027", 1))
+        self.assertEqual(current_term(self.rows, date(2027, 2, 1)), ("2026-2027", 2))
+        self.assertIsNone(current_term(self.rows, date(2027, 7, 1)))
+        # a year the schedules do not name falls back to their latest one
+        self.assertEqual(current_term(self.rows, date(2027, 9, 1)), ("2026-2027", 1))
+
+    def test_classes_on(self):
+        term = ("2026-2027", 1)
+        self.assertEqual([c[0] for c in classes_on(self.rows, MONDAY.date(), term=term)], [1, 2])
+        ended = classes_on(self.rows, MONDAY.date(), ended_by=MONDAY.replace(hour=9), term=term)
+        self.assertEqual(ended, [(1, 1, MONDAY.replace(hour=8), MONDAY.replace(hour=9))])
+        self.assertEqual([c[0] for c in classes_on(self.rows, MONDAY.date())], [1, 2, 3])
+
+    def test_each_class_marked_once(self):
+        job = AbsenceJob(load_schedules=lambda: self.rows,
+                         mark_absent=lambda classes: self.marked.append([c[0] for c in classes]) or len(classes))
+        self.assertEqual(job.run_once(MONDAY.replace(hour=9, minute=30)), 1)
+        self.assertEqual(job.run_once(MONDAY.replace(hour=9, minute=45)), 0)
+        self.assertEqual(job.run_once(MONDAY.replace(hour=11)), 1)
+        self.assertEqual(self.marked, [[1], [2]])
+        job.run_once(MONDAY.replace(hour=9, minute=30) + timedelta(days=7))   # a new day starts over
+        self.assertEqual(self.marked[-1], [1])
+
+
+class ScanDedupeTest(unittest.TestCase):
+    def setUp(self):
+        self.dedupe = ScanDedupe(lambda section_id, when: 7 if section_id == 1 and when.hour == 8 else None,
+                                 window=timedelta(minutes=30))
+        self.t = MONDAY.replace(hour=8)
+
+    def test_repeat_rejected(self):
+        self.dedupe.admit("S1", 1, self.t)
+        with self.assertRaises(DuplicateScan) as caught:
+            self.dedupe.admit("S1", 1, self.t + timedelta(minutes=5))
+        self.assertEqual(caught.exception.first, self.t)
+        self.assertEqual(self.dedupe.rejected, 1)
+        self.dedupe.admit("S2", 1, self.t + timedelta(minutes=5))   # another student
+
+    def test_window_expires(self):
+        self.dedupe.admit("S1", 1, self.t)
+        self.dedupe.admit("S1", 1, self.t + timedelta(minutes=30))
+        self.assertEqual(len(self.dedupe), 1)   # the first entry was evicted
+
+    def test_key_per_class_and_day(self):
+        self.dedupe.admit("S1", 1, self.t)
+        self.dedupe.admit("S1", None, self.t.replace(minute=10))    # section unknown: the day key...
+        with self.assertRaises(DuplicateScan):
+            self.dedupe.admit("S1", 1, self.t.replace(minute=15))   # the class key is taken
+        with self.assertRaises(DuplicateScan):
+            self.dedupe.admit("S1", 2, self.t.replace(minute=20))   # ...shared by scans outside classes
+
+    def test_forget(self):
+        key = self.dedupe.admit("S1", 1, self.t)
+        self.dedupe.forget(key, self.t)
+        self.dedupe.admit("S1", 1, self.t + timedelta(minutes=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
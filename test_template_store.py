@@ -0,0 +1,132 @@
+# test_template_store.py
+"""Tests for the memory-mapped template store (no scanner or database needed).
+
+Run: python -m unittest test_template_store
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from fp_match import TEMPLATE_DIM
+from template_store import MIN_CAPACITY, TemplateStore, read_live
+
+
+def template(n):
+    """A template whose vector encodes n, so mismatched ids and vectors show."""
+    vec = np.zeros(TEMPLATE_DIM, dtype=np.float32)
+    vec[:2] = n + 1, 1
+    return vec
+
+
+def decode(vec):
+    """The n template(n) was made from (the store keeps vectors unit length)."""
+    return int(round(vec[0] / vec[1])) - 1
+
+
+class TemplateStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "templates.dat")
+        self.store = TemplateStore(self.path).open()
+
+    def tearDown(self):
+        self.store = None
+        self.dir.cleanup()
+
+    def assertConsistent(self, ids, vectors):
+        for sid, vec in zip(ids, vectors):
+            self.assertEqual(decode(vec), int(sid[1:]), sid)
+
+    def test_append_supersede_remove_and_reopen(self):
+        for i in range(10):
+            self.store.append(f"S{i}", template(i), section_id=1)
+        self.store.append("S3", template(33), section_id=2)
+        self.store.remove("S4")
+        self.assertEqual(len(self.store), 9)
+        self.assertNotIn("S4", self.store)
+        self.assertEqual(decode(self.store.template("S3")), 33)
+        reopened = TemplateStore(self.path).open()
+        ids, sections, _ = reopened.active()
+        self.assertEqual(sorted(ids), sorted(f"S{i}" for i in range(10) if i != 4))
+        self.assertEqual(dict(zip(ids, sections.tolist()))["S3"], 2)
+
+    def test_compact_alternates_between_front_and_tail(self):
+        for i in range(20):
+            self.store.append(f"S{i}", template(i))
+        for i in range(15):
+            self.store.append(f"S{i}", template(i))   # supersedes
+        self.assertGreater(self.store.dead_ratio(), 0.25)
+        self.assertTrue(self.store.maybe_compact())
+        self.assertEqual((self.store.base, self.store.count), (35, 55))   # no room in front: past the end
+        for i in range(20):
+            self.store.append(f"S{i}", template(i))
+        self.store.compact()
+        self.assertEqual((self.store.base, self.store.count), (0, 20))    # now the front has room
+        ids, _, vectors = TemplateStore(self.path).open().active()
+        self.assertEqual(sorted(ids), sorted(f"S{i}" for i in range(20)))
+        self.assertConsistent(ids, vectors)
+
+    def test_compact_leaves_the_range_in_use_untouched(self):
+        for i in range(30):
+            self.store.append(f"S{i}", template(i))
+        for round_ in range(4):
+            for i in range(0, 30, 2):
+                self.store.append(f"S{i}", template(i))
+            base, count = self.store.base, self.store.count
+            before = np.array(self.store._records[base:count])
+            self.store.compact()
+            # a reader still copying the old range sees exactly what it started with
+            self.assertTrue((np.array(self.store._records[base:count]) == before).all())
+
+    def test_crash_before_switch_keeps_old_records(self):
+        for i in range(8):
+            self.store.append(f"S{i}", template(i))
+        self.store.remove("S0")
+        header = self.store._header[0].copy()
+        self.store.compact()
+        self.store._header[0] = header   # as if the process died before the header write
+        self.store._header.flush()
+        ids, _, vectors = TemplateStore(self.path).open().active()
+        self.assertEqual(sorted(ids), [f"S{i}" for i in range(1, 8)])
+        self.assertConsistent(ids, vectors)
+
+    def test_grows(self):
+        for i in range(MIN_CAPACITY + 5):
+            self.store.append(f"S{i}", template(i))
+        _, generation, (ids, _, vectors) = read_live(self.path)
+        self.assertEqual(len(ids), MIN_CAPACITY + 5)
+        self.assertEqual(generation, self.store.generation)
+        self.assertConsistent(ids, vectors)
+
+    def test_readers_never_see_ids_paired_with_wrong_vectors(self):
+        for i in range(200):
+            self.store.append(f"S{i}", template(i))
+        stop, errors = threading.Event(), []
+
+        def reader():
+            while not stop.is_set():
+                _, _, (ids, _, vectors) = read_live(self.path)
+                try:
+                    self.assertConsistent(ids, vectors)
+                except AssertionError as e:
+                    errors.append(e)
+                    return
+
+        threads = [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for round_ in range(8):
+            for i in range(0, 200, 3):
+                self.store.append(f"S{i}", template(i))
+            self.store.compact()
+        stop.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()